@@ -0,0 +1,297 @@
+import os
+import socket
+import subprocess
+import threading
+import time
+
+from logger_config import Logger
+logger = Logger.get_logger(__name__)
+
+
+class AdbClientError(Exception):
+    """Ошибка обмена с adb-сервером или консолью эмулятора."""
+
+
+class AdbClient:
+    """
+    Клиент adb, работающий внутри процесса: запросы к adb-серверу (localhost:5037) и к консоли эмулятора
+    отправляются по сокету, без запуска процесса 'adb' на каждую команду.
+    Соединения с консолями эмуляторов (авторизованные токеном) переиспользуются между командами;
+    adb-сервер сам закрывает соединение после каждого сервиса, поэтому к нему каждый раз открывается
+    дешёвое локальное TCP-соединение. Если сервер или консоль недоступны, команда выполняется через 'adb'.
+    Команды к одному устройству выполняются по очереди (device_lock), к разным - параллельно;
+    общие для хоста команды ограничены HOST_COMMAND_LIMIT одновременными вызовами.
+    """
+    ADB_HOST = "127.0.0.1"
+    ADB_PORT = 5037
+    CONNECT_TIMEOUT = 5  # Тайм-аут подключения к adb-серверу и консоли эмулятора, сек.
+    DEFAULT_TIMEOUT = 30  # Тайм-аут команды по умолчанию, сек.
+    CONSOLE_AUTH_TOKEN_FILE = os.path.join(os.path.expanduser("~"), ".emulator_console_auth_token")
+
+    HOST_COMMAND_LIMIT = 2  # Сколько общих для хоста команд (список устройств и т.п.) выполняется одновременно
+
+    console_connections = {}  # Порт эмулятора -> авторизованный сокет консоли
+    device_locks = {}  # Serial устройства -> блокировка: команды к одному устройству выполняются по очереди
+    device_locks_guard = threading.Lock()
+    host_command_semaphore = threading.BoundedSemaphore(HOST_COMMAND_LIMIT)
+    server_start_lock = threading.Lock()
+    is_server_start_attempted = False
+
+    @classmethod
+    def _connect_to_server(cls, timeout):
+        try:
+            return socket.create_connection((cls.ADB_HOST, cls.ADB_PORT), timeout=min(timeout, cls.CONNECT_TIMEOUT))
+        except ConnectionRefusedError:
+            # adb-сервер ещё не запущен: один раз запускаем его и повторяем подключение
+            with cls.server_start_lock:
+                if cls.is_server_start_attempted:
+                    raise
+                cls.is_server_start_attempted = True
+                logger.info("adb-сервер не запущен, выполняется 'adb start-server'...")
+                subprocess.run(["adb", "start-server"], stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=30)
+            return socket.create_connection((cls.ADB_HOST, cls.ADB_PORT), timeout=min(timeout, cls.CONNECT_TIMEOUT))
+
+
+    @staticmethod
+    def _recv_exactly(sock, size):
+        data = b""
+        while len(data) < size:
+            chunk = sock.recv(size - len(data))
+            if not chunk:
+                raise AdbClientError("adb-сервер неожиданно закрыл соединение")
+            data += chunk
+        return data
+
+
+    @staticmethod
+    def _recv_all(sock, deadline):
+        chunks = []
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise socket.timeout("истёк тайм-аут чтения ответа")
+            sock.settimeout(remaining)
+            chunk = sock.recv(65536)
+            if not chunk:
+                return b"".join(chunks)
+            chunks.append(chunk)
+
+
+    @classmethod
+    def _send_request(cls, sock, request):
+        """Отправляет запрос в формате adb (длина в 4 hex-цифрах + текст) и проверяет ответ OKAY/FAIL."""
+        payload = request.encode("utf-8")
+        sock.sendall(f"{len(payload):04x}".encode("ascii") + payload)
+        status = cls._recv_exactly(sock, 4)
+        if status == b"OKAY":
+            return
+        if status == b"FAIL":
+            message_length = int(cls._recv_exactly(sock, 4), 16)
+            raise AdbClientError(cls._recv_exactly(sock, message_length).decode("utf-8", errors="replace"))
+        raise AdbClientError(f"неожиданный ответ adb-сервера: {status!r}")
+
+
+    @classmethod
+    def _read_length_prefixed(cls, sock):
+        length = int(cls._recv_exactly(sock, 4), 16)
+        return cls._recv_exactly(sock, length).decode("utf-8", errors="replace")
+
+
+    @classmethod
+    def _query_server(cls, request, timeout):
+        """Выполняет host-запрос, ответ на который - строка с префиксом длины."""
+        with cls._connect_to_server(timeout) as sock:
+            sock.settimeout(timeout)
+            cls._send_request(sock, request)
+            return cls._read_length_prefixed(sock)
+
+
+    @staticmethod
+    def _run_adb_process(args, timeout):
+        """Резервный путь: выполнение команды через процесс 'adb'. Возвращает CompletedProcess или None."""
+        try:
+            return subprocess.run(
+                ["adb", *args], stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, timeout=timeout
+            )
+        except (subprocess.TimeoutExpired, OSError):
+            return None
+
+
+    @classmethod
+    def device_lock(cls, serial):
+        """Блокировка устройства: использовать как 'with AdbClient.device_lock(serial):'."""
+        with cls.device_locks_guard:
+            return cls.device_locks.setdefault(serial, threading.RLock())
+
+
+    @classmethod
+    def devices(cls, timeout=DEFAULT_TIMEOUT):
+        """Возвращает словарь serial -> состояние (device, offline, unauthorized...) для подключённых устройств."""
+        with cls.host_command_semaphore:
+            try:
+                output = cls._query_server("host:devices", timeout)
+            except (OSError, AdbClientError) as e:
+                logger.debug(f"adb-сервер недоступен для 'host:devices', используется 'adb devices': {e}")
+                result = cls._run_adb_process(["devices"], timeout)
+                output = result.stdout if result is not None and result.returncode == 0 else ""
+                output = "\n".join(output.splitlines()[1:])  # Пропускаем заголовок 'List of devices attached'
+        return cls.parse_devices(output)
+
+
+    @classmethod
+    def track_devices(cls):
+        """
+        Генератор событий 'host:track-devices': при подключении и при каждом изменении списка устройств
+        отдаёт словарь serial -> состояние. При разрыве соединения с adb-сервером выбрасывает исключение.
+        """
+        with cls._connect_to_server(cls.CONNECT_TIMEOUT) as sock:
+            sock.settimeout(cls.CONNECT_TIMEOUT)
+            cls._send_request(sock, "host:track-devices")
+            sock.settimeout(None)  # Сервер пишет в поток только при изменениях
+            while True:
+                yield cls.parse_devices(cls._read_length_prefixed(sock))
+
+
+    @staticmethod
+    def parse_devices(output):
+        devices = {}
+        for line in output.splitlines():
+            parts = line.split()
+            if len(parts) >= 2:
+                devices[parts[0]] = parts[1]
+        return devices
+
+
+    @classmethod
+    def get_state(cls, serial, timeout=10):
+        """Возвращает состояние устройства ('device', 'offline'...) или None, если устройство не подключено."""
+        try:
+            return cls._query_server(f"host-serial:{serial}:get-state", timeout).strip()
+        except AdbClientError:
+            return None  # Сервер ответил FAIL: устройство не найдено
+        except OSError as e:
+            logger.debug(f"adb-сервер недоступен для get-state {serial}, используется 'adb get-state': {e}")
+        result = cls._run_adb_process(["-s", serial, "get-state"], timeout)
+        return result.stdout.strip() if result is not None and result.returncode == 0 else None
+
+
+    @classmethod
+    def shell(cls, serial, command, timeout=DEFAULT_TIMEOUT):
+        """
+        Выполняет команду оболочки на устройстве и возвращает её вывод.
+        Возвращает None, если устройство недоступно или истёк тайм-аут.
+        """
+        with cls.device_lock(serial):
+            deadline = time.monotonic() + timeout
+            try:
+                with cls._connect_to_server(timeout) as sock:
+                    sock.settimeout(timeout)
+                    cls._send_request(sock, f"host:transport:{serial}")
+                    cls._send_request(sock, f"shell:{command}")
+                    return cls._recv_all(sock, deadline).decode("utf-8", errors="replace").replace("\r\n", "\n").strip()
+            except AdbClientError:
+                return None  # Устройство не подключено или не готово
+            except socket.timeout:
+                return None
+            except OSError as e:
+                logger.debug(f"adb-сервер недоступен для shell на {serial}, используется 'adb shell': {e}")
+
+            result = cls._run_adb_process(["-s", serial, "shell", command], max(1.0, deadline - time.monotonic()))
+        if result is None or (result.returncode != 0 and "error:" in result.stderr):
+            return None
+        return result.stdout.strip()
+
+
+    @classmethod
+    def _read_console_reply(cls, sock, deadline):
+        """Читает ответ консоли до строки 'OK' или 'KO: ...'. Возвращает (успех, текст ответа)."""
+        data = b""
+        while True:
+            lines = data.decode("utf-8", errors="replace").replace("\r\n", "\n").split("\n")
+            for index, line in enumerate(lines[:-1]):
+                if line == "OK" or line.startswith("OK:"):
+                    return True, "\n".join(lines[:index]).strip()
+                if line.startswith("KO"):
+                    return False, line[3:].strip()
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise socket.timeout("истёк тайм-аут ответа консоли эмулятора")
+            sock.settimeout(remaining)
+            chunk = sock.recv(4096)
+            if not chunk:
+                raise AdbClientError("консоль эмулятора закрыла соединение")
+            data += chunk
+
+
+    @classmethod
+    def _open_console(cls, emulator_port, timeout):
+        deadline = time.monotonic() + timeout
+        sock = socket.create_connection(("127.0.0.1", emulator_port), timeout=min(timeout, cls.CONNECT_TIMEOUT))
+        try:
+            is_ok, banner = cls._read_console_reply(sock, deadline)
+            if "Authentication required" in banner:
+                with open(cls.CONSOLE_AUTH_TOKEN_FILE, "r", encoding="utf-8") as f:
+                    token = f.read().strip()
+                sock.sendall(f"auth {token}\r\n".encode("utf-8"))
+                is_ok, reply = cls._read_console_reply(sock, deadline)
+                if not is_ok:
+                    raise AdbClientError(f"консоль эмулятора отклонила токен: {reply}")
+            return sock
+        except Exception:
+            sock.close()
+            raise
+
+
+    @classmethod
+    def _drop_console(cls, emulator_port):
+        sock = cls.console_connections.pop(emulator_port, None)
+        if sock is not None:
+            try:
+                sock.close()
+            except OSError:
+                pass
+
+
+    @classmethod
+    def emu(cls, emulator_port, command, timeout=DEFAULT_TIMEOUT):
+        """
+        Выполняет команду консоли эмулятора (аналог 'adb -s emulator-PORT emu COMMAND').
+        Возвращает текст ответа или None, если команда завершилась ошибкой.
+        """
+        with cls.device_lock(f"emulator-{emulator_port}"):
+            for attempt in range(2):  # Повтор на новом соединении, если сохранённое уже закрыто эмулятором
+                deadline = time.monotonic() + timeout
+                try:
+                    sock = cls.console_connections.get(emulator_port)
+                    if sock is None:
+                        sock = cls._open_console(emulator_port, timeout)
+                        cls.console_connections[emulator_port] = sock
+                    sock.sendall(f"{command}\r\n".encode("utf-8"))
+                    is_ok, reply = cls._read_console_reply(sock, deadline)
+                    if command == "kill":
+                        cls._drop_console(emulator_port)  # Эмулятор завершается и закрывает консоль
+                    if not is_ok:
+                        logger.warning(f"[emulator-{emulator_port}] Консоль отклонила команду '{command}': {reply}")
+                        return None
+                    return reply
+                except AdbClientError as e:
+                    cls._drop_console(emulator_port)
+                    if command == "kill" and "закрыла соединение" in str(e):
+                        return ""  # Эмулятор завершился, не успев ответить
+                    if attempt == 0 and "закрыла соединение" in str(e):
+                        continue
+                    logger.debug(f"[emulator-{emulator_port}] Ошибка консоли эмулятора: {e}")
+                    break
+                except socket.timeout:
+                    cls._drop_console(emulator_port)
+                    logger.warning(f"[emulator-{emulator_port}] Консоль не ответила на '{command}' за {timeout} сек.")
+                    return None  # Команда могла начать выполняться: повторять её через 'adb' нельзя
+                except OSError as e:
+                    cls._drop_console(emulator_port)
+                    logger.debug(f"[emulator-{emulator_port}] Консоль эмулятора недоступна: {e}")
+                    break
+
+            result = cls._run_adb_process(["-s", f"emulator-{emulator_port}", "emu", *command.split()], timeout)
+        if result is None or result.returncode != 0:
+            return None
+        return result.stdout.strip()
@@ -3,6 +3,7 @@ import requests
 from appium import webdriver
 from appium.options.android import UiAutomator2Options
 
+from DeviceTracker import DeviceTracker
 from EmulatorAuthConfigManager import EmulatorAuthConfigManager
 import time
 import socket
@@ -12,32 +13,23 @@ import subprocess
 from logger_config import Logger
 logger = Logger.get_logger(__name__)
 
-lock = threading.Lock()
-
 
 class AndroidDriverManager:
-    def __init__(self, local_ip: str, port: int, emulator_auth_config_manager: EmulatorAuthConfigManager):
+    APPIUM_START_TIMEOUT = 60  # Сколько ждать ответа только что запущенного Appium-сервера, сек.
+    APPIUM_START_POLL_INTERVAL = 0.5
+
+    def __init__(self, local_ip: str, port: int, emulator_auth_config_manager: EmulatorAuthConfigManager, reuse_running_server: bool = False,
+                 device_tracker: DeviceTracker | None = None):
         self.local_ip = local_ip
+        self.device_tracker = device_tracker  # Отслеживание устройств adb; без него состояние запрашивается у adb
         self.port = port
+        self.reuse_running_server = reuse_running_server  # Не перезапускать уже работающий Appium-сервер (пул эмуляторов)
         self.emulator_auth_config_manager = emulator_auth_config_manager
         self.driver = None
         self.process = None
         self.appium_server_url = f"http://{self.local_ip}:{self.port}"
 
 
-    @staticmethod
-    def execute_adb_command(command):
-        thread_name = threading.current_thread().name
-
-        with lock:
-            try:
-                result = subprocess.run(command.split(), stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-                return result.stdout.strip()
-            except Exception as e:
-                logger.error(f"[{thread_name}] Ошибка при выполнении команды: {command}. {e}")
-                return ""
-
-
     @staticmethod
     def is_port_free(port):
         """
@@ -106,31 +98,46 @@ class AndroidDriverManager:
         """
         thread_name = threading.current_thread().name
 
-        with lock:
-            self.ensure_port_available()
+        if self.reuse_running_server and self.is_appium_server_running(self.appium_server_url):
+            logger.info(f"[{thread_name}] Используем уже запущенный Appium сервер на порту {self.port}.")
+            return
 
-            log_filename = f"appium_server_{self.port}.log"  # Уникальное имя файла логов для каждого порта
-            log_file = open(log_filename, "w")  # Открыть файл для записи логов
+        self.ensure_port_available()
 
-            command = f"appium --port {self.port} --log-level info --relaxed-security --session-override"
-            try:
-                self.process = subprocess.Popen(
-                    command,
-                    shell=True,
-                    stdout=log_file,
-                    stderr=subprocess.STDOUT  # Перенаправить stderr в stdout
-                )
-                logger.info(f"[{thread_name}] Appium сервер запущен на порту {self.port}.")
-                time.sleep(3)  # Ждём несколько секунд для инициализации сервера
-            except Exception as e:
-                logger.error(f"[{thread_name}] Не удалось запустить Appium сервер на порту {self.port}: {e}")
-                self.process = None
+        log_filename = f"appium_server_{self.port}.log"  # Уникальное имя файла логов для каждого порта
+        log_file = open(log_filename, "w")  # Открыть файл для записи логов
+
+        command = f"appium --port {self.port} --log-level info --relaxed-security --session-override"
+        try:
+            self.process = subprocess.Popen(
+                command,
+                shell=True,
+                stdout=log_file,
+                stderr=subprocess.STDOUT  # Перенаправить stderr в stdout
+            )
+        except Exception as e:
+            logger.error(f"[{thread_name}] Не удалось запустить Appium сервер на порту {self.port}: {e}")
+            self.process = None
+            return
+
+        # Ждём, пока сервер начнёт отвечать, вместо фиксированной паузы
+        start_time = time.monotonic()
+        while time.monotonic() - start_time < self.APPIUM_START_TIMEOUT:
+            if self.is_appium_server_running(self.appium_server_url):
+                logger.info(f"[{thread_name}] Appium сервер запущен на порту {self.port} "
+                            f"за {time.monotonic() - start_time:.1f} сек.")
+                return
+            if self.process.poll() is not None:
+                logger.error(f"[{thread_name}] Appium сервер на порту {self.port} завершился при запуске, см. {log_filename}.")
+                return
+            time.sleep(self.APPIUM_START_POLL_INTERVAL)
+        logger.warning(f"[{thread_name}] Appium сервер на порту {self.port} не ответил за {self.APPIUM_START_TIMEOUT} сек.")
 
 
     @staticmethod
     def is_appium_server_running(url):
         try:
-            response = requests.get(url + "/status")
+            response = requests.get(url + "/status", timeout=5)
             return response.status_code == 200
         except requests.exceptions.RequestException:
             return False
@@ -190,12 +197,8 @@ class AndroidDriverManager:
 
 
         logger.info(f"[{thread_name}] Проверка подключения устройства {device_id} через ADB...")
-        adb_output = self.execute_adb_command("adb devices")
-        connected_devices = [
-            line.split()[0] for line in adb_output.splitlines() if "device" in line
-        ]
-
-        if device_id in connected_devices:
+        state = self.device_tracker.get_state(device_id) if self.device_tracker else AdbClient.get_state(device_id)
+        if state == "device":
             logger.info(f"[{thread_name}] Устройство {device_id} подключено.")
             return True
         else:
@@ -0,0 +1,73 @@
+import threading
+import time
+from contextlib import contextmanager
+
+from logger_config import Logger
+logger = Logger.get_logger(__name__)
+
+
+class BootScheduler:
+    """
+    Допуск эмуляторов к загрузке.
+    Одновременно загружается не более max_concurrent_boots эмуляторов, а старты загрузок разнесены
+    во времени минимум на boot_stagger_seconds. Место освобождается, как только эмулятор готов к работе
+    (или загрузка завершилась ошибкой), и тут же занимается следующим ожидающим эмулятором.
+    """
+    WAIT_POLL_INTERVAL = 0.5  # Период проверки флага завершения при ожидании места, сек.
+
+    def __init__(self, max_concurrent_boots: int = 2, boot_stagger_seconds: float = 5.0, terminate_flag: threading.Event = None):
+        self.max_concurrent_boots = max(1, int(max_concurrent_boots))
+        self.boot_stagger_seconds = max(0.0, float(boot_stagger_seconds))
+        self.terminate_flag = terminate_flag
+
+        self.semaphore = threading.BoundedSemaphore(self.max_concurrent_boots)
+        self.stagger_lock = threading.Lock()
+        self.last_boot_started_at = None
+        logger.info(
+            f"Планировщик загрузки эмуляторов: одновременно {self.max_concurrent_boots}, "
+            f"интервал между стартами {self.boot_stagger_seconds} сек."
+        )
+
+
+    def _acquire(self, avd_name):
+        """Ожидает свободное место. Возвращает False, если ожидание прервано флагом завершения."""
+        while not self.semaphore.acquire(timeout=self.WAIT_POLL_INTERVAL):
+            if self.terminate_flag is not None and self.terminate_flag.is_set():
+                logger.info(f"Ожидание загрузки {avd_name} прервано: программа завершается.")
+                return False
+        return True
+
+
+    def _wait_for_stagger(self):
+        """Выдерживает интервал между стартами загрузок. Вызывается под self.stagger_lock."""
+        if self.last_boot_started_at is None:
+            return
+        delay = self.last_boot_started_at + self.boot_stagger_seconds - time.monotonic()
+        if delay > 0:
+            if self.terminate_flag is not None:
+                self.terminate_flag.wait(delay)
+            else:
+                time.sleep(delay)
+
+
+    @contextmanager
+    def boot_slot(self, avd_name):
+        """
+        Контекст загрузки эмулятора: вход блокируется до получения места,
+        выход (после готовности эмулятора или ошибки) освобождает место следующему.
+        """
+        wait_started_at = time.monotonic()
+        if not self._acquire(avd_name):
+            raise RuntimeError(f"Загрузка эмулятора {avd_name} отменена: программа завершается.")
+
+        try:
+            with self.stagger_lock:
+                self._wait_for_stagger()
+                self.last_boot_started_at = time.monotonic()
+            logger.info(f"Эмулятор {avd_name} допущен к загрузке после ожидания {time.monotonic() - wait_started_at:.1f} сек.")
+
+            boot_started_at = time.monotonic()
+            yield
+            logger.info(f"Эмулятор {avd_name} загружен за {time.monotonic() - boot_started_at:.1f} сек., место загрузки освобождено.")
+        finally:
+            self.semaphore.release()
@@ -0,0 +1,150 @@
+import ctypes
+import os
+import subprocess
+import tempfile
+import time
+
+from logger_config import Logger
+logger = Logger.get_logger(__name__)
+
+
+class CapacityPlanner:
+    """
+    Подбор количества эмуляторов и их параметров под ресурсы хоста:
+    число ядер, свободная ОЗУ, наличие аппаратного ускорения (KVM/HAXM/WHPX) и скорость записи на диск.
+    """
+    HOST_RESERVED_RAM_MB = 2048  # ОЗУ, оставляемая системе и самой программе
+    HOST_RESERVED_CORES = 1  # Ядра, оставляемые системе и самой программе
+    EMULATOR_OVERHEAD_RAM_MB = 512  # Расход процесса эмулятора сверх ОЗУ гостевой системы
+    CPU_OVERSUBSCRIPTION = 1.5  # Эмуляторы большую часть времени простаивают в ожидании интерфейса Telegram
+    MIN_GUEST_RAM_MB = 768
+    DEFAULT_GUEST_RAM_MB = 1024
+    MAX_EMULATORS = 16
+    DISK_BENCHMARK_SIZE_MB = 64
+
+    @staticmethod
+    def get_cpu_count():
+        return os.cpu_count() or 1
+
+
+    @staticmethod
+    def get_ram_mb():
+        """Возвращает (всего ОЗУ, доступно ОЗУ) в МБ или (None, None), если определить не удалось."""
+        if os.name == 'nt':
+            class MemoryStatusEx(ctypes.Structure):
+                _fields_ = [
+                    ("dwLength", ctypes.c_ulong),
+                    ("dwMemoryLoad", ctypes.c_ulong),
+                    ("ullTotalPhys", ctypes.c_ulonglong),
+                    ("ullAvailPhys", ctypes.c_ulonglong),
+                    ("ullTotalPageFile", ctypes.c_ulonglong),
+                    ("ullAvailPageFile", ctypes.c_ulonglong),
+                    ("ullTotalVirtual", ctypes.c_ulonglong),
+                    ("ullAvailVirtual", ctypes.c_ulonglong),
+                    ("ullAvailExtendedVirtual", ctypes.c_ulonglong),
+                ]
+
+            status = MemoryStatusEx()
+            status.dwLength = ctypes.sizeof(MemoryStatusEx)
+            if ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status)):
+                return status.ullTotalPhys // (1024 * 1024), status.ullAvailPhys // (1024 * 1024)
+            return None, None
+
+        try:
+            meminfo = {}
+            with open("/proc/meminfo", "r") as f:
+                for line in f:
+                    key, value = line.split(":", 1)
+                    meminfo[key] = int(value.split()[0])  # Значения в кБ
+            available = meminfo.get("MemAvailable", meminfo.get("MemFree", 0))
+            return meminfo["MemTotal"] // 1024, available // 1024
+        except (OSError, KeyError, ValueError):
+            return None, None
+
+
+    @staticmethod
+    def is_hardware_acceleration_available():
+        """Проверяет аппаратное ускорение эмулятора через 'emulator -accel-check' (на Linux также /dev/kvm)."""
+        try:
+            result = subprocess.run(
+                ["emulator", "-accel-check"], stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, timeout=30
+            )
+            if result.returncode == 0:
+                return True
+            logger.info(f"Результат 'emulator -accel-check': {result.stdout.strip()}")
+        except (OSError, subprocess.TimeoutExpired) as e:
+            logger.warning(f"Не удалось выполнить 'emulator -accel-check': {e}")
+        return os.path.exists("/dev/kvm") and os.access("/dev/kvm", os.R_OK | os.W_OK)
+
+
+    @classmethod
+    def measure_disk_write_speed(cls, directory=None):
+        """Возвращает скорость последовательной записи (МБ/с) в каталог с AVD."""
+        directory = directory or os.path.expanduser("~/.android")
+        os.makedirs(directory, exist_ok=True)
+        block = os.urandom(1024 * 1024)
+        fd, path = tempfile.mkstemp(prefix="disk_benchmark_", dir=directory)
+        try:
+            start_time = time.perf_counter()
+            with os.fdopen(fd, "wb") as f:
+                for _ in range(cls.DISK_BENCHMARK_SIZE_MB):
+                    f.write(block)
+                f.flush()
+                os.fsync(f.fileno())
+            elapsed = time.perf_counter() - start_time
+        finally:
+            os.remove(path)
+        return cls.DISK_BENCHMARK_SIZE_MB / elapsed if elapsed > 0 else float("inf")
+
+
+    @classmethod
+    def plan(cls):
+        """
+        Возвращает рекомендуемый план: количество эмуляторов, ОЗУ и ядра на эмулятор,
+        число одновременных загрузок, а также измеренные характеристики хоста.
+        """
+        cpu_count = cls.get_cpu_count()
+        total_ram_mb, available_ram_mb = cls.get_ram_mb()
+        has_acceleration = cls.is_hardware_acceleration_available()
+        try:
+            disk_speed = cls.measure_disk_write_speed()
+        except OSError as e:
+            logger.warning(f"Не удалось измерить скорость записи на диск: {e}")
+            disk_speed = None
+
+        usable_ram_mb = max(0, (available_ram_mb or 0) - cls.HOST_RESERVED_RAM_MB)
+        usable_cores = max(1, cpu_count - cls.HOST_RESERVED_CORES)
+
+        cpu_cores = 2 if usable_cores >= 8 else 1
+        guest_ram_mb = cls.DEFAULT_GUEST_RAM_MB
+        if usable_ram_mb < guest_ram_mb + cls.EMULATOR_OVERHEAD_RAM_MB:
+            guest_ram_mb = cls.MIN_GUEST_RAM_MB
+
+        count_by_ram = usable_ram_mb // (guest_ram_mb + cls.EMULATOR_OVERHEAD_RAM_MB)
+        count_by_cpu = int(usable_cores * cls.CPU_OVERSUBSCRIPTION / cpu_cores)
+        if not has_acceleration:
+            count_by_cpu = max(1, count_by_cpu // 4)  # Программная эмуляция в разы медленнее
+        emulator_count = max(1, min(count_by_ram, count_by_cpu, cls.MAX_EMULATORS))
+
+        if disk_speed is None or disk_speed < 100:
+            max_concurrent_boots = 1  # HDD или медленный диск: одновременные загрузки упираются в чтение образов
+        elif disk_speed < 500:
+            max_concurrent_boots = 2
+        else:
+            max_concurrent_boots = min(4, max(2, usable_cores // 4))
+        max_concurrent_boots = min(max_concurrent_boots, emulator_count)
+
+        return {
+            "emulator_count": emulator_count,
+            "ram_size": guest_ram_mb,
+            "cpu_cores": cpu_cores,
+            "max_concurrent_boots": max_concurrent_boots,
+            "host": {
+                "cpu_count": cpu_count,
+                "total_ram_mb": total_ram_mb,
+                "available_ram_mb": available_ram_mb,
+                "hardware_acceleration": has_acceleration,
+                "disk_write_mb_s": round(disk_speed, 1) if disk_speed is not None else None,
+                "limited_by": "ram" if count_by_ram <= count_by_cpu else "cpu",
+            },
+        }
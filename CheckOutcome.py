@@ -0,0 +1,9 @@
+class CheckOutcome:
+    """Итог проверки номера в Telegram."""
+    REGISTERED = "registered"  # Номер зарегистрирован в Telegram
+    NOT_REGISTERED = "not_registered"  # Номер не зарегистрирован в Telegram
+    INCONCLUSIVE = "inconclusive"  # Telegram не дал однозначного ответа
+    ERROR = "error"  # Проверка прервалась ошибкой
+
+    # Окончательные итоги: такие номера не перепроверяются при следующих запусках
+    FINAL = (REGISTERED, NOT_REGISTERED)
@@ -0,0 +1,252 @@
+import asyncio
+import os
+import shutil
+import signal
+import subprocess
+import threading
+import time
+from collections import namedtuple
+
+from logger_config import Logger
+logger = Logger.get_logger(__name__)
+
+
+# Результат команды: код возврата (None - процесс не запустился или был прерван), вывод, длительность, признак тайм-аута
+CommandResult = namedtuple("CommandResult", ["returncode", "stdout", "stderr", "elapsed", "timed_out"])
+
+
+class CommandRunner:
+    """
+    Выполнение внешних команд на asyncio-цикле в отдельном фоновом потоке.
+    Команды задаются списком аргументов (без оболочки), у каждой есть жёсткий тайм-аут, по истечении
+    которого процесс убивается. cancel_all() прерывает все выполняющиеся команды (при остановке программы).
+    run_many()/call_many() выполняют команды для всего парка эмуляторов параллельно.
+    По каждому типу команды ведётся статистика: количество, ошибки, тайм-ауты, время выполнения.
+    """
+    DEFAULT_TIMEOUT = 120  # Тайм-аут команды по умолчанию, сек.
+    DEFAULT_CONCURRENCY = 8  # Сколько команд одной групповой операции выполняется одновременно
+    KILL_TIMEOUT = 10  # Тайм-аут taskkill при завершении дерева процессов, сек.
+    DRAIN_TIMEOUT = 5  # Сколько ждать остаток вывода после завершения процесса, сек.
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.loop = None
+        self.loop_thread = None
+        self.active_processes = set()
+        self.stats = {}  # Тип команды -> счётчики
+
+
+    def _ensure_loop(self):
+        with self.lock:
+            if self.loop is not None:
+                return self.loop
+            self.loop = asyncio.new_event_loop()
+            self.loop_thread = threading.Thread(target=self.loop.run_forever, name="CommandRunnerLoop", daemon=True)
+            self.loop_thread.start()
+            return self.loop
+
+
+    @staticmethod
+    def resolve_argv(argv):
+        # На Windows sdkmanager/avdmanager - это .bat: без оболочки их нужно запускать по полному пути
+        executable = shutil.which(argv[0])
+        return [executable or argv[0], *argv[1:]]
+
+
+    @staticmethod
+    def process_group_kwargs():
+        # Команда запускается в своей группе процессов, чтобы при прерывании завершить и дочерние процессы
+        # (у .bat-обёрток sdkmanager/avdmanager это java.exe, который держит открытыми каналы вывода)
+        if os.name == 'nt':
+            return {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP}
+        return {"start_new_session": True}
+
+
+    async def _kill_tree(self, process):
+        """Завершает процесс вместе со всеми его потомками."""
+        if process.returncode is not None:
+            return
+        try:
+            if os.name == 'nt':
+                taskkill = await asyncio.create_subprocess_exec(
+                    "taskkill", "/T", "/F", "/PID", str(process.pid),
+                    stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+                )
+                if await asyncio.wait_for(taskkill.wait(), self.KILL_TIMEOUT) == 0:
+                    return
+            else:
+                os.killpg(process.pid, signal.SIGKILL)
+                return
+        except ProcessLookupError:
+            return
+        except (OSError, asyncio.TimeoutError) as e:
+            logger.warning(f"Не удалось завершить дерево процессов {process.pid}: {e}")
+        # Дерево завершить не удалось - завершаем хотя бы сам процесс
+        try:
+            process.kill()
+        except ProcessLookupError:
+            pass
+
+
+    @classmethod
+    def kill_process_tree(cls, process):
+        """Синхронно завершает процесс subprocess.Popen, запущенный с process_group_kwargs(), вместе с потомками."""
+        if process.poll() is not None:
+            return
+        try:
+            if os.name == 'nt':
+                result = subprocess.run(
+                    ["taskkill", "/T", "/F", "/PID", str(process.pid)],
+                    stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                    timeout=cls.KILL_TIMEOUT
+                )
+                if result.returncode == 0:
+                    return
+            else:
+                os.killpg(process.pid, signal.SIGKILL)
+                return
+        except ProcessLookupError:
+            return
+        except (OSError, subprocess.TimeoutExpired) as e:
+            logger.warning(f"Не удалось завершить дерево процессов {process.pid}: {e}")
+        process.kill()
+
+
+    def _record(self, command_type, result):
+        with self.lock:
+            stats = self.stats.setdefault(command_type, {
+                "count": 0, "failures": 0, "timeouts": 0, "total_time": 0.0, "max_time": 0.0, "exit_codes": {},
+            })
+            stats["count"] += 1
+            stats["total_time"] += result.elapsed
+            stats["max_time"] = max(stats["max_time"], result.elapsed)
+            stats["exit_codes"][result.returncode] = stats["exit_codes"].get(result.returncode, 0) + 1
+            if result.timed_out:
+                stats["timeouts"] += 1
+            elif result.returncode != 0:
+                stats["failures"] += 1
+
+
+    async def _run(self, argv, timeout, command_type, input_text):
+        start_time = time.monotonic()
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *self.resolve_argv(argv),
+                stdin=subprocess.PIPE if input_text is not None else subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                **self.process_group_kwargs(),
+            )
+        except OSError as e:
+            result = CommandResult(None, "", str(e), time.monotonic() - start_time, False)
+            self._record(command_type, result)
+            return result
+
+        self.active_processes.add(process)
+        timed_out = False
+        try:
+            stdout, stderr = await asyncio.wait_for(
+                process.communicate(input_text.encode("utf-8") if input_text is not None else None), timeout
+            )
+        except asyncio.TimeoutError:
+            timed_out = True
+            await self._kill_tree(process)
+            try:
+                stdout, stderr = await asyncio.wait_for(process.communicate(), self.DRAIN_TIMEOUT)
+            except asyncio.TimeoutError:
+                # Каналы вывода всё ещё кем-то удерживаются: команда всё равно считается прерванной по тайм-ауту
+                stdout, stderr = b"", b""
+        finally:
+            self.active_processes.discard(process)
+
+        result = CommandResult(
+            process.returncode,
+            stdout.decode("utf-8", errors="replace").strip(),
+            stderr.decode("utf-8", errors="replace").strip(),
+            time.monotonic() - start_time,
+            timed_out,
+        )
+        self._record(command_type, result)
+        return result
+
+
+    def run(self, argv, timeout=DEFAULT_TIMEOUT, command_type=None, input_text=None):
+        """Выполняет команду и возвращает CommandResult. Блокирует вызывающий поток до завершения или тайм-аута."""
+        thread_name = threading.current_thread().name
+        command_type = command_type or " ".join(argv[:2])
+        result = asyncio.run_coroutine_threadsafe(
+            self._run(argv, timeout, command_type, input_text), self._ensure_loop()
+        ).result()
+        if result.timed_out:
+            logger.error(f"[{thread_name}] Команда прервана по тайм-ауту {timeout} сек.: {subprocess.list2cmdline(argv)}")
+        return result
+
+
+    def run_many(self, argv_list, timeout=DEFAULT_TIMEOUT, command_type=None, concurrency=DEFAULT_CONCURRENCY):
+        """Выполняет несколько команд параллельно (не более concurrency одновременно). Возвращает список CommandResult."""
+        async def run_all():
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def run_one(argv):
+                async with semaphore:
+                    return await self._run(argv, timeout, command_type or " ".join(argv[:2]), None)
+
+            return await asyncio.gather(*(run_one(argv) for argv in argv_list))
+
+        return asyncio.run_coroutine_threadsafe(run_all(), self._ensure_loop()).result()
+
+
+    def call_many(self, calls, timeout=DEFAULT_TIMEOUT, command_type="call", concurrency=DEFAULT_CONCURRENCY):
+        """
+        Параллельно выполняет блокирующие функции без аргументов (например, команды консоли эмулятора).
+        Возвращает список результатов; для не уложившихся в тайм-аут или упавших вызовов - None.
+        """
+        async def call_all():
+            loop = asyncio.get_running_loop()
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def call_one(call):
+                async with semaphore:
+                    start_time = time.monotonic()
+                    try:
+                        value = await asyncio.wait_for(loop.run_in_executor(None, call), timeout)
+                        self._record(command_type, CommandResult(0, "", "", time.monotonic() - start_time, False))
+                        return value
+                    except asyncio.TimeoutError:
+                        self._record(command_type, CommandResult(None, "", "", time.monotonic() - start_time, True))
+                    except Exception as e:
+                        logger.error(f"Ошибка групповой операции '{command_type}': {e}")
+                        self._record(command_type, CommandResult(1, "", str(e), time.monotonic() - start_time, False))
+                    return None
+
+            return await asyncio.gather(*(call_one(call) for call in calls))
+
+        return asyncio.run_coroutine_threadsafe(call_all(), self._ensure_loop()).result()
+
+
+    def cancel_all(self):
+        """Убивает все выполняющиеся команды; ожидающие их потоки получают результат с ненулевым кодом."""
+        if self.loop is None:
+            return
+
+        async def kill_active_processes():
+            await asyncio.gather(*(self._kill_tree(process) for process in list(self.active_processes)))
+
+        asyncio.run_coroutine_threadsafe(kill_active_processes(), self.loop)
+        logger.info(f"Прерывание выполняющихся внешних команд: {len(self.active_processes)}.")
+
+
+    def get_stats(self):
+        """Возвращает статистику по типам команд: количество, ошибки, тайм-ауты, среднее и максимальное время."""
+        with self.lock:
+            return {
+                command_type: {
+                    "count": stats["count"],
+                    "failures": stats["failures"],
+                    "timeouts": stats["timeouts"],
+                    "avg_time": round(stats["total_time"] / stats["count"], 2),
+                    "max_time": round(stats["max_time"], 2),
+                    "exit_codes": dict(stats["exit_codes"]),
+                }
+                for command_type, stats in self.stats.items()
+            }
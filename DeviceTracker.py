@@ -0,0 +1,119 @@
+import threading
+import time
+
+from AdbClient import AdbClient, AdbClientError
+
+from logger_config import Logger
+logger = Logger.get_logger(__name__)
+
+
+class DeviceTracker:
+    """
+    Отслеживание устройств по потоку событий adb-сервера 'host:track-devices' вместо опроса 'adb devices'.
+    Фоновый поток держит в памяти словарь serial -> состояние (device, offline, unauthorized...),
+    пробуждает потоки, ожидающие нужного состояния, и вызывает обработчики при пропаже устройства.
+    Пока поток событий недоступен, состояние запрашивается у adb напрямую.
+    """
+    RECONNECT_DELAY = 2  # Пауза перед повторным подключением к adb-серверу, сек.
+    FALLBACK_POLL_INTERVAL = 1  # Период опроса состояния, если поток событий недоступен, сек.
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.states = {}
+        self.is_connected = False
+        self.disappear_callbacks = {}  # Serial -> обработчики пропажи устройства
+        self.tracker_thread = None
+
+
+    def start(self):
+        """Запускает фоновое отслеживание (повторный вызов ничего не делает)."""
+        with self.condition:
+            if self.tracker_thread is not None:
+                return
+            self.tracker_thread = threading.Thread(target=self._track_loop, name="DeviceTracker", daemon=True)
+        self.tracker_thread.start()
+
+
+    def _track_loop(self):
+        while True:
+            try:
+                for states in AdbClient.track_devices():
+                    self._update(states)
+            except (OSError, AdbClientError) as e:
+                if self.is_connected:
+                    logger.warning(f"Поток событий adb 'track-devices' прерван: {e}. Переподключение...")
+                else:
+                    logger.debug(f"Не удалось подключиться к потоку событий adb 'track-devices': {e}")
+            with self.condition:
+                self.is_connected = False
+            time.sleep(self.RECONNECT_DELAY)
+
+
+    def _update(self, states):
+        with self.condition:
+            if not self.is_connected:
+                logger.info(f"Отслеживание устройств adb запущено: {states or 'устройств нет'}.")
+            previous_states = self.states
+            self.states = states
+            self.is_connected = True
+            self.condition.notify_all()
+            disappeared = [serial for serial in previous_states if serial not in states]
+            callbacks = [(serial, list(self.disappear_callbacks.get(serial, ()))) for serial in disappeared]
+
+        for serial, state in states.items():
+            if previous_states.get(serial) != state:
+                logger.info(f"Устройство {serial}: {previous_states.get(serial, 'нет')} -> {state}.")
+        for serial, serial_callbacks in callbacks:
+            logger.warning(f"Устройство {serial} пропало из adb.")
+            for callback in serial_callbacks:
+                try:
+                    callback(serial)
+                except Exception as e:
+                    logger.error(f"Ошибка обработчика пропажи устройства {serial}: {e}")
+
+
+    def get_state(self, serial):
+        """Возвращает текущее состояние устройства или None, если оно не подключено."""
+        with self.condition:
+            if self.is_connected:
+                return self.states.get(serial)
+        return AdbClient.get_state(serial)
+
+
+    def wait_for_state(self, serial, state, timeout):
+        """Ждёт, пока устройство перейдёт в состояние state. Возвращает True, если дождались до тайм-аута."""
+        deadline = time.monotonic() + timeout
+        while True:
+            with self.condition:
+                if not self.is_connected and self.tracker_thread is not None:
+                    # Отслеживание запущено, но ещё не подключилось - даём ему немного времени
+                    self.condition.wait_for(
+                        lambda: self.is_connected,
+                        timeout=min(self.FALLBACK_POLL_INTERVAL, max(0.0, deadline - time.monotonic()))
+                    )
+                if self.is_connected:
+                    self.condition.wait_for(
+                        lambda: not self.is_connected or self.states.get(serial) == state,
+                        timeout=max(0.0, deadline - time.monotonic())
+                    )
+                    if self.is_connected:
+                        return self.states.get(serial) == state
+            # Поток событий недоступен: опрашиваем adb напрямую
+            if AdbClient.get_state(serial, timeout=max(1.0, min(10.0, deadline - time.monotonic()))) == state:
+                return True
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(min(self.FALLBACK_POLL_INTERVAL, max(0.0, deadline - time.monotonic())))
+
+
+    def add_disappear_callback(self, serial, callback):
+        """Регистрирует обработчик callback(serial), вызываемый при пропаже устройства из adb."""
+        with self.condition:
+            self.disappear_callbacks.setdefault(serial, []).append(callback)
+
+
+    def remove_disappear_callback(self, serial, callback):
+        with self.condition:
+            callbacks = self.disappear_callbacks.get(serial, [])
+            if callback in callbacks:
+                callbacks.remove(callback)
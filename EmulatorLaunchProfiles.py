@@ -0,0 +1,75 @@
+import json
+import os
+
+from logger_config import Logger
+logger = Logger.get_logger(__name__)
+
+
+class EmulatorLaunchProfiles:
+    """
+    Именованные профили запуска эмулятора: набор флагов командной строки 'emulator' после '-avd' и '-port'.
+    Встроенные профили можно переопределить или дополнить своими в файле PROFILES_FILE.
+    """
+    PROFILES_FILE = "emulator_launch_profiles.json"  # Имя файла с пользовательскими профилями запуска
+    DEFAULT_PROFILE = "windowed"
+
+    BUILT_IN_PROFILES = {
+        # Окно, звук и аппаратная графика - как раньше; нужен для ручной авторизации в Telegram
+        "windowed": ["-gpu", "auto", "-verbose"],
+        # Без окна, звука и анимации загрузки, программная графика, сеть без искусственных ограничений
+        "headless": [
+            "-no-window", "-no-audio", "-no-boot-anim",
+            "-gpu", "swiftshader_indirect",
+            "-netspeed", "full", "-netdelay", "none",
+        ],
+        # Как headless, но с уменьшенным экраном и плотностью: меньше памяти и CPU на отрисовку
+        "dense": [
+            "-no-window", "-no-audio", "-no-boot-anim",
+            "-gpu", "swiftshader_indirect",
+            "-netspeed", "full", "-netdelay", "none",
+            "-skin", "480x800", "-prop", "qemu.sf.lcd_density=160",
+        ],
+    }
+
+    @classmethod
+    def load_profiles(cls):
+        """Возвращает словарь профилей: встроенные, дополненные профилями из файла."""
+        profiles = dict(cls.BUILT_IN_PROFILES)
+        if not os.path.exists(cls.PROFILES_FILE):
+            cls._save_profiles(profiles)
+            return profiles
+        try:
+            with open(cls.PROFILES_FILE, "r", encoding="utf-8") as f:
+                custom_profiles = json.load(f)
+            profiles.update({
+                name: [str(flag) for flag in flags]
+                for name, flags in custom_profiles.items() if isinstance(flags, list)
+            })
+        except (json.JSONDecodeError, IOError) as e:
+            logger.error(f"Ошибка при чтении файла профилей запуска эмулятора: {e}")
+        return profiles
+
+
+    # noinspection PyTypeChecker
+    @classmethod
+    def _save_profiles(cls, profiles):
+        try:
+            with open(cls.PROFILES_FILE, "w", encoding="utf-8") as f:
+                json.dump(profiles, f, ensure_ascii=False, indent=4)
+        except IOError as e:
+            logger.error(f"Ошибка при сохранении файла профилей запуска эмулятора: {e}")
+
+
+    @classmethod
+    def get_profile_names(cls):
+        return list(cls.load_profiles())
+
+
+    @classmethod
+    def get_flags(cls, profile_name):
+        """Возвращает флаги профиля; для неизвестного профиля - флаги профиля по умолчанию."""
+        profiles = cls.load_profiles()
+        if profile_name not in profiles:
+            logger.warning(f"Профиль запуска '{profile_name}' не найден, используется '{cls.DEFAULT_PROFILE}'.")
+            profile_name = cls.DEFAULT_PROFILE
+        return profiles.get(profile_name, cls.BUILT_IN_PROFILES[cls.DEFAULT_PROFILE])
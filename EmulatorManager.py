@@ -3,32 +3,57 @@ import subprocess
 import threading
 import time
 
+from AdbClient import AdbClient
+from CommandRunner import CommandRunner
+from DeviceTracker import DeviceTracker
+from EmulatorLaunchProfiles import EmulatorLaunchProfiles
+from EmulatorOutputCapture import EmulatorOutputCapture
+from FleetApkDeployer import FleetApkDeployer
+from SdkPackageScanner import SdkPackageScanner
+from SnapshotRegistry import SnapshotRegistry
+
 from logger_config import Logger
 logger = Logger.get_logger(__name__)
 
 
 class EmulatorManager:
+    READY_POLL_MIN_INTERVAL = 0.25  # Начальный период опроса готовности эмулятора, сек.
+    READY_POLL_MAX_INTERVAL = 2.0  # Максимальный период опроса готовности эмулятора, сек.
+    READY_COMMAND_TIMEOUT = 10.0  # Тайм-аут одного опроса по adb, сек.
+    READY_REPORT_INTERVAL = 10.0  # Период вывода сообщений об ожидании, сек.
+    SNAPSHOT_COMMAND_TIMEOUT = 300  # Тайм-аут сохранения/удаления снепшота через консоль эмулятора, сек.
+    LIST_COMMAND_TIMEOUT = 30  # Тайм-аут 'emulator -list-avds' и закрытия эмулятора, сек.
+    AVD_COMMAND_TIMEOUT = 120  # Тайм-аут создания и удаления AVD через avdmanager, сек.
+    SDK_LIST_TIMEOUT = 300  # Тайм-аут 'sdkmanager --list', сек.
+    SDK_DOWNLOAD_TIMEOUT = 3600  # Тайм-аут скачивания системного образа, сек.
+
     def __init__(self):
         self.lock = threading.Lock()
-
-
-    @staticmethod
-    def _execute_command(command):
+        self.sdk_package_scanner = SdkPackageScanner()
+        self.snapshot_registry = SnapshotRegistry()
+        self.command_runner = CommandRunner()
+        self.device_tracker = DeviceTracker()
+        self.apk_deployer = FleetApkDeployer(self.command_runner, self.snapshot_registry)
+        self.launch_flags_by_avd = {}  # Флаги, с которыми запущен каждый эмулятор (для метаданных снепшотов)
+        self.boot_snapshot_by_avd = {}  # Снепшот, с которого загружен эмулятор (None - холодная загрузка)
+        self.emulator_processes = {}  # Имя AVD -> процесс эмулятора, запущенный в этом сеансе
+        self.output_captures = {}  # Имя AVD -> захват вывода эмулятора (кольцевой буфер и лог-файл AVD)
+
+
+    def _execute_command(self, argv, timeout=CommandRunner.DEFAULT_TIMEOUT, command_type=None):
         """
-        Выполняет системную команду с обработкой ошибок.
+        Выполняет системную команду (список аргументов, без оболочки) с тайм-аутом.
+        Возвращает вывод команды или None при ошибке.
         """
         thread_name = threading.current_thread().name
+        command = subprocess.list2cmdline(argv)
 
-        try:
-            result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, shell=True)
-            if result.returncode == 0:
-                return result.stdout.strip()
-            else:
-                logger.error(f"[{thread_name}] Command failed: {command}\nError: {result.stderr}")
-                return None
-        except Exception as e:
-            logger.error(f"[{thread_name}] Failed to execute command: {command}\nException: {e}")
-            return None
+        result = self.command_runner.run(argv, timeout=timeout, command_type=command_type)
+        if result.returncode == 0:
+            return result.stdout
+        if not result.timed_out:
+            logger.error(f"[{thread_name}] Command failed: {command}\nError: {result.stderr}")
+        return None
 
 
     def _check_if_avd_exists(self, avd_name):
@@ -37,8 +62,7 @@ class EmulatorManager:
         """
         thread_name = threading.current_thread().name
 
-        command = "emulator -list-avds"
-        avd_list = self._execute_command(command)
+        avd_list = self._execute_command(["emulator", "-list-avds"], timeout=self.LIST_COMMAND_TIMEOUT)
         if avd_list:
             if avd_name in avd_list.split():
                 logger.info(f"[{thread_name}] Эмулятор {avd_name} существует.")
@@ -57,14 +81,14 @@ class EmulatorManager:
         """
         thread_name = threading.current_thread().name
         logger.info(f"[{thread_name}] Создание AVD {avd_name} с образом {system_image}...")
-        create_command = (
-            f"avdmanager create avd -n {avd_name} -k \"{system_image}\" --device \"pixel\" --force"
+        result = self._execute_command(
+            ["avdmanager", "create", "avd", "-n", avd_name, "-k", system_image, "--device", "pixel", "--force"],
+            timeout=self.AVD_COMMAND_TIMEOUT
         )
 
-        result = self._execute_command(create_command)
-
         if result is not None:
             logger.info(f"[{thread_name}] AVD {avd_name} успешно создан.")
+            self.apk_deployer.forget(avd_name)
             return True
         else:
             logger.error(f"[{thread_name}] Не удалось создать AVD {avd_name}.")
@@ -72,11 +96,23 @@ class EmulatorManager:
 
 
     def _get_installed_packages(self):
+        """
+        Возвращает список установленных пакетов SDK.
+        Пакеты определяются по файлам package.xml в ANDROID_HOME (с кэшем на диске);
+        медленный 'sdkmanager --list' запускается, только если ANDROID_HOME недоступен.
+        """
+        installed_packages = self.sdk_package_scanner.get_installed_packages()
+        if installed_packages is not None:
+            return installed_packages
+        return self._get_installed_packages_from_sdkmanager()
+
+
+    def _get_installed_packages_from_sdkmanager(self):
         """
         Возвращает список доступных пакетов из вывода команды 'sdkmanager --list'.
         """
         thread_name = threading.current_thread().name
-        command_output = self._execute_command("sdkmanager --list")
+        command_output = self._execute_command(["sdkmanager", "--list"], timeout=self.SDK_LIST_TIMEOUT)
         if not command_output:
             logger.error(f"[{thread_name}] Не удалось получить список пакетов.")
             return []
@@ -116,9 +152,9 @@ class EmulatorManager:
             logger.info(f"[{thread_name}] Образ {system_image} отсутствует. Начинаю загрузку...")
 
             # Запускаем команду скачивания в фоне, чтобы можно было отслеживать прогресс
-            download_command = f"sdkmanager \"{system_image}\" --verbose"
-
-            result = self._execute_command(download_command)
+            result = self._execute_command(
+                ["sdkmanager", system_image, "--verbose"], timeout=self.SDK_DOWNLOAD_TIMEOUT, command_type="sdkmanager install"
+            )
 
             if result is not None:
                 logger.info(f"[{thread_name}] Образ {system_image} успешно загружен.")
@@ -126,28 +162,89 @@ class EmulatorManager:
                 logger.error(f"[{thread_name}] Не удалось загрузить системный образ {system_image}.")
 
 
+    @staticmethod
+    def _query_boot_state(emulator_port, timeout):
+        """
+        Одним вызовом adb shell читает признаки готовности устройства.
+        Возвращает dict (boot_completed, bootanim_stopped, package_manager_ready)
+        или None, если устройство ещё не доступно по adb.
+        """
+        output = AdbClient.shell(
+            f"emulator-{emulator_port}",
+            "echo boot=$(getprop sys.boot_completed);"
+            "echo anim=$(getprop init.svc.bootanim);"
+            "pm path android 2>/dev/null | grep -q package: && echo pm=1 || echo pm=0",
+            timeout=timeout
+        )
+        if output is None:
+            return None
+
+        values = dict(line.strip().split("=", 1) for line in output.splitlines() if "=" in line)
+        return {
+            "boot_completed": values.get("boot") == "1",
+            "bootanim_stopped": values.get("anim") in ("stopped", ""),
+            "package_manager_ready": values.get("pm") == "1",
+        }
+
+
+    @staticmethod
+    def _is_launcher_ready(emulator_port, timeout):
+        """Проверяет, что оконный менеджер уже отдал фокус какому-либо окну (лаунчеру или приложению)."""
+        output = AdbClient.shell(f"emulator-{emulator_port}", "dumpsys window windows | grep mCurrentFocus", timeout=timeout)
+        return output is not None and "mCurrentFocus" in output and "null" not in output
+
+
     def wait_for_emulator_ready(self, avd_name, emulator_port, avd_ready_timeout=600):
         """
-        Ожидает готовности эмулятора.
+        Ожидает готовности эмулятора: загрузка завершена, анимация загрузки остановлена,
+        менеджер пакетов отвечает и лаунчер получил фокус.
+        Опрос адаптивный: начинается с 0.25 сек. и плавно увеличивается до 2 сек.,
+        поэтому готовое устройство обнаруживается почти сразу, а долгая загрузка не нагружает adb.
         """
         thread_name = threading.current_thread().name
-        logger.info(f"[{thread_name}] Ожидание готовности эмулятора...")
-
-        start_time = time.time()
-        while time.time() - start_time < avd_ready_timeout:
-            self._execute_command(f"adb -s emulator-{emulator_port} wait-for-device")
-            boot_status = self._execute_command(f"adb -s emulator-{emulator_port} shell getprop sys.boot_completed")
-            elapsed_time = int(time.time() - start_time)  # Время, прошедшее с начала ожидания
-            if boot_status == "1":
-                logger.info(f"[{thread_name}] Эмулятор готов к работе.")
-                return True
-            else:
-                # Перезаписываем сообщение с добавлением времени ожидания
+        logger.info(f"[{thread_name}] [{avd_name}] Ожидание готовности эмулятора...")
+
+        start_time = time.monotonic()
+        deadline = start_time + avd_ready_timeout
+        poll_interval = self.READY_POLL_MIN_INTERVAL
+        last_reported_at = start_time
+        stage_times = {}
+
+        # До появления устройства в adb опрашивать нечего: ждём события от отслеживания устройств
+        if not self.device_tracker.wait_for_state(f"emulator-{emulator_port}", "device", timeout=avd_ready_timeout):
+            logger.error(f"[{thread_name}] [{avd_name}] Эмулятор не подключился к adb "
+                         f"за отведённое время: {avd_ready_timeout} секунд.")
+            return False
+        stage_times["adb"] = time.monotonic() - start_time
+
+        while time.monotonic() < deadline:
+            command_timeout = max(1.0, min(self.READY_COMMAND_TIMEOUT, deadline - time.monotonic()))
+            state = self._query_boot_state(emulator_port, timeout=command_timeout)
+            now = time.monotonic()
+
+            if state is not None:
+                for stage, is_passed in state.items():
+                    if is_passed:
+                        stage_times.setdefault(stage, now - start_time)
+
+                if all(state.values()) and self._is_launcher_ready(emulator_port, timeout=command_timeout):
+                    stage_times.setdefault("launcher_ready", time.monotonic() - start_time)
+                    stages_report = ", ".join(f"{stage}: {elapsed:.1f} сек." for stage, elapsed in stage_times.items())
+                    logger.info(
+                        f"[{thread_name}] [{avd_name}] Эмулятор готов к работе за {time.monotonic() - start_time:.1f} сек. "
+                        f"({stages_report})."
+                    )
+                    return True
+
+            if now - last_reported_at >= self.READY_REPORT_INTERVAL:
+                last_reported_at = now
                 logger.warning(
                     f"[{thread_name}] [{avd_name}] Эмулятор пока еще не готов к работе. Ожидаем... "
-                    f"Прошло: {elapsed_time} секунд."
+                    f"Прошло: {int(now - start_time)} секунд. Состояние: {state or 'нет связи по adb'}."
                 )
-            time.sleep(10)
+
+            time.sleep(min(poll_interval, max(0.0, deadline - time.monotonic())))
+            poll_interval = min(poll_interval * 1.5, self.READY_POLL_MAX_INTERVAL)
 
         logger.error(f"[{thread_name}] [{avd_name}] Эмулятор не стал готов к работе "
                       f"за отведённое время: {avd_ready_timeout} секунд.")
@@ -183,6 +280,8 @@ class EmulatorManager:
             ram_size: str,
             disk_size: str,
             avd_ready_timeout: int,
+            launch_profile: str = EmulatorLaunchProfiles.DEFAULT_PROFILE,
+            cpu_cores: int = 1,
     ):
         """
         Создаёт или запускает эмулятор, ожидая его готовности.
@@ -194,7 +293,7 @@ class EmulatorManager:
             if not self._check_if_avd_exists(avd_name):
                 logger.info(f"[{thread_name}] Поскольку AVD {avd_name} отсутствует в списке AVD - создаю новый AVD...")
                 if self._create_avd(avd_name, system_image):
-                    self._update_avd_config(avd_name, ram_size=f"{ram_size}", disk_size=f"{disk_size}")
+                    self._update_avd_config(avd_name, ram_size=f"{ram_size}", disk_size=f"{disk_size}", cpu_cores=f"{cpu_cores}")
                     logger.info(f"[{thread_name}] AVD {avd_name} успешно создан.")
             else:
                 logger.error(f"[{thread_name}] Не удалось создать AVD {avd_name}. Прерывание...")
@@ -204,7 +303,8 @@ class EmulatorManager:
             self.start_emulator_with_optional_snapshot(
                 avd_name=avd_name,
                 emulator_port=emulator_port,
-                avd_ready_timeout=avd_ready_timeout
+                avd_ready_timeout=avd_ready_timeout,
+                launch_profile=launch_profile
             )
 
             return True
@@ -219,85 +319,49 @@ class EmulatorManager:
             avd_name: str,
             avd_ready_timeout: int,
             emulator_port: int,
+            launch_profile: str = EmulatorLaunchProfiles.DEFAULT_PROFILE,
     ):
         """
         Универсальный метод для запуска эмулятора с возможностью загрузки/создания снепшота.
         """
         thread_name = threading.current_thread().name
-        snapshots_dir = os.path.expanduser(f"~/.android/avd/{avd_name}.avd/snapshots/")
-
-        project_dir = os.path.dirname(os.path.abspath(__file__))
-
-        # Пути для лог-файлов
-        stdout_log_path = os.path.join(project_dir, f"{avd_name}_stdout.log")
-        stderr_log_path = os.path.join(project_dir, f"{avd_name}_stderr.log")
-
-        logger.info(f"[{thread_name}] Лог-файлы будут сохранены в:")
-        logger.info(f"  [stdout]: {stdout_log_path}")
-        logger.info(f"  [stderr]: {stderr_log_path}")
-
-        # Определение самого актуального снепшота
-        latest_snapshot = None
-        if os.path.exists(snapshots_dir):
-            snapshots = [f for f in os.listdir(snapshots_dir) if os.path.isdir(os.path.join(snapshots_dir, f))]
-            if snapshots:
-                latest_snapshot = max(snapshots, key=lambda snap: os.path.getmtime(os.path.join(snapshots_dir, snap)))
-                logger.info(f"[{thread_name}] Найден самый актуальный снепшот: {latest_snapshot}.")
-
-        # Формирование команды для запуска эмулятора
-        snapshot_command = f"emulator -avd {avd_name} -port {emulator_port} -gpu auto -verbose"
-        if latest_snapshot:
-            snapshot_command += f" -snapshot {latest_snapshot}"
-            logger.info(f"[{thread_name}] Используем снепшот '{latest_snapshot}' для запуска эмулятора.")
-        else:
-            logger.info(f"[{thread_name}] Снепшоты отсутствуют. Эмулятор будет запущен без снепшота.")
 
-        # Открытие файлов для записи логов
-        stdout_log = open(stdout_log_path, "w")
-        stderr_log = open(stderr_log_path, "w")
+        output_capture = self._get_output_capture(avd_name)
+
+        launch_flags = EmulatorLaunchProfiles.get_flags(launch_profile)
+        self.launch_flags_by_avd[avd_name] = launch_flags
+        logger.info(f"[{thread_name}] Профиль запуска эмулятора {avd_name}: '{launch_profile}'.")
+
+        # Выбор снепшота по имени ('authorized', затем 'configured') с проверкой его метаданных
+        snapshot_name, snapshot_to_regenerate = self.snapshot_registry.choose_snapshot(avd_name, launch_flags)
+        self.boot_snapshot_by_avd[avd_name] = None
+
+        # Формирование команды для запуска эмулятора (список аргументов, без оболочки)
+        emulator_argv = ["emulator", "-avd", avd_name, "-port", str(emulator_port), *launch_flags]
+        if snapshot_name:
+            emulator_argv += ["-snapshot", snapshot_name]
+            logger.info(f"[{thread_name}] Используем снепшот '{snapshot_name}' для запуска эмулятора.")
+        else:
+            emulator_argv.append("-no-snapshot-load")
+            logger.info(f"[{thread_name}] Подходящих снепшотов нет. Эмулятор будет запущен холодной загрузкой.")
 
         try:
-            # Запуск эмулятора с выводом в лог-файлы
+            # Запуск эмулятора: вывод захватывается в кольцевой буфер и пачками пишется в лог AVD.
+            # Своя группа процессов позволяет при неудачной загрузке завершить эмулятор вместе с дочерними процессами
+            boot_started_at = time.monotonic()
             process = subprocess.Popen(
-                snapshot_command,
+                CommandRunner.resolve_argv(emulator_argv),
+                stdin=subprocess.DEVNULL,
                 stdout=subprocess.PIPE,
                 stderr=subprocess.PIPE,
-                shell=True,
                 text=True,
-                bufsize=1
+                bufsize=1,
+                **CommandRunner.process_group_kwargs()
             )
+            self.emulator_processes[avd_name] = process
+            output_capture.attach(process)
             logger.info(f"[{thread_name}] Эмулятор {avd_name} запущен. Ожидание загрузки...")
 
-            # Чтение потоков в реальном времени
-            def read_stream(stream, log_file, log_func):
-                try:
-                    for line in stream:
-                        line = line.strip()
-                        if line:
-                            log_func(f"[{thread_name}] {line}")
-                            try:
-                                log_file.write(line + "\n")
-                                log_file.flush()
-                            except ValueError as e:
-                                log_func(f"[{thread_name}] Ошибка записи в файл: {e}")
-                                break  # Выход из цикла, если файл закрыт
-                except Exception as e:
-                    log_func(f"[{thread_name}] Необработанная ошибка: {e}")
-
-            stdout_thread = threading.Thread(
-                target=read_stream,
-                args=(process.stdout, stdout_log, logger.info),
-                daemon=True
-            )
-            stderr_thread = threading.Thread(
-                target=read_stream,
-                args=(process.stderr, stderr_log, logger.error),
-                daemon=True
-            )
-
-            stdout_thread.start()
-            stderr_thread.start()
-
             # Ждём готовности эмулятора
             if not self.wait_for_emulator_ready(
                     avd_name=avd_name,
@@ -305,48 +369,102 @@ class EmulatorManager:
                     avd_ready_timeout=avd_ready_timeout
             ):
                 logger.error(f"[{thread_name}] Эмулятор {avd_name} не стал готов к работе.")
-                process.terminate()
+                output_capture.dump_to_log("Эмулятор не загрузился")
+                CommandRunner.kill_process_tree(process)
                 return False
 
+            if snapshot_name and not self.snapshot_registry.record_boot(
+                    avd_name, snapshot_name, time.monotonic() - boot_started_at, launch_flags
+            ):
+                snapshot_to_regenerate = snapshot_name
+            elif snapshot_name:
+                self.boot_snapshot_by_avd[avd_name] = snapshot_name
+
+            if snapshot_to_regenerate:
+                # Пересохранение сразу после загрузки, до создания сессии Appium и установки APK:
+                # сохранение приостанавливает виртуальную машину и не должно пересекаться с ними
+                logger.info(f"[{thread_name}] [{avd_name}] Пересохранение устаревшего снепшота '{snapshot_to_regenerate}'...")
+                self.save_snapshot(avd_name, emulator_port, snapshot_to_regenerate)
+
         finally:
-            # Гарантированно закрываем файлы
-            stdout_log.close()
-            stderr_log.close()
+            output_capture.flush()
 
         return process
 
 
-    @staticmethod
-    def save_snapshot(avd_name, emulator_port, snapshot_name):
+    def _get_output_capture(self, avd_name):
+        with self.lock:
+            if avd_name not in self.output_captures:
+                log_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), f"{avd_name}_emulator.log")
+                self.output_captures[avd_name] = EmulatorOutputCapture(avd_name, log_path)
+                logger.info(f"[{avd_name}] Вывод эмулятора будет сохраняться в {log_path}.")
+            return self.output_captures[avd_name]
+
+
+    def dump_emulator_output(self, avd_name, reason):
+        """Выводит в основной лог последние строки вывода эмулятора (при сбое)."""
+        output_capture = self.output_captures.get(avd_name)
+        if output_capture is not None:
+            output_capture.dump_to_log(reason)
+
+
+    def is_emulator_process_alive(self, avd_name):
+        """
+        Возвращает True/False, если процесс эмулятора запущен в этом сеансе, и None,
+        если процесса нет (например, эмулятор подхвачен из пула) - тогда проверять нужно через adb.
+        """
+        process = self.emulator_processes.get(avd_name)
+        if process is None:
+            return None
+        return process.poll() is None
+
+
+    def save_snapshot(self, avd_name, emulator_port, snapshot_name):
         """
-        Сохраняет снепшот эмулятора.
+        Сохраняет снепшот эмулятора и записывает рядом с ним метаданные для проверки при следующей загрузке.
         """
         thread_name = threading.current_thread().name
 
-        command = f"adb -s emulator-{emulator_port} emu avd snapshot save {snapshot_name}"
-        result = subprocess.run(command, shell=True, capture_output=True)
-        if result.returncode == 0:
+        if AdbClient.emu(emulator_port, f"avd snapshot save {snapshot_name}", timeout=self.SNAPSHOT_COMMAND_TIMEOUT) is not None:
             logger.info(f"[{thread_name}] [{avd_name}] Snapshot '{snapshot_name}' успешно сохранён.")
+            self.snapshot_registry.record_saved(
+                avd_name,
+                snapshot_name,
+                self.launch_flags_by_avd.get(avd_name, EmulatorLaunchProfiles.get_flags(EmulatorLaunchProfiles.DEFAULT_PROFILE))
+            )
+            return True
         else:
-            logger.error(f"[{thread_name}] [{avd_name}] Ошибка сохранения snapshot '{snapshot_name}': {result.stderr.decode()}")
+            logger.error(f"[{thread_name}] [{avd_name}] Ошибка сохранения snapshot '{snapshot_name}'.")
+            return False
 
 
-    @staticmethod
-    def delete_snapshot(avd_name, emulator_port, snapshot_name):
+    def ensure_apk_installed(self, avd_name, emulator_port):
+        """
+        Устанавливает актуальный APK Telegram на загруженный эмулятор (см. FleetApkDeployer).
+        Если эмулятор загружен со снепшота, после установки снепшот пересохраняется: иначе следующая
+        загрузка вернёт прежнюю версию. Возвращает True, если на устройстве актуальная версия.
+        """
+        boot_snapshot = self.boot_snapshot_by_avd.get(avd_name)
+        result = self.apk_deployer.ensure_installed(avd_name, f"emulator-{emulator_port}", boot_snapshot)
+        if result == FleetApkDeployer.INSTALLED and boot_snapshot:
+            if self.save_snapshot(avd_name, emulator_port, boot_snapshot):
+                self.apk_deployer.remember(avd_name, boot_snapshot)
+        return result != FleetApkDeployer.FAILED
+
+
+    def delete_snapshot(self, avd_name, emulator_port, snapshot_name):
         thread_name = threading.current_thread().name
 
-        command = f"adb -s emulator-{emulator_port} emu avd snapshot delete {snapshot_name}"
-        result = subprocess.run(command, shell=True, capture_output=True)
-        if result.returncode == 0:
+        if AdbClient.emu(emulator_port, f"avd snapshot delete {snapshot_name}", timeout=self.SNAPSHOT_COMMAND_TIMEOUT) is not None:
             logger.info(f"[{thread_name}] [{avd_name}]: Snapshot '{snapshot_name}' успешно удалён.")
         else:
-            logger.error(f"[{thread_name}] [{avd_name}]: Ошибка удаления snapshot '{snapshot_name}': {result.stderr.decode()}")
+            logger.error(f"[{thread_name}] [{avd_name}]: Ошибка удаления snapshot '{snapshot_name}'.")
 
 
     @staticmethod
-    def _update_avd_config(avd_name, ram_size="1024", disk_size="1024"):
+    def _update_avd_config(avd_name, ram_size="1024", disk_size="1024", cpu_cores="1"):
         """
-        Обновляет параметры AVD после его создания: RAM, Disk Size.
+        Обновляет параметры AVD после его создания: RAM, Disk Size, количество ядер.
         """
         thread_name = threading.current_thread().name
 
@@ -361,6 +479,8 @@ class EmulatorManager:
                             line = f"hw.ramSize={ram_size}\n"
                         elif line.startswith("disk.dataPartition.size"):
                             line = f"disk.dataPartition.size={disk_size}M\n"
+                        elif line.startswith("hw.cpu.ncore"):
+                            line = f"hw.cpu.ncore={cpu_cores}\n"
                         updated_lines.append(line)
             except Exception as e:
                 logger.error(f"[{thread_name}] Ошибка в обновлении конфига AVD: {e}")
@@ -370,6 +490,8 @@ class EmulatorManager:
                 updated_lines.append(f"hw.ramSize={ram_size}\n")
             if not any("disk.dataPartition.size" in l for l in updated_lines):
                 updated_lines.append(f"disk.dataPartition.size={disk_size}\n")
+            if not any("hw.cpu.ncore" in l for l in updated_lines):
+                updated_lines.append(f"hw.cpu.ncore={cpu_cores}\n")
 
             # Записываем обновлённый конфиг
             with open(config_path, "w") as file:
@@ -379,6 +501,45 @@ class EmulatorManager:
             logger.error(f"[{thread_name}] Конфигурационный файл {config_path} не найден.")
 
 
+    def apply_avd_resources(self, avd_name, ram_size, cpu_cores):
+        """
+        Приводит ОЗУ и количество ядер уже существующего AVD к плану запуска (размер диска не меняется).
+        Если параметры изменились, снепшоты AVD помечаются устаревшими: они сохранены с прежним железом.
+        Возвращает True, если конфигурация была изменена.
+        """
+        thread_name = threading.current_thread().name
+        config_path = os.path.expanduser(f"~/.android/avd/{avd_name}.avd/config.ini")
+        if not os.path.exists(config_path):
+            logger.error(f"[{thread_name}] Конфигурационный файл {config_path} не найден.")
+            return False
+
+        target_values = {"hw.ramSize": f"{ram_size}", "hw.cpu.ncore": f"{cpu_cores}"}
+        with open(config_path, "r") as file:
+            lines = file.readlines()
+        current_values = {}
+        for line in lines:
+            key, separator, value = line.partition("=")
+            if separator and key.strip() in target_values:
+                current_values[key.strip()] = value.strip().upper().removesuffix("MB").removesuffix("M")
+        if current_values == target_values:
+            return False
+
+        updated_lines = [
+            f"{key.strip()}={target_values[key.strip()]}\n" if separator and key.strip() in target_values else line
+            for line in lines
+            for key, separator, _ in [line.partition("=")]
+        ]
+        updated_lines += [f"{key}={value}\n" for key, value in target_values.items() if key not in current_values]
+        with open(config_path, "w") as file:
+            file.writelines(updated_lines)
+        logger.info(
+            f"[{thread_name}] [{avd_name}] Конфигурация AVD приведена к плану запуска: ОЗУ {ram_size} МБ, "
+            f"ядер {cpu_cores} (было: ОЗУ {current_values.get('hw.ramSize', '?')} МБ, ядер {current_values.get('hw.cpu.ncore', '?')})."
+        )
+        self.snapshot_registry.mark_stale(avd_name, "изменены ОЗУ или количество ядер AVD")
+        return True
+
+
     def delete_emulator(self, avd_name, emulator_port, snapshot_name):
         """
         Удаляет эмулятор с указанным именем.
@@ -387,10 +548,10 @@ class EmulatorManager:
 
         try:
             logger.info(f"[{thread_name}] Удаление эмулятора {avd_name}...")
-            delete_command = f"avdmanager delete avd -n {avd_name}"
-            result = self._execute_command(delete_command)
+            result = self._execute_command(["avdmanager", "delete", "avd", "-n", avd_name], timeout=self.AVD_COMMAND_TIMEOUT)
             if result is not None:
                 logger.info(f"[{thread_name}] Эмулятор {avd_name} успешно удалён.")
+                self.apk_deployer.forget(avd_name)
                 try:
                     self.delete_snapshot(avd_name, emulator_port, snapshot_name)
                 except Exception as e:
@@ -407,9 +568,7 @@ class EmulatorManager:
 
     def close_emulator(self, thread_name, avd_name, emulator_port):
         try:
-            stop_command = f"adb -s emulator-{emulator_port} emu kill"
-            result = self._execute_command(stop_command)
-            if result is not None:
+            if AdbClient.emu(emulator_port, "kill") is not None:
                 logger.info(f"[{thread_name}] Эмулятор {avd_name} на порту {emulator_port} успешно завершён.")
                 return True
             else:
@@ -436,12 +595,16 @@ class EmulatorManager:
 
             logger.info(f"[{thread_name}] Найдено {len(avds)} AVD: {', '.join(avds)}.")
 
-            for avd_name in avds:
-                logger.info(f"[{thread_name}] Удаление AVD {avd_name}...")
-                delete_command = f"avdmanager delete avd -n {avd_name}"
-                result = self._execute_command(delete_command)
-                if result:
+            # Все AVD удаляются параллельно
+            results = self.command_runner.run_many(
+                [["avdmanager", "delete", "avd", "-n", avd_name] for avd_name in avds],
+                timeout=self.AVD_COMMAND_TIMEOUT,
+                command_type="avdmanager delete"
+            )
+            for avd_name, result in zip(avds, results):
+                if result.returncode == 0:
                     logger.info(f"[{thread_name}] AVD {avd_name} успешно удалён.")
+                    self.apk_deployer.forget(avd_name)
                 else:
                     logger.error(f"[{thread_name}] Не удалось удалить AVD {avd_name}. Продолжаем удаление остальных.")
             return True
@@ -450,24 +613,72 @@ class EmulatorManager:
             return False
 
 
-    @staticmethod
-    def get_avd_list():
+    def get_avd_list(self):
         """
         Возвращает список доступных AVD, используя emulator -list-avds.
         """
-        try:
-            # Выполнение команды emulator -list-avds
-            result = subprocess.run(
-                ["emulator", "-list-avds"],
-                capture_output=True,
-                text=True,
-                check=True
-            )
-            avd_list = result.stdout.splitlines()
-            return avd_list
-        except subprocess.CalledProcessError as e:
-            logger.error(f"Ошибка при вызове emulator: {e}")
+        result = self.command_runner.run(["emulator", "-list-avds"], timeout=self.LIST_COMMAND_TIMEOUT)
+        if result.returncode != 0:
+            logger.error(f"Ошибка при вызове emulator -list-avds: {result.stderr or 'тайм-аут'}")
             return []
-        except Exception as e:
-            logger.error(f"Ошибка при обработке списка AVD: {e}")
-            return []
\ No newline at end of file
+        return [line.strip() for line in result.stdout.splitlines() if line.strip()]
+
+
+    def kill_all_emulators(self):
+        """Параллельно закрывает все запущенные эмуляторы. Возвращает количество закрытых."""
+        thread_name = threading.current_thread().name
+        emulator_ports = [
+            int(serial.split("-", 1)[1]) for serial in AdbClient.devices() if serial.startswith("emulator-")
+        ]
+        results = self.command_runner.call_many(
+            [lambda port=port: AdbClient.emu(port, "kill") for port in emulator_ports],
+            timeout=self.LIST_COMMAND_TIMEOUT,
+            command_type="emu kill"
+        )
+        killed_count = sum(1 for result in results if result is not None)
+        logger.info(f"[{thread_name}] Закрыто эмуляторов: {killed_count} из {len(emulator_ports)}.")
+        return killed_count
+
+
+    def save_all_snapshots(self):
+        """
+        Параллельно пересохраняет снепшоты всех запущенных эмуляторов: каждый - под именем снепшота,
+        с которого он загружен в этом сеансе. Эмуляторы после холодной загрузки или запущенные не этим
+        сеансом пропускаются. Возвращает количество сохранённых снепшотов.
+        """
+        thread_name = threading.current_thread().name
+        emulator_ports = [
+            int(serial.split("-", 1)[1]) for serial in AdbClient.devices() if serial.startswith("emulator-")
+        ]
+        avd_names = self.command_runner.call_many(
+            [lambda port=port: AdbClient.emu(port, "avd name") for port in emulator_ports],
+            timeout=self.LIST_COMMAND_TIMEOUT,
+            command_type="emu avd name"
+        )
+
+        snapshot_targets = []
+        for emulator_port, avd_name in zip(emulator_ports, avd_names):
+            avd_name = avd_name.splitlines()[0].strip() if avd_name else None
+            snapshot_name = self.boot_snapshot_by_avd.get(avd_name) if avd_name else None
+            if snapshot_name is None:
+                logger.info(f"[{thread_name}] [emulator-{emulator_port}] Снепшот загрузки неизвестен, сохранение пропущено.")
+                continue
+            snapshot_targets.append((avd_name, emulator_port, snapshot_name))
+
+        results = self.command_runner.call_many(
+            [
+                lambda target=target: self.save_snapshot(*target)
+                for target in snapshot_targets
+            ],
+            timeout=self.SNAPSHOT_COMMAND_TIMEOUT,
+            command_type="emu avd snapshot save"
+        )
+        saved_count = sum(1 for result in results if result)
+        logger.info(f"[{thread_name}] Сохранено снепшотов: {saved_count} из {len(emulator_ports)} запущенных эмуляторов.")
+        return saved_count
+
+
+    def log_command_stats(self):
+        """Выводит в лог статистику внешних команд по типам: количество, ошибки, тайм-ауты, время."""
+        for command_type, stats in self.command_runner.get_stats().items():
+            logger.info(f"Команды '{command_type}': {stats}")
@@ -0,0 +1,127 @@
+import logging
+import threading
+import time
+from collections import deque
+from logging.handlers import RotatingFileHandler
+
+from logger_config import Logger
+logger = Logger.get_logger(__name__)
+
+
+class EmulatorOutputCapture:
+    """
+    Захват stdout/stderr процесса эмулятора.
+    Строки попадают в кольцевой буфер фиксированного размера (последние BUFFER_LINES строк) и пачками
+    дописываются в ротируемый файл лога AVD; отдельный поток дописывает накопленное по таймеру,
+    даже если эмулятор замолчал. В основной лог вывод эмулятора попадает только через
+    dump_to_log() - при неудачной загрузке или перезапуске эмулятора после сбоя.
+    Один объект используется для AVD весь сеанс: после перезапуска эмулятора к нему подключается новый процесс.
+    """
+    BUFFER_LINES = 2000  # Сколько последних строк вывода хранится в памяти
+    DUMP_LINES = 200  # Сколько последних строк выводится в основной лог при сбое
+    FLUSH_LINES = 200  # Запись в файл пачками по столько строк...
+    FLUSH_INTERVAL = 2.0  # ...или не реже, чем раз в столько секунд
+    LOG_MAX_BYTES = 5 * 1024 * 1024
+    LOG_BACKUP_COUNT = 2
+
+    def __init__(self, avd_name, log_path):
+        self.avd_name = avd_name
+        self.log_path = log_path
+        self.lock = threading.Lock()
+        self.buffer = deque(maxlen=self.BUFFER_LINES)
+        self.pending_lines = []
+        self.last_flush_at = time.monotonic()
+        self.file_handler = RotatingFileHandler(
+            log_path, maxBytes=self.LOG_MAX_BYTES, backupCount=self.LOG_BACKUP_COUNT, encoding="utf-8", delay=True
+        )
+        self.reader_threads = []
+        self.flusher_thread = None
+
+
+    def attach(self, process):
+        """Запускает чтение stdout и stderr процесса эмулятора в фоновых потоках."""
+        self.reader_threads = [reader_thread for reader_thread in self.reader_threads if reader_thread.is_alive()]
+        for stream, stream_name in ((process.stdout, "stdout"), (process.stderr, "stderr")):
+            reader_thread = threading.Thread(
+                target=self._read_stream,
+                args=(stream, stream_name),
+                name=f"EmulatorOutput-{self.avd_name}-{stream_name}",
+                daemon=True
+            )
+            reader_thread.start()
+            self.reader_threads.append(reader_thread)
+
+        if self.flusher_thread is None or not self.flusher_thread.is_alive():
+            self.flusher_thread = threading.Thread(
+                target=self._flush_loop, name=f"EmulatorOutput-{self.avd_name}-flush", daemon=True
+            )
+            self.flusher_thread.start()
+
+
+    def _flush_loop(self):
+        """Дописывает строки, пролежавшие дольше FLUSH_INTERVAL, пока процесс эмулятора пишет вывод."""
+        while any(reader_thread.is_alive() for reader_thread in self.reader_threads):
+            with self.lock:
+                flush_deadline = self.last_flush_at + self.FLUSH_INTERVAL
+                has_pending_lines = bool(self.pending_lines)
+            if has_pending_lines and time.monotonic() >= flush_deadline:
+                self.flush()
+                continue
+            time.sleep(max(0.1, flush_deadline - time.monotonic()) if has_pending_lines else self.FLUSH_INTERVAL)
+
+
+    def _read_stream(self, stream, stream_name):
+        prefix = "[stderr] " if stream_name == "stderr" else ""
+        try:
+            for line in stream:
+                line = line.rstrip()
+                if line:
+                    self._append(prefix + line)
+        except Exception as e:
+            logger.warning(f"[{self.avd_name}] Ошибка чтения вывода эмулятора ({stream_name}): {e}")
+        finally:
+            self.flush()
+
+
+    def _append(self, line):
+        with self.lock:
+            self.buffer.append(line)
+            self.pending_lines.append(line)
+            should_flush = (
+                len(self.pending_lines) >= self.FLUSH_LINES
+                or time.monotonic() - self.last_flush_at >= self.FLUSH_INTERVAL
+            )
+        if should_flush:
+            self.flush()
+
+
+    def flush(self):
+        """Дописывает накопленные строки в файл лога AVD одной записью."""
+        with self.lock:
+            lines, self.pending_lines = self.pending_lines, []
+            self.last_flush_at = time.monotonic()
+            if not lines:
+                return
+            try:
+                self.file_handler.emit(logging.makeLogRecord({"msg": "\n".join(lines)}))
+            except Exception as e:
+                logger.warning(f"[{self.avd_name}] Не удалось записать вывод эмулятора в {self.log_path}: {e}")
+
+
+    def get_tail(self, line_count=None):
+        with self.lock:
+            return list(self.buffer)[-(line_count or self.DUMP_LINES):]
+
+
+    def dump_to_log(self, reason):
+        """Выводит последние строки вывода эмулятора в основной лог."""
+        thread_name = threading.current_thread().name
+        self.flush()
+        tail = self.get_tail()
+        if not tail:
+            logger.error(f"[{thread_name}] [{self.avd_name}] {reason}. Вывод эмулятора пуст.")
+            return
+        logger.error(
+            f"[{thread_name}] [{self.avd_name}] {reason}. Последние {len(tail)} строк вывода эмулятора "
+            f"(полностью - в {self.log_path}):\n" + "\n".join(tail)
+        )
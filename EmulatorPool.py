@@ -0,0 +1,148 @@
+import json
+import os
+import threading
+import time
+
+import requests
+
+from AdbClient import AdbClient
+from AndroidDriverManager import AndroidDriverManager
+
+from logger_config import Logger
+logger = Logger.get_logger(__name__)
+
+
+class EmulatorPool:
+    """
+    Пул «тёплых» эмуляторов, переживающий перезапуск программы.
+    В режиме пула эмуляторы и их Appium-серверы после обработки не закрываются, а регистрируются
+    в файле состояния. При следующем запуске живой и исправный эмулятор с тем же именем AVD на том же порту
+    подхватывается без загрузки. Эмуляторы, простаивающие дольше idle_timeout, закрываются.
+    """
+    STATE_FILE = "emulator_pool_state.json"  # Имя файла состояния пула
+    REAPER_INTERVAL = 60  # Период проверки простаивающих эмуляторов, сек.
+    COMMAND_TIMEOUT = 10  # Тайм-аут команд adb и запроса к Appium при проверке эмулятора, сек.
+
+    def __init__(self, idle_timeout: float = 1800, state_file=STATE_FILE):
+        self.idle_timeout = idle_timeout
+        self.state_file = state_file
+        self.lock = threading.Lock()
+        self.reaper_thread = None
+
+
+    def _read_state(self):
+        if not os.path.exists(self.state_file):
+            return {}
+        try:
+            with open(self.state_file, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (json.JSONDecodeError, IOError) as e:
+            logger.warning(f"Не удалось прочитать состояние пула эмуляторов: {e}")
+            return {}
+
+
+    # noinspection PyTypeChecker
+    def _write_state(self, state):
+        with open(self.state_file, "w", encoding="utf-8") as f:
+            json.dump(state, f, ensure_ascii=False, indent=4)
+
+
+    def is_healthy(self, avd_name, emulator_port, appium_port):
+        """
+        Проверяет, что на порту работает именно этот AVD, он загружен и отвечает, а его Appium-сервер доступен.
+        """
+        running_avd_name = AdbClient.emu(emulator_port, "avd name", timeout=self.COMMAND_TIMEOUT)
+        if not running_avd_name or running_avd_name.splitlines()[0].strip() != avd_name:
+            return False
+        if AdbClient.shell(f"emulator-{emulator_port}", "getprop sys.boot_completed", timeout=self.COMMAND_TIMEOUT) != "1":
+            return False
+        try:
+            return requests.get(f"http://127.0.0.1:{appium_port}/status", timeout=self.COMMAND_TIMEOUT).status_code == 200
+        except requests.exceptions.RequestException:
+            return False
+
+
+    def try_reattach(self, avd_name, emulator_port, appium_port):
+        """
+        Забирает эмулятор из пула. Возвращает True, если эмулятор с этим AVD и портами
+        остался запущенным с прошлого раза и исправен; иначе удаляет запись о нём и возвращает False.
+        """
+        thread_name = threading.current_thread().name
+        with self.lock:
+            state = self._read_state()
+            entry = state.pop(avd_name, None)
+            self._write_state(state)
+
+        if entry is None:
+            return False
+        if entry.get("emulator_port") != emulator_port or entry.get("appium_port") != appium_port:
+            logger.info(f"[{thread_name}] [{avd_name}] Эмулятор из пула запущен на других портах, подхватить нельзя.")
+            self._shutdown(avd_name, entry)
+            return False
+        if not self.is_healthy(avd_name, emulator_port, appium_port):
+            logger.info(f"[{thread_name}] [{avd_name}] Эмулятор из пула не отвечает, будет выполнен обычный запуск.")
+            self._shutdown(avd_name, entry)
+            return False
+
+        logger.info(f"[{thread_name}] [{avd_name}] Подхвачен работающий эмулятор из пула на порту {emulator_port}.")
+        return True
+
+
+    def release(self, avd_name, emulator_port, appium_port):
+        """Возвращает эмулятор в пул: он остаётся запущенным до следующего запуска или до истечения простоя."""
+        thread_name = threading.current_thread().name
+        with self.lock:
+            state = self._read_state()
+            state[avd_name] = {
+                "emulator_port": emulator_port,
+                "appium_port": appium_port,
+                "released_at": time.time(),
+            }
+            self._write_state(state)
+        logger.info(f"[{thread_name}] [{avd_name}] Эмулятор и Appium-сервер оставлены запущенными в пуле.")
+
+
+    def reap_idle(self):
+        """Закрывает эмуляторы пула, простаивающие дольше idle_timeout."""
+        now = time.time()
+        with self.lock:
+            state = self._read_state()
+            expired = {
+                avd_name: entry for avd_name, entry in state.items()
+                if now - entry.get("released_at", 0) >= self.idle_timeout
+            }
+            for avd_name in expired:
+                del state[avd_name]
+            if expired:
+                self._write_state(state)
+
+        for avd_name, entry in expired.items():
+            logger.info(f"[{avd_name}] Эмулятор простаивал в пуле дольше {int(self.idle_timeout)} сек. и будет закрыт.")
+            self._shutdown(avd_name, entry)
+
+
+    def start_reaper(self):
+        """Запускает фоновый поток, периодически закрывающий простаивающие эмуляторы."""
+        if self.reaper_thread is not None:
+            return
+
+        def reaper_loop():
+            while True:
+                try:
+                    self.reap_idle()
+                except Exception as e:
+                    logger.error(f"Ошибка при закрытии простаивающих эмуляторов пула: {e}")
+                time.sleep(self.REAPER_INTERVAL)
+
+        self.reaper_thread = threading.Thread(target=reaper_loop, name="EmulatorPoolReaper", daemon=True)
+        self.reaper_thread.start()
+
+
+    def _shutdown(self, avd_name, entry):
+        emulator_port = entry.get("emulator_port")
+        appium_port = entry.get("appium_port")
+        if emulator_port:
+            AdbClient.emu(emulator_port, "kill", timeout=self.COMMAND_TIMEOUT)
+        if appium_port and not AndroidDriverManager.is_port_free(appium_port):
+            AndroidDriverManager.free_port(appium_port)
+        logger.info(f"[{avd_name}] Эмулятор пула на порту {emulator_port} и Appium-сервер на порту {appium_port} закрыты.")
@@ -0,0 +1,164 @@
+import threading
+import time
+
+from logger_config import Logger
+logger = Logger.get_logger(__name__)
+
+
+class EmulatorSupervisor:
+    """
+    Наблюдатель за слотом эмулятора. Фоновый поток периодически проверяет, что процесс эмулятора жив,
+    ADB-соединение с ним не потеряно, а проверка текущего номера не длится дольше progress_timeout.
+    О пропаже устройства из adb наблюдатель узнаёт сразу от DeviceTracker.
+    При сбое эмулятор принудительно закрывается (это прерывает зависший вызов Appium в рабочем потоке),
+    а рабочий поток по has_failed() возвращает номер в очередь и перезапускает эмулятор со снепшота.
+    """
+    CHECK_INTERVAL = 5  # Период проверки эмулятора, сек.
+    TRANSPORT_LOSS_CHECKS = 3  # Сколько проверок подряд устройство должно отсутствовать в adb, чтобы считать связь потерянной
+
+    def __init__(self, avd_name, emulator_port, emulator_manager, terminate_flag, progress_timeout=180, max_restarts=3):
+        self.avd_name = avd_name
+        self.emulator_port = emulator_port
+        self.emulator_manager = emulator_manager
+        self.terminate_flag = terminate_flag
+        self.progress_timeout = progress_timeout
+        self.max_restarts = max_restarts
+
+        self.lock = threading.Lock()
+        self.is_active = threading.Event()  # Наблюдение ведётся только между загрузками эмулятора
+        self.stop_event = threading.Event()
+        self.watch_thread = None
+        self.check_started_at = None
+        self.failure_reason = None
+        self.transport_loss_count = 0
+        self.restart_count = 0
+
+
+    def start(self):
+        """Запускает фоновое наблюдение за эмулятором."""
+        if self.watch_thread is not None:
+            return
+        self.is_active.set()
+        self.emulator_manager.device_tracker.add_disappear_callback(f"emulator-{self.emulator_port}", self._on_device_disappeared)
+        self.watch_thread = threading.Thread(
+            target=self._watch_loop, name=f"EmulatorSupervisor-{self.avd_name}", daemon=True
+        )
+        self.watch_thread.start()
+
+
+    def stop(self):
+        self.emulator_manager.device_tracker.remove_disappear_callback(f"emulator-{self.emulator_port}", self._on_device_disappeared)
+        self.stop_event.set()
+        self.is_active.set()  # Будим поток, если он ждёт возобновления наблюдения
+
+
+    def begin_check(self):
+        """Отмечает начало проверки номера: с этого момента отсчитывается тайм-аут отсутствия прогресса."""
+        with self.lock:
+            self.check_started_at = time.monotonic()
+
+
+    def end_check(self):
+        with self.lock:
+            self.check_started_at = None
+
+
+    def has_failed(self):
+        with self.lock:
+            return self.failure_reason is not None
+
+
+    def can_restart(self):
+        with self.lock:
+            return self.restart_count < self.max_restarts
+
+
+    def _get_transport_state(self):
+        return self.emulator_manager.device_tracker.get_state(f"emulator-{self.emulator_port}")
+
+
+    def _on_device_disappeared(self, serial):
+        if self.is_active.is_set():
+            self._mark_failed("эмулятор пропал из списка устройств adb")
+
+
+    def detect_failure(self):
+        """Возвращает причину сбоя эмулятора или None, если он исправен."""
+        if self.emulator_manager.is_emulator_process_alive(self.avd_name) is False:
+            return "процесс эмулятора завершился"
+
+        # Счётчик меняют и поток наблюдения, и рабочий поток (check_now, mark_restarted)
+        is_transport_alive = self._get_transport_state() == "device"
+        with self.lock:
+            if is_transport_alive:
+                self.transport_loss_count = 0
+            else:
+                self.transport_loss_count += 1
+            transport_loss_count = self.transport_loss_count
+            check_started_at = self.check_started_at
+        if transport_loss_count >= self.TRANSPORT_LOSS_CHECKS:
+            return "потеряно ADB-соединение с эмулятором"
+
+        if check_started_at is not None and time.monotonic() - check_started_at > self.progress_timeout:
+            return f"проверка номера не продвигается дольше {self.progress_timeout} сек"
+        return None
+
+
+    def check_now(self):
+        """
+        Немедленная проверка из рабочего потока (например, после ошибки проверки номера).
+        Возвращает True, если обнаружен сбой и эмулятор нужно перезапустить.
+        """
+        if self.has_failed():
+            return True
+        reason = self.detect_failure()
+        with self.lock:
+            transport_loss_count = self.transport_loss_count
+        if reason is None and transport_loss_count:
+            reason = "потеряно ADB-соединение с эмулятором"  # Рабочий поток уже получил ошибку - не ждём повторных проверок
+        if reason is not None:
+            self._mark_failed(reason)
+        return self.has_failed()
+
+
+    def _mark_failed(self, reason):
+        thread_name = threading.current_thread().name
+        with self.lock:
+            if self.failure_reason is not None:
+                return
+            self.failure_reason = reason
+        self.is_active.clear()
+        logger.warning(f"[{thread_name}] [{self.avd_name}] Сбой эмулятора: {reason}. Эмулятор будет перезапущен.")
+        self.emulator_manager.dump_emulator_output(self.avd_name, f"Сбой эмулятора: {reason}")
+        self.emulator_manager.close_emulator(
+            thread_name=thread_name, avd_name=self.avd_name, emulator_port=self.emulator_port
+        )
+
+
+    def _watch_loop(self):
+        while not self.stop_event.is_set() and not self.terminate_flag.is_set():
+            self.is_active.wait()
+            if self.stop_event.is_set():
+                break
+            try:
+                reason = self.detect_failure()
+                if reason is not None:
+                    self._mark_failed(reason)
+            except Exception as e:
+                logger.error(f"[{self.avd_name}] Ошибка наблюдения за эмулятором: {e}")
+            self.stop_event.wait(self.CHECK_INTERVAL)
+
+
+    def pause(self):
+        """Приостанавливает наблюдение на время перезапуска эмулятора."""
+        self.is_active.clear()
+
+
+    def mark_restarted(self):
+        """Сбрасывает состояние сбоя после успешного перезапуска и возобновляет наблюдение."""
+        with self.lock:
+            self.failure_reason = None
+            self.check_started_at = None
+            self.transport_loss_count = 0
+            self.restart_count += 1
+        self.is_active.set()
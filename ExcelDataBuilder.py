@@ -3,18 +3,30 @@ import re
 
 import pandas as pd
 
+from TableBackends import get_table_backend
+
 from logger_config import Logger
 logger = Logger.get_logger(__name__)
 
 
 class ExcelDataBuilder:
-    def __init__(self, input_path, output_path):
+    DEFAULT_CHUNK_SIZE = 5000  # Количество строк в одной порции при потоковом чтении
+
+    def __init__(self, input_path, output_path, streaming=False):
         self.input_path = input_path
         self.output_path = output_path
-
-        # Чтение исходного файла Excel
-        self.df = pd.read_excel(self.input_path, header=0, dtype=str, engine='openpyxl')
-        self.df.columns = self.df.columns.str.strip()
+        self.streaming = streaming
+
+        # Формат исходной и экспортной таблиц (xlsx, csv, parquet) определяется по расширению файла
+        self.input_backend = get_table_backend(self.input_path)
+        self.output_backend = get_table_backend(self.output_path)
+
+        if self.streaming:
+            # В потоковом режиме читаем только заголовки, строки будут выдаваться порциями через iter_row_chunks
+            self.df = pd.DataFrame(columns=self.input_backend.read_header(self.input_path))
+        else:
+            # Чтение исходного файла таблицы
+            self.df = self.input_backend.read(self.input_path)
         logger.info(f"Заголовки таблицы: {self.df.columns.tolist()}")
 
         if 'Телефон Ответчика' not in self.df.columns:
@@ -22,14 +34,24 @@ class ExcelDataBuilder:
 
         if not os.path.exists(self.output_path):
             self._create_empty_excel()
-            logger.info(f"Пустой файл Excel создан по пути: {self.output_path}")
+            logger.info(f"Пустой файл таблицы создан по пути: {self.output_path}")
 
     def _create_empty_excel(self):
         directory = os.path.dirname(self.output_path)
         if directory and not os.path.exists(directory):
             os.makedirs(directory)
         empty_df = self.df.iloc[0:0]
-        empty_df.to_excel(self.output_path, index=False, engine='openpyxl')
+        self.output_backend.write(empty_df, self.output_path)
+
+    def iter_row_chunks(self, chunk_size=DEFAULT_CHUNK_SIZE):
+        """
+        Возвращает итератор по порциям строк исходной таблицы (DataFrame со строковыми значениями).
+        В потоковом режиме таблица читается лениво (для xlsx - итератором read-only книги openpyxl),
+        поэтому расход памяти не зависит от размера файла.
+        """
+        if not self.streaming:
+            return iter([self.df])
+        return self.input_backend.iter_chunks(self.input_path, chunk_size)
 
     @staticmethod
     def format_phone_number(number):
@@ -0,0 +1,208 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+from AdbClient import AdbClient
+from TelegramApkVersionManager import TelegramApkVersionManager
+
+from logger_config import Logger
+logger = Logger.get_logger(__name__)
+
+
+class FleetApkDeployer:
+    """
+    Установка APK Telegram на все эмуляторы.
+    Версия (числовой versionCode) и SHA-256 APK-файла определяются один раз за запуск, а не в каждом потоке.
+    Для каждого AVD запоминается, какой APK есть в снепшоте, с которого он загружается (имя снепшота и время
+    его сохранения): если эмулятор загружен с того же снепшота и хэш совпадает, опрос 'dumpsys package'
+    пропускается. Иначе versionCode на устройстве сравнивается с версией APK, и устаревшие эмуляторы
+    обновляются через 'adb install --streaming' параллельно (блокируется только само устройство).
+    Запись об AVD удаляется при пересоздании или удалении AVD.
+    """
+    STATE_FILE = "apk_deploy_state.json"
+    INSTALL_TIMEOUT = 600  # Тайм-аут установки APK на одно устройство, сек.
+    HASH_CHUNK_SIZE = 1024 * 1024
+
+    # Результаты ensure_installed()
+    SKIPPED = "skipped"  # Снепшот загрузки уже содержит этот APK, устройство не опрашивалось
+    UP_TO_DATE = "up_to_date"  # На устройстве та же или более новая версия
+    INSTALLED = "installed"  # APK установлен; снепшот загрузки нужно пересохранить и вызвать remember()
+    FAILED = "failed"
+
+    def __init__(self, command_runner, snapshot_registry, telegram_app_package="org.telegram.messenger.web"):
+        self.lock = threading.Lock()
+        self.command_runner = command_runner
+        self.snapshot_registry = snapshot_registry
+        self.apk_version_manager = TelegramApkVersionManager(telegram_app_package=telegram_app_package)
+        self.apk_info = None  # Путь, версия и хэш APK текущего запуска
+        self.is_streaming_supported = True  # Сбрасывается, если образ не поддерживает потоковую установку
+        self.state = self._read_state()
+
+
+    def _read_state(self):
+        if not os.path.exists(self.STATE_FILE):
+            return {}
+        try:
+            with open(self.STATE_FILE, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Не удалось прочитать {self.STATE_FILE}, записи об установленных APK сброшены: {e}")
+            return {}
+
+
+    # noinspection PyTypeChecker
+    def _write_state(self):
+        with open(self.STATE_FILE, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, ensure_ascii=False, indent=4)
+
+
+    def _file_sha256(self, path):
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(self.HASH_CHUNK_SIZE), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+
+    def prepare(self, apk_path):
+        """
+        Определяет версию и хэш APK один раз перед запуском потоков.
+        Если файл не изменился с прошлого вызова, используются сохранённые значения.
+        """
+        thread_name = threading.current_thread().name
+        file_stat = os.stat(apk_path)
+        file_key = (os.path.abspath(apk_path), file_stat.st_size, file_stat.st_mtime)
+        with self.lock:
+            if self.apk_info is not None and self.apk_info["file_key"] == file_key:
+                return self.apk_info
+
+        apk_info = self.apk_version_manager.get_apk_info(apk_path)
+        if not apk_info:
+            raise RuntimeError(f"Не удалось определить версию APK {apk_path}.")
+        apk_info["path"] = apk_path
+        apk_info["file_key"] = file_key
+        apk_info["sha256"] = self._file_sha256(apk_path)
+
+        with self.lock:
+            self.apk_info = apk_info
+        logger.info(
+            f"[{thread_name}] APK для установки: {apk_info['package']} {apk_info['version_name']} "
+            f"(versionCode {apk_info['version_code']}, sha256 {apk_info['sha256'][:12]}...)."
+        )
+        return apk_info
+
+
+    def remember(self, avd_name, snapshot_name):
+        """
+        Запоминает, что снепшот snapshot_name AVD (в его текущей сохранённой версии) содержит APK текущего запуска.
+        Вызывается, когда устройство, загруженное с этого снепшота, актуально, или после пересохранения снепшота.
+        """
+        with self.lock:
+            apk_info = self.apk_info
+        snapshot_saved_at = self.snapshot_registry.get_saved_at(avd_name, snapshot_name)
+        if apk_info is None or snapshot_saved_at is None:
+            return
+        with self.lock:
+            self.state[avd_name] = {
+                "sha256": apk_info["sha256"],
+                "version_code": apk_info["version_code"],
+                "version_name": apk_info["version_name"],
+                "snapshot": snapshot_name,
+                "snapshot_saved_at": snapshot_saved_at,
+                "recorded_at": time.time(),
+            }
+            self._write_state()
+
+
+    def forget(self, avd_name):
+        """Удаляет запись об установленном APK (AVD удалён или создан заново)."""
+        with self.lock:
+            if self.state.pop(avd_name, None) is not None:
+                self._write_state()
+
+
+    def _install(self, serial, apk_path):
+        """Устанавливает APK через adb install -r (потоково, если образ это поддерживает). Возвращает True при успехе."""
+        thread_name = threading.current_thread().name
+        with AdbClient.device_lock(serial):
+            if self.is_streaming_supported:
+                result = self.command_runner.run(
+                    ["adb", "-s", serial, "install", "-r", "--streaming", apk_path],
+                    timeout=self.INSTALL_TIMEOUT,
+                    command_type="adb install"
+                )
+                if result.returncode == 0 and "Success" in result.stdout:
+                    return True
+                if "streaming" not in f"{result.stdout}\n{result.stderr}".lower():
+                    logger.error(f"[{thread_name}] [{serial}] Ошибка установки APK: {result.stderr or result.stdout}")
+                    return False
+                logger.info(f"[{thread_name}] [{serial}] Потоковая установка не поддерживается образом, используется обычная.")
+                self.is_streaming_supported = False
+
+            result = self.command_runner.run(
+                ["adb", "-s", serial, "install", "-r", apk_path],
+                timeout=self.INSTALL_TIMEOUT,
+                command_type="adb install"
+            )
+        if result.returncode == 0 and "Success" in result.stdout:
+            return True
+        logger.error(f"[{thread_name}] [{serial}] Ошибка установки APK: {result.stderr or result.stdout}")
+        return False
+
+
+    def ensure_installed(self, avd_name, serial, boot_snapshot=None):
+        """
+        Устанавливает или обновляет APK на эмуляторе, если это нужно.
+        :param boot_snapshot: Снепшот, с которого загружен эмулятор (None - холодная загрузка или неизвестно)
+        :return: SKIPPED, UP_TO_DATE, INSTALLED или FAILED
+        """
+        thread_name = threading.current_thread().name
+        with self.lock:
+            apk_info = self.apk_info
+            record = self.state.get(avd_name) or {}
+        if apk_info is None:
+            raise RuntimeError("APK для установки не подготовлен: сначала нужно вызвать prepare().")
+
+        if (
+                boot_snapshot
+                and record.get("sha256") == apk_info["sha256"]
+                and record.get("snapshot") == boot_snapshot
+                and record.get("snapshot_saved_at") == self.snapshot_registry.get_saved_at(avd_name, boot_snapshot)
+        ):
+            logger.info(
+                f"[{thread_name}] [{avd_name}] Telegram {apk_info['version_name']} уже есть в снепшоте "
+                f"'{boot_snapshot}'. Проверка пропущена."
+            )
+            return self.SKIPPED
+
+        installed_version_code = self.apk_version_manager.get_installed_version_code(serial)
+        if installed_version_code is None:
+            logger.warning(f"[{thread_name}] [{avd_name}] Telegram не установлен. Выполняется установка...")
+        elif installed_version_code == apk_info["version_code"]:
+            logger.info(f"[{thread_name}] [{avd_name}] Установленная версия актуальна. Установка не требуется.")
+            if boot_snapshot:
+                self.remember(avd_name, boot_snapshot)
+            return self.UP_TO_DATE
+        elif installed_version_code > apk_info["version_code"]:
+            logger.warning(
+                f"[{thread_name}] [{avd_name}] На устройстве более новая версия Telegram "
+                f"(versionCode {installed_version_code} > {apk_info['version_code']}). Установка не требуется."
+            )
+            return self.UP_TO_DATE
+        else:
+            logger.warning(
+                f"[{thread_name}] [{avd_name}] Установлена устаревшая версия Telegram "
+                f"(versionCode {installed_version_code} < {apk_info['version_code']}). Выполняется обновление..."
+            )
+
+        start_time = time.monotonic()
+        if not self._install(serial, apk_info["path"]):
+            self.forget(avd_name)
+            return self.FAILED
+        logger.info(
+            f"[{thread_name}] [{avd_name}] Telegram {apk_info['version_name']} установлен "
+            f"за {time.monotonic() - start_time:.1f} сек."
+        )
+        return self.INSTALLED
@@ -0,0 +1,278 @@
+import glob
+import json
+import os
+import re
+import shutil
+import threading
+import time
+
+from logger_config import Logger
+logger = Logger.get_logger(__name__)
+
+
+class GoldenAvdManager:
+    """
+    Эталонный AVD: один раз настроенный эмулятор (пройден приветственный экран, сохранён снепшот 'configured'),
+    из которого новые AVD создаются копированием каталога .avd и файла .ini вместо 'avdmanager create avd',
+    первой загрузки и повторной настройки.
+    Эталоном становится только что созданный AVD сразу после сохранения 'configured' - до установки Telegram
+    и авторизации: образы данных использованного AVD содержат данные аккаунта (в том числе во внутренних
+    снепшотах qcow2), поэтому уже работавшие AVD эталоном не становятся.
+    """
+    TEMPLATE_AVD_NAME = "AVD_GOLDEN_TEMPLATE"
+    TEMPLATE_SNAPSHOT_NAME = "configured"
+    EXCLUDED_SNAPSHOTS = ("authorized", "default_boot")
+    IDENTITY_KEYS = ("AvdId", "avd.ini.displayname")  # Ключи, значение которых - имя AVD целиком
+    METADATA_FILE = "golden_template.json"
+    STOP_TIMEOUT = 60  # Сколько ждать остановки эмулятора-источника перед копированием, сек.
+
+    def __init__(self, avd_home=None):
+        self.avd_home = avd_home or os.path.expanduser("~/.android/avd")
+        self.lock = threading.Lock()
+        self.is_template_source_claimed = False
+
+
+    def _avd_dir(self, avd_name):
+        return os.path.join(self.avd_home, f"{avd_name}.avd")
+
+
+    def _avd_ini_path(self, avd_name):
+        return os.path.join(self.avd_home, f"{avd_name}.ini")
+
+
+    @staticmethod
+    def _read_ini(path):
+        values = {}
+        if not os.path.exists(path):
+            return values
+        with open(path, "r", encoding="utf-8", errors="surrogateescape") as f:
+            for line in f:
+                if "=" in line:
+                    key, value = line.split("=", 1)
+                    values[key.strip()] = value.strip()
+        return values
+
+
+    def _is_running(self, avd_name):
+        """Запущенный эмулятор держит lock-файлы в каталоге AVD."""
+        return bool(glob.glob(os.path.join(self._avd_dir(avd_name), "*.lock")))
+
+
+    def _has_snapshot(self, avd_name, snapshot_name):
+        return os.path.isdir(os.path.join(self._avd_dir(avd_name), "snapshots", snapshot_name))
+
+
+    @staticmethod
+    def _normalize_system_image(system_image):
+        return system_image.replace(";", "/").replace("\\", "/").strip("/")
+
+
+    def _matches_settings(self, avd_name, system_image, ram_size, disk_size, cpu_cores=1):
+        """Проверяет, что AVD создан из нужного образа с нужными размерами ОЗУ, постоянной памяти и числом ядер."""
+        config = self._read_ini(os.path.join(self._avd_dir(avd_name), "config.ini"))
+        return (
+            self._normalize_system_image(config.get("image.sysdir.1", "")) == self._normalize_system_image(system_image)
+            and config.get("hw.ramSize", "").rstrip("M") == str(ram_size)
+            and config.get("disk.dataPartition.size", "").rstrip("M") == str(disk_size)
+            and config.get("hw.cpu.ncore", "1") == str(cpu_cores)
+        )
+
+
+    def _read_metadata(self):
+        metadata_path = os.path.join(self._avd_dir(self.TEMPLATE_AVD_NAME), self.METADATA_FILE)
+        try:
+            with open(metadata_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+
+    def is_template_ready(self, system_image, ram_size, disk_size, cpu_cores=1):
+        return (
+            # Эталоны, сделанные из уже использованных AVD (без признака fresh_source), не используются
+            self._read_metadata().get("fresh_source", False)
+            and os.path.exists(self._avd_ini_path(self.TEMPLATE_AVD_NAME))
+            and self._has_snapshot(self.TEMPLATE_AVD_NAME, self.TEMPLATE_SNAPSHOT_NAME)
+            and self._matches_settings(self.TEMPLATE_AVD_NAME, system_image, ram_size, disk_size, cpu_cores)
+        )
+
+
+    def ensure_template(self, system_image, ram_size, disk_size, cpu_cores=1):
+        """
+        Проверяет наличие подходящего эталона. Если его нет, эталоном станет первый AVD,
+        созданный и настроенный в этом запуске (см. claim_template_source). Возвращает True, если эталон готов.
+        """
+        thread_name = threading.current_thread().name
+        if self.is_template_ready(system_image, ram_size, disk_size, cpu_cores):
+            logger.info(f"[{thread_name}] Эталонный AVD {self.TEMPLATE_AVD_NAME} готов к клонированию.")
+            return True
+
+        logger.info(
+            f"[{thread_name}] Подходящего эталонного AVD нет: новые AVD будут созданы через avdmanager, "
+            f"первый из них после настройки станет эталоном."
+        )
+        return False
+
+
+    def claim_template_source(self, system_image, ram_size, disk_size, cpu_cores=1):
+        """
+        Вызывается потоком, только что настроившим новый AVD. Возвращает True только одному потоку
+        и только если эталона нет - этот поток должен остановить эмулятор и вызвать promote_fresh_avd().
+        """
+        with self.lock:
+            if self.is_template_source_claimed or self.is_template_ready(system_image, ram_size, disk_size, cpu_cores):
+                return False
+            self.is_template_source_claimed = True
+            return True
+
+
+    def _wait_until_stopped(self, avd_name):
+        deadline = time.monotonic() + self.STOP_TIMEOUT
+        while self._is_running(avd_name):
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(1)
+        return True
+
+
+    def promote_fresh_avd(self, source_avd_name):
+        """
+        Делает эталоном только что настроенный и уже остановленный AVD (до установки Telegram и авторизации).
+        Снимает отметку claim_template_source независимо от результата.
+        """
+        thread_name = threading.current_thread().name
+        try:
+            if not self._wait_until_stopped(source_avd_name):
+                logger.error(f"[{thread_name}] Эмулятор {source_avd_name} не остановился: эталон не создан.")
+                return False
+            if not self._has_snapshot(source_avd_name, self.TEMPLATE_SNAPSHOT_NAME):
+                logger.error(f"[{thread_name}] У {source_avd_name} нет снепшота '{self.TEMPLATE_SNAPSHOT_NAME}': эталон не создан.")
+                return False
+            return self._promote_to_template(source_avd_name)
+        finally:
+            with self.lock:
+                self.is_template_source_claimed = False
+
+
+    def _promote_to_template(self, source_avd_name):
+        thread_name = threading.current_thread().name
+        logger.info(f"[{thread_name}] Создание эталонного AVD {self.TEMPLATE_AVD_NAME} из {source_avd_name}...")
+        if not self._copy_avd(source_avd_name, self.TEMPLATE_AVD_NAME):
+            return False
+
+        metadata = {
+            "source_avd": source_avd_name,
+            "fresh_source": True,
+            "snapshot": self.TEMPLATE_SNAPSHOT_NAME,
+            "created_at": time.time(),
+        }
+        with open(os.path.join(self._avd_dir(self.TEMPLATE_AVD_NAME), self.METADATA_FILE), "w", encoding="utf-8") as f:
+            json.dump(metadata, f, ensure_ascii=False, indent=4)
+        logger.info(f"[{thread_name}] Эталонный AVD {self.TEMPLATE_AVD_NAME} создан из {source_avd_name}.")
+        return True
+
+
+    def clone_from_template(self, avd_name, system_image, ram_size, disk_size, cpu_cores=1):
+        """
+        Создаёт AVD копированием эталона. Возвращает True, если AVD создан и уже настроен
+        (его можно сразу запускать со снепшота 'configured'), и False, если эталона нет или AVD уже существует.
+        """
+        thread_name = threading.current_thread().name
+        if os.path.exists(self._avd_dir(avd_name)) or os.path.exists(self._avd_ini_path(avd_name)):
+            return False
+        if not self.is_template_ready(system_image, ram_size, disk_size, cpu_cores):
+            return False
+
+        start_time = time.monotonic()
+        if not self._copy_avd(self.TEMPLATE_AVD_NAME, avd_name):
+            return False
+        logger.info(f"[{thread_name}] AVD {avd_name} склонирован из эталона за {time.monotonic() - start_time:.1f} сек.")
+        return True
+
+
+    def _copy_avd(self, source_avd_name, target_avd_name):
+        """
+        Копирует каталог .avd во временный каталог, исправляет в копии имя и пути AVD,
+        затем переименовывает её в целевой каталог и создаёт файл .ini.
+        """
+        thread_name = threading.current_thread().name
+        source_dir = self._avd_dir(source_avd_name)
+        target_dir = self._avd_dir(target_avd_name)
+        temp_dir = f"{target_dir}.tmp"
+
+        try:
+            if os.path.exists(temp_dir):
+                shutil.rmtree(temp_dir)
+            shutil.copytree(
+                source_dir,
+                temp_dir,
+                ignore=shutil.ignore_patterns("*.lock", "hardware-qemu.ini", self.METADATA_FILE)
+            )
+            self._fix_identity(temp_dir, source_avd_name, target_avd_name)
+
+            if os.path.exists(target_dir):
+                shutil.rmtree(target_dir)
+            os.replace(temp_dir, target_dir)
+            self._write_avd_ini(source_avd_name, target_avd_name)
+            return True
+        except Exception as e:
+            logger.error(f"[{thread_name}] Ошибка копирования AVD {source_avd_name} в {target_avd_name}: {e}")
+            shutil.rmtree(temp_dir, ignore_errors=True)
+            return False
+
+
+    def _fix_identity(self, avd_dir, source_avd_name, target_avd_name):
+        """
+        Удаляет снепшоты с авторизацией и переписывает имя исходного AVD в текстовых конфигурациях копии.
+        Строки 'ключ=значение' разбираются по отдельности: заменяются только значения ключей IDENTITY_KEYS,
+        совпадающие с именем целиком, и сегменты путей '<имя>.avd' (AVD_DEVICE_1 внутри AVD_DEVICE_10 не трогается).
+        """
+        for snapshot_name in self.EXCLUDED_SNAPSHOTS:
+            shutil.rmtree(os.path.join(avd_dir, "snapshots", snapshot_name), ignore_errors=True)
+
+        ini_files = glob.glob(os.path.join(avd_dir, "*.ini")) + glob.glob(os.path.join(avd_dir, "snapshots", "*", "*.ini"))
+        for ini_path in ini_files:
+            with open(ini_path, "r", encoding="utf-8", errors="surrogateescape", newline="") as f:
+                lines = f.readlines()
+            updated_lines = [self._fix_identity_line(line, source_avd_name, target_avd_name) for line in lines]
+            if updated_lines != lines:
+                with open(ini_path, "w", encoding="utf-8", errors="surrogateescape", newline="") as f:
+                    f.writelines(updated_lines)
+
+
+    def _fix_identity_line(self, line, source_avd_name, target_avd_name):
+        """Переписывает имя AVD в одной строке 'ключ=значение', сохраняя пробелы и перевод строки."""
+        key, separator, raw_value = line.partition("=")
+        if not separator:
+            return line
+        value = raw_value.strip()
+        if not value:
+            return line
+        value_start = raw_value.index(value)
+        prefix, suffix = raw_value[:value_start], raw_value[value_start + len(value):]
+
+        if key.strip() in self.IDENTITY_KEYS:
+            if value != source_avd_name:
+                return line
+            updated_value = target_avd_name
+        else:
+            # Путь разбивается по разделителям с их сохранением; заменяются только сегменты '<имя>.avd'
+            segments = re.split(r"([\\/])", value)
+            updated_value = "".join(
+                f"{target_avd_name}.avd" if segment == f"{source_avd_name}.avd" else segment
+                for segment in segments
+            )
+        return f"{key}{separator}{prefix}{updated_value}{suffix}"
+
+
+    def _write_avd_ini(self, source_avd_name, target_avd_name):
+        source_ini = self._read_ini(self._avd_ini_path(source_avd_name))
+        lines = [
+            f"avd.ini.encoding={source_ini.get('avd.ini.encoding', 'UTF-8')}",
+            f"path={self._avd_dir(target_avd_name)}",
+            f"path.rel=avd{os.sep}{target_avd_name}.avd",
+        ]
+        if "target" in source_ini:
+            lines.append(f"target={source_ini['target']}")
+        with open(self._avd_ini_path(target_avd_name), "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
@@ -0,0 +1,77 @@
+from collections import deque
+from threading import Lock
+
+from logger_config import Logger
+logger = Logger.get_logger(__name__)
+
+
+# Маркер окончания входных данных: возвращается вместо строки, когда номера закончились
+NUMBERS_ENDED = object()
+
+
+class NumberDispatchQueue:
+    """
+    Очередь выдачи номеров потокам-эмуляторам.
+    Заполняется порциями (DataFrame) из итератора: каждая строка хранится как компактный dict,
+    следующая порция подгружается только когда текущая выдана целиком.
+    Выдача очередного номера выполняется за амортизированное O(1) независимо от размера таблицы.
+    Порция читается вне self.lock (под load_lock - её читает один поток), а self.lock берётся
+    только чтобы добавить готовые строки в очередь: чтение не задерживает requeue() и len().
+    """
+    def __init__(self, chunks):
+        self.lock = Lock()
+        self.load_lock = Lock()
+        self.chunks = iter(chunks)
+        self.rows = deque()
+        self.loaded_count = 0
+        self.is_source_exhausted = False
+
+
+    def _read_next_chunk(self):
+        """
+        Читает следующую непустую порцию и возвращает её строки или None, если порции закончились.
+        Вызывается под self.load_lock, но без self.lock.
+        """
+        for chunk in self.chunks:
+            if len(chunk):
+                return chunk.to_dict(orient="records")
+        return None
+
+
+    def get(self):
+        """
+        Возвращает следующую строку (dict) или NUMBERS_ENDED, если номера закончились.
+        """
+        while True:
+            with self.lock:
+                if self.rows:
+                    return self.rows.popleft()
+                if self.is_source_exhausted:
+                    return NUMBERS_ENDED
+
+            # Следующую порцию читает один поток, остальные ждут его на load_lock
+            with self.load_lock:
+                with self.lock:
+                    if self.rows or self.is_source_exhausted:
+                        continue
+                rows = self._read_next_chunk()
+                with self.lock:
+                    if rows is None:
+                        self.is_source_exhausted = True
+                        continue
+                    self.rows.extend(rows)
+                    self.loaded_count += len(rows)
+                    loaded_count = self.loaded_count
+                logger.info(f"В очередь номеров загружено {len(rows)} строк (всего: {loaded_count}).")
+
+
+    def requeue(self, row):
+        """Возвращает выданную, но не проверенную строку в начало очереди (например, после сбоя эмулятора)."""
+        with self.lock:
+            self.rows.appendleft(row)
+
+
+    def __len__(self):
+        """Количество строк, уже загруженных в очередь и ещё не выданных."""
+        with self.lock:
+            return len(self.rows)
@@ -0,0 +1,125 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+from logger_config import Logger
+logger = Logger.get_logger(__name__)
+
+
+class PhoneNumberNormalizer:
+    """
+    Приведение номеров телефонов к каноническому виду +7XXXXXXXXXX.
+    Правила: 11 цифр, начинающихся с 7 -> +7XXXXXXXXXX; 10 цифр, не начинающихся с 7 -> +7 + цифры;
+    всё остальное считается некорректным номером.
+    """
+    SLICE_SIZE = 65536  # Ограничивает размер промежуточных массивов при нормализации больших столбцов
+    MAX_VECTOR_WIDTH = 32  # Более длинные строки (свободный текст) нормализуются поштучно: ширина матрицы кодов ограничена
+
+    _CODE_ZERO = ord('0')
+    _CODE_SEVEN = ord('7')
+    _CODE_PLUS = ord('+')
+    _MAX_ASCII_CODE = 127
+
+    @staticmethod
+    def _normalize_digits(phone):
+        digits = re.sub(r'\D', '', phone)  # Удалить все символы, кроме цифр
+        if len(digits) == 11 and digits.startswith('7'):  # Российские номера (например, 7XXXXXXXXXX)
+            return f'+{digits}'
+        elif len(digits) == 10 and not digits.startswith('7'):  # Если номер содержит 10 цифр
+            return f'+7{digits}'  # Преобразуем в международный формат
+        return None
+
+
+    @classmethod
+    def normalize(cls, phone):
+        """Нормализует один номер. Возвращает None для некорректного номера."""
+        phone = str(phone).strip()
+        normalized = cls._normalize_digits(phone)
+        if normalized is None:
+            logger.warning(f"Некорректный номер: {phone}")
+        return normalized
+
+
+    @classmethod
+    def normalize_series(cls, phones: pd.Series):
+        """
+        Векторно нормализует весь столбец номеров.
+        :return: Пара (Series с нормализованными номерами или None для некорректных, количество некорректных)
+        """
+        normalized = np.empty(len(phones), dtype=object)
+        values = phones.to_numpy(dtype=object)
+        for start in range(0, len(values), cls.SLICE_SIZE):
+            normalized[start:start + cls.SLICE_SIZE] = cls._normalize_array(values[start:start + cls.SLICE_SIZE])
+
+        normalized_series = pd.Series(normalized, index=phones.index, dtype=object)
+        invalid_count = int(normalized_series.isna().sum())
+        return normalized_series, invalid_count
+
+
+    @classmethod
+    def _normalize_array(cls, values):
+        """
+        Нормализует массив значений с тем же результатом, что и normalize() для каждого значения.
+        Короткие ASCII-строки обрабатываются векторно, длинные строки и строки с не-ASCII символами
+        (цифры других алфавитов, которые '\\d' тоже считает цифрами) - поштучно.
+        """
+        rows_count = len(values)
+        result = np.full(rows_count, None, dtype=object)
+        if not rows_count:
+            return result
+
+        text = np.frompyfunc(str, 1, 1)(values)
+        lengths = np.frompyfunc(len, 1, 1)(text).astype(np.int64)
+        is_short = lengths <= cls.MAX_VECTOR_WIDTH
+
+        short_rows = np.flatnonzero(is_short)
+        scalar_rows = np.flatnonzero(~is_short)
+        if len(short_rows):
+            short_result, is_ascii = cls._normalize_ascii_array(text[short_rows].astype(str))
+            result[short_rows] = short_result
+            scalar_rows = np.concatenate((scalar_rows, short_rows[~is_ascii]))
+
+        for row in scalar_rows:
+            result[row] = cls._normalize_digits(text[row])
+        return result
+
+
+    @classmethod
+    def _normalize_ascii_array(cls, text):
+        """
+        Извлекает цифры из массива строк средствами NumPy: строки представляются матрицей кодов символов,
+        позиция каждой цифры в номере вычисляется накопленной суммой по строке.
+        :return: Пара (нормализованные номера или None, маска строк только из ASCII-символов - для остальных
+                 результат не определён)
+        """
+        rows_count = len(text)
+        width = text.dtype.itemsize // 4
+        if not width:
+            return np.full(rows_count, None, dtype=object), np.ones(rows_count, dtype=bool)
+
+        codes = text.view(np.uint32).reshape(rows_count, width)
+        is_ascii = (codes <= cls._MAX_ASCII_CODE).all(axis=1)
+        is_digit = (codes - cls._CODE_ZERO) <= 9  # Беззнаковое вычитание: коды меньше '0' переполняются
+        digit_positions = np.cumsum(is_digit, axis=1, dtype=np.uint16)
+        digit_counts = digit_positions[:, -1]
+
+        # k-я цифра номера - первый символ строки, на котором накопленная сумма цифр превысила k
+        row_index = np.arange(rows_count)
+        digits = np.empty((rows_count, 11), dtype=np.uint32)
+        for k in range(11):
+            digits[:, k] = codes[row_index, np.argmax(digit_positions > k, axis=1)]
+
+        starts_with_seven = digits[:, 0] == cls._CODE_SEVEN
+        is_full = (digit_counts == 11) & starts_with_seven
+        is_local = (digit_counts == 10) & ~starts_with_seven
+
+        result_codes = np.empty((rows_count, 12), dtype=np.uint32)
+        result_codes[:, 0] = cls._CODE_PLUS
+        result_codes[:, 1:] = digits
+        result_codes[is_local, 1] = cls._CODE_SEVEN
+        result_codes[is_local, 2:] = digits[is_local, :10]
+
+        result = result_codes.view('U12').ravel().astype(object)
+        result[~(is_full | is_local)] = None
+        return result, is_ascii
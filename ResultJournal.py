@@ -0,0 +1,149 @@
+import json
+import os
+import sqlite3
+import threading
+
+from CheckOutcome import CheckOutcome
+
+from logger_config import Logger
+logger = Logger.get_logger(__name__)
+
+
+class ResultJournal:
+    """
+    Журнал результатов проверки номеров на базе SQLite (режим WAL).
+    Каждая запись добавляется за O(1) и переживает падение программы,
+    а экспортная таблица собирается из журнала только в контрольных точках.
+    В журнал попадает любой итог проверки (см. CheckOutcome) с именем эмулятора и временем проверки.
+    Таблица processed_numbers - постоянный индекс последнего итога по каждому номеру (первичный ключ по номеру),
+    по которому при возобновлении работы отфильтровываются номера с окончательным итогом.
+    """
+    def __init__(self, journal_path):
+        self.journal_path = journal_path
+        self.lock = threading.Lock()
+
+        directory = os.path.dirname(self.journal_path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+
+        self.connection = sqlite3.connect(self.journal_path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS results (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                phone TEXT NOT NULL,
+                row_json TEXT NOT NULL,
+                recorded_at REAL NOT NULL,
+                status TEXT NOT NULL,
+                avd_name TEXT
+            )
+            """
+        )
+        self.connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS processed_numbers (
+                phone TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                avd_name TEXT,
+                checked_at REAL
+            ) WITHOUT ROWID
+            """
+        )
+
+        self.connection.execute("CREATE TEMP TABLE lookup_numbers (phone TEXT PRIMARY KEY) WITHOUT ROWID")
+        self.connection.execute("CREATE TEMP TABLE final_statuses (status TEXT PRIMARY KEY) WITHOUT ROWID")
+        self.connection.executemany("INSERT INTO final_statuses (status) VALUES (?)", [(status,) for status in CheckOutcome.FINAL])
+        self.connection.commit()
+        logger.info(f"Журнал результатов открыт: {self.journal_path}")
+
+
+    @staticmethod
+    def get_journal_path(output_path):
+        """
+        Возвращает путь к журналу результатов на основе пути экспортной таблицы.
+        Расширение экспортной таблицы входит в имя: у a_export.csv и a_export.xlsx разные журналы.
+        """
+        return f"{output_path}.journal.sqlite3"
+
+
+    def append_many(self, records):
+        """
+        Добавляет пачку записей одной транзакцией.
+        :param records: Список кортежей (нормализованный номер, строка таблицы в виде dict, итог проверки,
+                        имя эмулятора, время проверки)
+        """
+        with self.lock:
+            with self.connection:
+                self.connection.executemany(
+                    "INSERT INTO results (phone, row_json, status, avd_name, recorded_at) VALUES (?, ?, ?, ?, ?)",
+                    [
+                        (phone, json.dumps(row, ensure_ascii=False, default=str), status, avd_name, checked_at)
+                        for phone, row, status, avd_name, checked_at in records
+                    ]
+                )
+                # Окончательный итог не перезаписывается неокончательным
+                self.connection.executemany(
+                    """
+                    INSERT INTO processed_numbers (phone, status, avd_name, checked_at) VALUES (?, ?, ?, ?)
+                    ON CONFLICT (phone) DO UPDATE SET
+                        status = excluded.status,
+                        avd_name = excluded.avd_name,
+                        checked_at = excluded.checked_at
+                    WHERE processed_numbers.status NOT IN (SELECT status FROM final_statuses)
+                       OR excluded.status IN (SELECT status FROM final_statuses)
+                    """,
+                    [(phone, status, avd_name, checked_at) for phone, _, status, avd_name, checked_at in records]
+                )
+
+
+    def count(self):
+        with self.lock:
+            return self.connection.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+
+    def count_processed(self):
+        """Возвращает количество номеров с окончательным итогом проверки."""
+        with self.lock:
+            return self.connection.execute(
+                "SELECT COUNT(*) FROM processed_numbers WHERE status IN (SELECT status FROM final_statuses)"
+            ).fetchone()[0]
+
+
+    def find_unprocessed(self, phones):
+        """
+        Возвращает множество номеров из переданных, у которых ещё нет окончательного итога проверки.
+        Номера загружаются во временную таблицу и сравниваются с индексом одним анти-соединением.
+        """
+        with self.lock:
+            with self.connection:
+                self.connection.execute("DELETE FROM lookup_numbers")
+                self.connection.executemany(
+                    "INSERT OR IGNORE INTO lookup_numbers (phone) VALUES (?)",
+                    ((phone,) for phone in phones)
+                )
+                cursor = self.connection.execute(
+                    """
+                    SELECT lookup.phone FROM lookup_numbers AS lookup
+                    WHERE NOT EXISTS (
+                        SELECT 1 FROM processed_numbers AS processed
+                        WHERE processed.phone = lookup.phone
+                          AND processed.status IN (SELECT status FROM final_statuses)
+                    )
+                    """
+                )
+                return {phone for (phone,) in cursor}
+
+
+    def load_rows(self, status=CheckOutcome.REGISTERED):
+        """Возвращает строки с указанным итогом проверки в порядке добавления."""
+        with self.lock:
+            cursor = self.connection.execute("SELECT row_json FROM results WHERE status = ? ORDER BY id", (status,))
+            return [json.loads(row_json) for (row_json,) in cursor]
+
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+        logger.info(f"Журнал результатов закрыт: {self.journal_path}")
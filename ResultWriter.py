@@ -0,0 +1,182 @@
+import queue
+import threading
+import time
+
+from ResultJournal import ResultJournal
+
+from logger_config import Logger
+logger = Logger.get_logger(__name__)
+
+
+# Маркер остановки потока записи
+_STOP = object()
+
+
+class ResultWriter:
+    """
+    Единственный поток, записывающий результаты в журнал.
+    Рабочие потоки только кладут записи в ограниченную очередь (при её переполнении ждут - backpressure),
+    а поток записи объединяет их в пачки по размеру или по времени.
+    Пачка, которую не удалось записать, не подтверждается: запись повторяется с нарастающей задержкой,
+    а пока пачка не записана, новые записи из очереди не забираются. Если все повторы исчерпаны,
+    ошибка сохраняется и пробрасывается из flush() и stop().
+    """
+    WRITE_RETRY_DELAYS = (0.5, 1, 2, 5, 10)  # Задержки между повторами записи пачки, сек.
+    def __init__(
+            self,
+            journal: ResultJournal,
+            on_batch_written=None,
+            max_queue_size: int = 1000,
+            batch_size: int = 50,
+            flush_interval: float = 1.0,
+    ):
+        self.journal = journal
+        self.on_batch_written = on_batch_written
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue(maxsize=max_queue_size)
+
+        self.stats_lock = threading.Lock()
+        self.records_written = 0
+        self.batches_written = 0
+        self.last_flush_latency = 0.0
+        self.max_flush_latency = 0.0
+        self.total_flush_latency = 0.0
+        self.write_error = None  # Ошибка пачки, не записанной после всех повторов
+        self.stop_requested = threading.Event()
+
+        self.thread = threading.Thread(target=self._run, name="ResultWriter", daemon=True)
+
+
+    def start(self):
+        self.thread.start()
+        logger.info(f"Поток записи результатов запущен (пачка: {self.batch_size}, интервал: {self.flush_interval} сек.).")
+
+
+    def submit(self, record):
+        """Ставит запись (кортеж в формате ResultJournal.append_many) в очередь. Блокируется, если очередь заполнена."""
+        self.queue.put(record)
+
+
+    def flush(self):
+        """
+        Ожидает, пока все поставленные в очередь записи будут записаны в журнал.
+        Бросает RuntimeError, если пачку не удалось записать после всех повторов.
+        """
+        with self.queue.all_tasks_done:
+            while self.queue.unfinished_tasks:
+                self._raise_write_error()
+                self.queue.all_tasks_done.wait(timeout=self.flush_interval)
+        self._raise_write_error()
+
+
+    def stop(self):
+        """Дописывает оставшиеся записи и останавливает поток."""
+        if not self.thread.is_alive():
+            return
+        self.stop_requested.set()
+        # Пока поток записи повторяет запись, очередь может быть заполнена
+        while self.thread.is_alive():
+            try:
+                self.queue.put(_STOP, timeout=self.flush_interval)
+                break
+            except queue.Full:
+                continue
+        self.thread.join()
+        logger.info(f"Поток записи результатов остановлен. Статистика: {self.get_stats()}")
+        self._raise_write_error()
+
+
+    def _raise_write_error(self):
+        with self.stats_lock:
+            write_error = self.write_error
+        if write_error is not None:
+            raise RuntimeError(f"Не удалось записать результаты в журнал: {write_error}") from write_error
+
+
+    def get_stats(self):
+        with self.stats_lock:
+            return {
+                "queue_depth": self.queue.qsize(),
+                "records_written": self.records_written,
+                "batches_written": self.batches_written,
+                "last_flush_latency": round(self.last_flush_latency, 4),
+                "max_flush_latency": round(self.max_flush_latency, 4),
+                "avg_flush_latency": round(self.total_flush_latency / self.batches_written, 4) if self.batches_written else 0.0,
+                "write_error": str(self.write_error) if self.write_error is not None else None,
+            }
+
+
+    def _run(self):
+        batch = []
+        deadline = None
+        is_stopping = False
+
+        while not is_stopping:
+            timeout = self.flush_interval if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                item = self.queue.get(timeout=timeout)
+                if item is _STOP:
+                    self.queue.task_done()
+                    is_stopping = True
+                else:
+                    batch.append(item)
+                    if deadline is None:
+                        deadline = time.monotonic() + self.flush_interval
+            except queue.Empty:
+                pass
+
+            is_deadline_passed = deadline is not None and time.monotonic() >= deadline
+            if batch and (is_stopping or len(batch) >= self.batch_size or is_deadline_passed):
+                # Пока пачка не записана, очередь не разбирается: рабочие потоки упираются в её размер
+                while not self._write_batch(batch):
+                    if is_stopping or self.stop_requested.is_set():
+                        logger.error(f"Поток записи остановлен, {len(batch)} результатов не записаны в журнал.")
+                        return
+                batch = []
+                deadline = None
+
+
+    def _write_batch(self, batch):
+        """
+        Записывает пачку в журнал, повторяя попытки с нарастающей задержкой.
+        Записи подтверждаются в очереди только после успешной записи. Возвращает True при успехе.
+        """
+        start_time = time.perf_counter()
+        for attempt, retry_delay in enumerate((*self.WRITE_RETRY_DELAYS, None), start=1):
+            try:
+                self.journal.append_many(batch)
+                break
+            except Exception as e:
+                if retry_delay is None:
+                    logger.exception(
+                        f"Не удалось записать пачку из {len(batch)} результатов в журнал "
+                        f"после {attempt} попыток: {e}"
+                    )
+                    with self.stats_lock:
+                        self.write_error = e
+                    return False
+                logger.warning(
+                    f"Ошибка записи пачки из {len(batch)} результатов в журнал (попытка {attempt}), "
+                    f"повтор через {retry_delay} сек.: {e}"
+                )
+                time.sleep(retry_delay)
+
+        for _ in batch:
+            self.queue.task_done()
+
+        latency = time.perf_counter() - start_time
+        with self.stats_lock:
+            self.write_error = None
+            self.records_written += len(batch)
+            self.batches_written += 1
+            self.last_flush_latency = latency
+            self.max_flush_latency = max(self.max_flush_latency, latency)
+            self.total_flush_latency += latency
+
+        if self.on_batch_written:
+            try:
+                self.on_batch_written(batch)
+            except Exception as e:
+                logger.exception(f"Ошибка в обработчике записанной пачки результатов: {e}")
+        return True
@@ -0,0 +1,110 @@
+import json
+import os
+import threading
+import xml.etree.ElementTree as ET
+
+from logger_config import Logger
+logger = Logger.get_logger(__name__)
+
+
+class SdkPackageScanner:
+    """
+    Определяет установленные пакеты Android SDK по файлам package.xml в ANDROID_HOME, без запуска sdkmanager.
+    Результат кэшируется на диске вместе с временем изменения просмотренных каталогов:
+    установка или удаление пакета меняет время изменения родительского каталога, и кэш пересобирается.
+    """
+    CACHE_FILE = "sdk_packages_cache.json"  # Имя файла кэша установленных пакетов
+
+    def __init__(self, android_home=None, cache_file=CACHE_FILE):
+        self._android_home = android_home
+        self.cache_file = cache_file
+        self.lock = threading.Lock()
+
+
+    @property
+    def android_home(self):
+        # Переменная среды читается при каждом обращении: SDK может быть установлен уже после создания объекта
+        return self._android_home or os.environ.get("ANDROID_HOME")
+
+
+    def get_installed_packages(self):
+        """
+        Возвращает список путей установленных пакетов (например, "system-images;android-22;google_apis;x86")
+        или None, если ANDROID_HOME не задан или не существует.
+        """
+        thread_name = threading.current_thread().name
+        if not self.android_home or not os.path.isdir(self.android_home):
+            logger.warning(f"[{thread_name}] Каталог ANDROID_HOME не найден: {self.android_home}.")
+            return None
+
+        with self.lock:
+            cache = self._load_cache()
+            if cache is not None and self._is_cache_valid(cache):
+                logger.info(f"[{thread_name}] Список пакетов SDK взят из кэша ({len(cache['packages'])} шт.).")
+                return cache["packages"]
+
+            packages, dir_mtimes = self._scan()
+            self._save_cache({"android_home": self.android_home, "dir_mtimes": dir_mtimes, "packages": packages})
+            logger.info(f"[{thread_name}] Найдено пакетов SDK: {len(packages)} (просмотрено каталогов: {len(dir_mtimes)}).")
+            return packages
+
+
+    def _scan(self):
+        """Обходит ANDROID_HOME, не спускаясь внутрь каталогов пакетов (содержащих package.xml)."""
+        packages = []
+        dir_mtimes = {}
+        for dir_path, dir_names, file_names in os.walk(self.android_home):
+            if "package.xml" in file_names:
+                package_path = self._read_package_path(os.path.join(dir_path, "package.xml"))
+                if package_path:
+                    packages.append(package_path)
+                dir_names[:] = []
+                continue
+            dir_mtimes[dir_path] = os.path.getmtime(dir_path)
+            # Служебные каталоги sdkmanager (.temp, .downloadIntermediates и т.п.) не содержат установленных пакетов
+            dir_names[:] = [name for name in dir_names if not name.startswith(".")]
+        return sorted(packages), dir_mtimes
+
+
+    @staticmethod
+    def _read_package_path(package_xml_path):
+        try:
+            root = ET.parse(package_xml_path).getroot()
+        except (ET.ParseError, OSError) as e:
+            logger.warning(f"Не удалось прочитать {package_xml_path}: {e}")
+            return None
+        for element in root.iter():
+            if element.tag.rsplit("}", 1)[-1] == "localPackage":
+                return element.get("path")
+        return None
+
+
+    def _is_cache_valid(self, cache):
+        if cache.get("android_home") != self.android_home:
+            return False
+        for dir_path, mtime in cache.get("dir_mtimes", {}).items():
+            try:
+                if os.path.getmtime(dir_path) != mtime:
+                    return False
+            except OSError:
+                return False
+        return bool(cache.get("dir_mtimes"))
+
+
+    def _load_cache(self):
+        if not os.path.exists(self.cache_file):
+            return None
+        try:
+            with open(self.cache_file, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (json.JSONDecodeError, IOError) as e:
+            logger.warning(f"Не удалось прочитать кэш пакетов SDK: {e}")
+            return None
+
+
+    def _save_cache(self, cache):
+        try:
+            with open(self.cache_file, "w", encoding="utf-8") as f:
+                json.dump(cache, f, ensure_ascii=False, indent=4)
+        except IOError as e:
+            logger.warning(f"Не удалось сохранить кэш пакетов SDK: {e}")
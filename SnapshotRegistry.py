@@ -0,0 +1,191 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+
+from logger_config import Logger
+logger = Logger.get_logger(__name__)
+
+
+class SnapshotRegistry:
+    """
+    Выбор снепшота для загрузки эмулятора по имени и проверка его пригодности.
+    Приоритет: 'authorized', затем 'configured', иначе (или если снепшот непригоден) холодная загрузка.
+    При сохранении снепшота рядом с ним записываются метаданные (отпечаток бинарника эмулятора,
+    хэш конфигурации AVD и флагов запуска). Снепшот с несовпадающими метаданными или загружавшийся
+    подозрительно долго (эмулятор молча откатился на холодную загрузку) помечается как устаревший
+    и пересохраняется на уже загруженном эмуляторе сразу после загрузки, до создания сессии Appium.
+    """
+    SNAPSHOT_PRIORITY = ("authorized", "configured")
+    METADATA_FILE = "snapshot_meta.json"
+    SLOW_SNAPSHOT_BOOT_SECONDS = 60  # Загрузка со снепшота дольше этого порога считается откатом на холодную загрузку
+    # Ключи config.ini, отличающиеся у клонов одного AVD и не влияющие на совместимость снепшота
+    IDENTITY_CONFIG_KEYS = ("AvdId", "avd.ini.displayname")
+    # Флаги запуска, меняющие эмулируемое железо (остальные, вроде -no-audio или -verbose, на снепшот не влияют)
+    HARDWARE_FLAGS = ("-gpu", "-skin", "-prop", "-memory", "-cores")
+
+    def __init__(self, avd_home=None):
+        self.avd_home = avd_home or os.path.expanduser("~/.android/avd")
+        self.lock = threading.Lock()
+
+
+    def _snapshot_dir(self, avd_name, snapshot_name):
+        return os.path.join(self.avd_home, f"{avd_name}.avd", "snapshots", snapshot_name)
+
+
+    def _metadata_path(self, avd_name, snapshot_name):
+        return os.path.join(self._snapshot_dir(avd_name, snapshot_name), self.METADATA_FILE)
+
+
+    @staticmethod
+    def get_emulator_fingerprint():
+        """Отпечаток бинарника эмулятора: путь, размер и время изменения (без запуска 'emulator -version')."""
+        emulator_path = shutil.which("emulator")
+        if not emulator_path:
+            return None
+        stat = os.stat(emulator_path)
+        return f"{os.path.normcase(emulator_path)}|{stat.st_size}|{int(stat.st_mtime)}"
+
+
+    @classmethod
+    def _get_hardware_flags(cls, launch_flags):
+        hardware_flags = []
+        for index, flag in enumerate(launch_flags):
+            if flag in cls.HARDWARE_FLAGS and index + 1 < len(launch_flags):
+                hardware_flags.append(f"{flag} {launch_flags[index + 1]}")
+        return hardware_flags
+
+
+    def get_config_hash(self, avd_name, launch_flags):
+        """Хэш конфигурации AVD (без идентификационных ключей) и влияющих на железо флагов запуска."""
+        config_path = os.path.join(self.avd_home, f"{avd_name}.avd", "config.ini")
+        config_lines = []
+        if os.path.exists(config_path):
+            with open(config_path, "r", encoding="utf-8", errors="surrogateescape") as f:
+                for line in f:
+                    key = line.split("=", 1)[0].strip()
+                    if line.strip() and key not in self.IDENTITY_CONFIG_KEYS:
+                        config_lines.append(line.strip())
+        digest = hashlib.sha256()
+        digest.update("\n".join(sorted(config_lines)).encode("utf-8", errors="surrogateescape"))
+        digest.update(("\0" + "\n".join(self._get_hardware_flags(launch_flags))).encode("utf-8"))
+        return digest.hexdigest()
+
+
+    def _read_metadata(self, avd_name, snapshot_name):
+        path = self._metadata_path(avd_name, snapshot_name)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (json.JSONDecodeError, IOError) as e:
+            logger.warning(f"[{avd_name}] Не удалось прочитать метаданные снепшота '{snapshot_name}': {e}")
+            return None
+
+
+    # noinspection PyTypeChecker
+    def _write_metadata(self, avd_name, snapshot_name, metadata):
+        path = self._metadata_path(avd_name, snapshot_name)
+        if not os.path.isdir(os.path.dirname(path)):
+            return
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(metadata, f, ensure_ascii=False, indent=4)
+
+
+    def _get_problem(self, avd_name, snapshot_name, launch_flags):
+        """Возвращает причину непригодности снепшота или None, если его можно загружать."""
+        metadata = self._read_metadata(avd_name, snapshot_name)
+        if metadata is None:
+            return None  # Снепшот сохранён до появления метаданных: проверяется по времени загрузки
+        if metadata.get("is_stale"):
+            return "помечен как устаревший"
+        if metadata.get("emulator_fingerprint") != self.get_emulator_fingerprint():
+            return "сохранён другой версией эмулятора"
+        if metadata.get("config_hash") != self.get_config_hash(avd_name, launch_flags):
+            return "сохранён с другой конфигурацией AVD или флагами запуска"
+        return None
+
+
+    def choose_snapshot(self, avd_name, launch_flags):
+        """
+        Возвращает (имя снепшота для загрузки или None, имя снепшота, который нужно пересохранить, или None).
+        Решает самый приоритетный из существующих снепшотов: если он непригоден, выполняется холодная загрузка,
+        а не загрузка менее приоритетного снепшота ('configured' откатил бы данные до авторизации).
+        """
+        thread_name = threading.current_thread().name
+        with self.lock:
+            for snapshot_name in self.SNAPSHOT_PRIORITY:
+                if not os.path.isdir(self._snapshot_dir(avd_name, snapshot_name)):
+                    continue
+                problem = self._get_problem(avd_name, snapshot_name, launch_flags)
+                if problem is None:
+                    return snapshot_name, None
+                logger.warning(f"[{thread_name}] [{avd_name}] Снепшот '{snapshot_name}' пропущен: {problem}.")
+                return None, snapshot_name
+        return None, None
+
+
+    def record_saved(self, avd_name, snapshot_name, launch_flags):
+        """Записывает метаданные только что сохранённого снепшота."""
+        with self.lock:
+            previous = self._read_metadata(avd_name, snapshot_name) or {}
+            self._write_metadata(avd_name, snapshot_name, {
+                "emulator_fingerprint": self.get_emulator_fingerprint(),
+                "config_hash": self.get_config_hash(avd_name, launch_flags),
+                "saved_at": time.time(),
+                "is_stale": False,
+                "boot_times": previous.get("boot_times", [])[-5:],
+            })
+
+
+    def mark_stale(self, avd_name, reason):
+        """
+        Помечает все снепшоты AVD как устаревшие (например, после изменения его конфигурации):
+        при следующем запуске будет холодная загрузка и снепшот пересохранится.
+        """
+        thread_name = threading.current_thread().name
+        with self.lock:
+            for snapshot_name in self.SNAPSHOT_PRIORITY:
+                if not os.path.isdir(self._snapshot_dir(avd_name, snapshot_name)):
+                    continue
+                metadata = self._read_metadata(avd_name, snapshot_name) or {}
+                metadata["is_stale"] = True
+                self._write_metadata(avd_name, snapshot_name, metadata)
+                logger.info(f"[{thread_name}] [{avd_name}] Снепшот '{snapshot_name}' помечен как устаревший: {reason}.")
+
+
+    def get_saved_at(self, avd_name, snapshot_name):
+        """Возвращает время последнего сохранения снепшота из его метаданных или None."""
+        with self.lock:
+            metadata = self._read_metadata(avd_name, snapshot_name) or {}
+        return metadata.get("saved_at")
+
+
+    def record_boot(self, avd_name, snapshot_name, boot_seconds, launch_flags):
+        """
+        Запоминает время загрузки со снепшота. Возвращает False, если загрузка была подозрительно долгой
+        и снепшот помечен как устаревший.
+        """
+        thread_name = threading.current_thread().name
+        with self.lock:
+            metadata = self._read_metadata(avd_name, snapshot_name) or {}
+            metadata["boot_times"] = (metadata.get("boot_times", []) + [round(boot_seconds, 1)])[-5:]
+            is_slow = boot_seconds > self.SLOW_SNAPSHOT_BOOT_SECONDS
+            metadata["is_stale"] = is_slow
+            if not is_slow and "config_hash" not in metadata:
+                # Снепшот, сохранённый до появления метаданных, быстро загрузился - принимаем его как есть
+                metadata["emulator_fingerprint"] = self.get_emulator_fingerprint()
+                metadata["config_hash"] = self.get_config_hash(avd_name, launch_flags)
+            self._write_metadata(avd_name, snapshot_name, metadata)
+
+        if is_slow:
+            logger.warning(
+                f"[{thread_name}] [{avd_name}] Загрузка со снепшота '{snapshot_name}' заняла {boot_seconds:.1f} сек. "
+                f"(порог {self.SLOW_SNAPSHOT_BOOT_SECONDS} сек.): снепшот помечен как устаревший."
+            )
+        else:
+            logger.info(f"[{thread_name}] [{avd_name}] Загрузка со снепшота '{snapshot_name}' заняла {boot_seconds:.1f} сек.")
+        return not is_slow
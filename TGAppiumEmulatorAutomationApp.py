@@ -1,4 +1,3 @@
-import re
 import os
 import sys
 import time
@@ -9,6 +8,7 @@ import pandas as pd
 import tkinter as tk
 
 import threading
+from collections import deque
 from threading import Event
 from threading import Lock
 from concurrent.futures import ThreadPoolExecutor
@@ -16,8 +16,18 @@ from concurrent.futures import ThreadPoolExecutor
 from selenium.webdriver.ie.webdriver import WebDriver
 from appium.webdriver.extensions.android.nativekey import AndroidKey
 
+from BootScheduler import BootScheduler
 from ExcelDataBuilder import ExcelDataBuilder
+from NumberDispatchQueue import NumberDispatchQueue, NUMBERS_ENDED
+from PhoneNumberNormalizer import PhoneNumberNormalizer
+from CheckOutcome import CheckOutcome
+from ResultJournal import ResultJournal
+from ResultWriter import ResultWriter
 from EmulatorAuthConfigManager import EmulatorAuthConfigManager
+from EmulatorLaunchProfiles import EmulatorLaunchProfiles
+from EmulatorPool import EmulatorPool
+from EmulatorSupervisor import EmulatorSupervisor
+from GoldenAvdManager import GoldenAvdManager
 from TelegramApkVersionManager import TelegramApkVersionManager
 from EmulatorAuthWindowManager import EmulatorAuthWindowManager
 
@@ -55,87 +65,374 @@ APK_URL = "https://telegram.org/dl/android/apk"
 APK_NAME = "Telegram_latest_version"
 
 class ThreadSafeExcelProcessor:
-    def __init__(self, input_path, output_path):
-        self.excel_data_builder = ExcelDataBuilder(input_path, output_path)
-        self.lock = Lock()
-        self.processed_numbers = self.load_processed_numbers()
-        logger.info(f"Загружено {len(self.processed_numbers)} обработанных номеров.")
-
-        self.filter_unprocessed_numbers()  # Фильтруем номера, уже записанные в экспортный файл
+    EXPORT_CHECKPOINT_INTERVAL = 100  # Через сколько новых записей пересобирать экспортную таблицу
 
-        self.is_numbers_ended = False
+    def __init__(self, input_path, output_path, streaming=True):
+        self.excel_data_builder = ExcelDataBuilder(input_path, output_path, streaming=streaming)
+        self.lock = Lock()
+        self.export_lock = Lock()
+        self.columns = list(self.excel_data_builder.df.columns)
+
+        self.journal = ResultJournal(ResultJournal.get_journal_path(output_path))
+        self.import_existing_export()
+        self.records_since_checkpoint = 0
+
+        self.result_writer = ResultWriter(self.journal, on_batch_written=self.on_results_batch_written)
+        self.result_writer.start()
+
+        self.final_outcomes = {}  # Номер -> окончательный итог, полученный за текущий запуск
+        self.pending_rows = {}  # Номер -> все исходные строки с этим номером, ожидающие проверки
+        self.duplicates_count = 0
+        logger.info(f"Загружено {self.journal.count_processed()} номеров с окончательным итогом проверки.")
+
+        # Очередь выдачи номеров питается порциями исходной таблицы: номера нормализуются, уже обработанные
+        # отфильтровываются, дубликаты схлопываются. В потоковом режиме порции читаются лениво.
+        self.dispatch_queue = NumberDispatchQueue(
+            self.deduplicate_numbers(self.filter_unprocessed_numbers(chunk))
+            for chunk in self.excel_data_builder.iter_row_chunks()
+        )
+        self.excel_data_builder.df = self.excel_data_builder.df.iloc[0:0]
+
+    def import_existing_export(self):
+        """
+        Переносит в пустой журнал строки экспортной таблицы, созданной до появления журнала,
+        чтобы они не потерялись при следующей сборке экспорта.
+        """
+        if self.journal.count() or not os.path.exists(self.excel_data_builder.output_path):
+            return
+        try:
+            processed_data = self.excel_data_builder.output_backend.read(self.excel_data_builder.output_path)
+        except Exception as e:
+            logger.exception(f"Ошибка при загрузке экспортной таблицы: {e}")
+            return
 
-    def load_processed_numbers(self):
-        if os.path.exists(self.excel_data_builder.output_path):
-            try:
-                processed_data = pd.read_excel(self.excel_data_builder.output_path, dtype=str, engine='openpyxl')
-                return {self.normalize_phone_number(num) for num in processed_data['Телефон Ответчика']}
-            except Exception as e:
-                logger.exception(f"Ошибка при загрузке экспортной таблицы: {e}")
-                return set()
-        return set()
+        records = []
+        imported_at = time.time()
+        for row in processed_data.to_dict(orient="records"):
+            normalized_number = self.normalize_phone_number(row.get('Телефон Ответчика'))
+            if normalized_number:
+                row['Телефон Ответчика'] = normalized_number
+                records.append((normalized_number, row, CheckOutcome.REGISTERED, None, imported_at))
+        if records:
+            self.journal.append_many(records)
+            logger.info(f"В журнал перенесено {len(records)} строк из существующей экспортной таблицы.")
 
     @staticmethod
     def normalize_phone_number(phone):
-        phone = str(phone).strip()
-        digits = re.sub(r'\D', '', phone)  # Удалить все символы, кроме цифр
-        if len(digits) == 11 and digits.startswith('7'):  # Российские номера (например, 7XXXXXXXXXX)
-            return f'+{digits}'
-        elif len(digits) == 10 and not digits.startswith('7'):  # Если номер содержит 10 цифр
-            return f'+7{digits}'  # Преобразуем в международный формат
-        logger.warning(f"Некорректный номер: {phone}")
-        return None
+        return PhoneNumberNormalizer.normalize(phone)
 
 
-    def filter_unprocessed_numbers(self):
-        initial_count = len(self.excel_data_builder.df)
+    def filter_unprocessed_numbers(self, df):
+        """
+        Нормализует номера порции строк и отбрасывает некорректные и уже обработанные.
+        """
+        initial_count = len(df)
         logger.info(f"Изначально номеров для обработки: {initial_count}")
 
-        self.excel_data_builder.df['Телефон Ответчика'] = self.excel_data_builder.df['Телефон Ответчика'].astype(str)
-        self.excel_data_builder.df['Телефон Ответчика'] = self.excel_data_builder.df['Телефон Ответчика'].apply(
-            self.normalize_phone_number
-        )
-        self.excel_data_builder.df.dropna(subset=['Телефон Ответчика'], inplace=True)  # Удалить строки с некорректными номерами
-        self.excel_data_builder.df = self.excel_data_builder.df[
-            ~self.excel_data_builder.df['Телефон Ответчика'].isin(self.processed_numbers)
-        ]
-        filtered_count = len(self.excel_data_builder.df)
+        df = df.copy()
+        df['Телефон Ответчика'], invalid_count = PhoneNumberNormalizer.normalize_series(df['Телефон Ответчика'])
+        if invalid_count:
+            logger.warning(f"Пропущено некорректных номеров: {invalid_count} из {initial_count}.")
+        df.dropna(subset=['Телефон Ответчика'], inplace=True)  # Удалить строки с некорректными номерами
+
+        # Номера, уже проверенные за этот запуск, не отбрасываются: их строки получат тот же итог при схлопывании.
+        # Остальные сравниваются с постоянным индексом окончательных итогов одним анти-соединением.
+        with self.lock:
+            checked_numbers = set(self.final_outcomes)
+        unprocessed_numbers = self.journal.find_unprocessed(df['Телефон Ответчика']) | checked_numbers
+        df = df[df['Телефон Ответчика'].isin(unprocessed_numbers)]
+
+        filtered_count = len(df)
         logger.info(f"Фильтрация завершена. Осталось для обработки: {filtered_count} из {initial_count}.")
+        return df
 
 
-    def get_next_number(self, thread_name, avd_name):
+    def deduplicate_numbers(self, df):
+        """
+        Схлопывает строки с одинаковым номером: в очередь попадает только первая строка,
+        остальные запоминаются и получат итог её проверки. Строки с номером, уже проверенным
+        за этот запуск, сразу получают известный итог.
+        :return: DataFrame с одной строкой на каждый новый номер
+        """
+        unique_rows = []
+        fan_out_records = []
+        chunk_duplicates_count = 0
+
         with self.lock:
-            if not self.excel_data_builder.df.empty:
-                row = self.excel_data_builder.df.iloc[0]
-                logger.debug(f"[{thread_name}] [{avd_name}]: Выдан номер для обработки: {row['Телефон Ответчика']}.")
-                self.excel_data_builder.df = self.excel_data_builder.df.iloc[1:]
-                return row
-            else:
-                logger.info("Все номера обработаны.")
-                self.is_numbers_ended = True
-                return None
+            for row in df.to_dict(orient="records"):
+                phone = row['Телефон Ответчика']
+                if phone in self.final_outcomes:
+                    outcome, avd_name = self.final_outcomes[phone]
+                    fan_out_records.append((phone, row, outcome, avd_name, time.time()))
+                    chunk_duplicates_count += 1
+                elif phone in self.pending_rows:
+                    self.pending_rows[phone].append(row)
+                    chunk_duplicates_count += 1
+                else:
+                    self.pending_rows[phone] = [row]
+                    unique_rows.append(row)
+            self.duplicates_count += chunk_duplicates_count
+
+        for record in fan_out_records:
+            self.result_writer.submit(record)
+
+        if chunk_duplicates_count:
+            logger.info(f"Схлопнуто повторяющихся номеров: {chunk_duplicates_count} "
+                        f"(всего за запуск: {self.duplicates_count}).")
+        return pd.DataFrame(unique_rows, columns=df.columns)
 
 
-    def record_valid_number(self, row):
+    def get_next_number(self, thread_name, avd_name):
+        """
+        Возвращает следующую строку для проверки или NUMBERS_ENDED, если номера закончились.
+        """
+        row = self.dispatch_queue.get()
+        if row is NUMBERS_ENDED:
+            logger.info(f"[{thread_name}] [{avd_name}]: Все номера обработаны.")
+            return NUMBERS_ENDED
+
+        logger.debug(f"[{thread_name}] [{avd_name}]: Выдан номер для обработки: {row['Телефон Ответчика']}.")
+        return row
+
+
+    def record_result(self, row, outcome, avd_name):
+        """
+        Ставит итог проверки номера в очередь потока записи и сразу возвращает управление.
+        Записываются все итоги: зарегистрирован, не зарегистрирован, не удалось проверить, ошибка.
+        Итог распространяется на все исходные строки с этим номером.
+        """
         thread_name = threading.current_thread().name
         normalized_row_number = self.normalize_phone_number(row['Телефон Ответчика'])
 
         with self.lock:
-            if os.path.exists(self.excel_data_builder.output_path):
-                current_data = pd.read_excel(self.excel_data_builder.output_path, dtype=str, engine='openpyxl')
-            else:
-                current_data = pd.DataFrame(columns=self.excel_data_builder.df.columns)
-
-            if normalized_row_number in self.processed_numbers:
+            if normalized_row_number in self.final_outcomes:
                 logger.debug(f"[{thread_name}] Номер {normalized_row_number} уже существует, пропускаем.")
                 return
+            rows = self.pending_rows.pop(normalized_row_number, None) or [row]
+            if outcome in CheckOutcome.FINAL:
+                self.final_outcomes[normalized_row_number] = (outcome, avd_name)
+
+        checked_at = time.time()
+        for source_row in rows:
+            source_row['Телефон Ответчика'] = normalized_row_number
+            self.result_writer.submit((normalized_row_number, source_row, outcome, avd_name, checked_at))
+        logger.info(f"[{thread_name}] [{avd_name}] Итог проверки номера {normalized_row_number} ({outcome}) "
+                    f"поставлен в очередь записи результатов для строк: {len(rows)}.")
+
+
+    def requeue_number(self, row, avd_name):
+        """Возвращает номер, проверка которого прервалась сбоем эмулятора, в очередь для другого потока."""
+        thread_name = threading.current_thread().name
+        self.dispatch_queue.requeue(row)
+        logger.info(f"[{thread_name}] [{avd_name}] Номер {row['Телефон Ответчика']} возвращён в очередь проверки.")
+
+
+    def on_results_batch_written(self, batch):
+        """
+        Вызывается потоком записи после каждой пачки: в контрольных точках пересобирает экспортную таблицу.
+        """
+        self.records_since_checkpoint += sum(1 for record in batch if record[2] == CheckOutcome.REGISTERED)
+        if self.records_since_checkpoint >= self.EXPORT_CHECKPOINT_INTERVAL:
+            self.records_since_checkpoint = 0
+            logger.info(f"Статистика записи результатов: {self.result_writer.get_stats()}")
+            self.materialize_export()
+
+
+    def materialize_export(self):
+        """
+        Собирает экспортную таблицу из журнала результатов.
+        Файл сначала пишется во временный, затем атомарно подменяет старый.
+        """
+        with self.export_lock:
+            output_path = self.excel_data_builder.output_path
+            rows = self.journal.load_rows(status=CheckOutcome.REGISTERED)
+            export_df = pd.DataFrame(rows, columns=self.columns)
+
+            base, ext = os.path.splitext(output_path)
+            temp_path = f"{base}.tmp{ext}"
+            self.excel_data_builder.output_backend.write(export_df, temp_path)
+            os.replace(temp_path, output_path)
+            logger.info(f"Экспортная таблица обновлена: {len(export_df)} строк в {output_path}.")
+
+
+    def flush(self):
+        """Дописывает в журнал все результаты, стоящие в очереди записи."""
+        self.result_writer.flush()
+
+
+    def close(self):
+        """Дозапись очереди результатов, финальная сборка экспортной таблицы и закрытие журнала."""
+        try:
+            try:
+                self.result_writer.stop()
+            except RuntimeError as e:
+                # Экспортная таблица всё равно собирается из того, что успело попасть в журнал
+                logger.error(f"Часть результатов не записана в журнал: {e}")
+            self.materialize_export()
+        except Exception as e:
+            logger.exception(f"Ошибка при сборке экспортной таблицы: {e}")
+        finally:
+            self.journal.close()
+
+class MultiFileExcelProcessor:
+    """
+    Пакетный режим: номера из нескольких таблиц выдаются из одной общей очереди.
+    Таблицы обрабатываются по очереди, у каждой свой журнал и своя экспортная таблица,
+    а эмуляторы продолжают работу без перезапуска при переходе к следующей таблице.
+    """
+    def __init__(self, file_pairs, streaming=True):
+        """
+        :param file_pairs: Список пар (путь к исходной таблице, путь к экспортной таблице)
+        """
+        self.file_pairs = list(file_pairs)
+        self.streaming = streaming
+        self.lock = Lock()
+        self.open_lock = Lock()  # Открытие следующей таблицы (выполняется вне self.lock)
+        self.next_file_index = 0
+        self.current_processor = None
+        self.open_processors = []
+        self.in_flight = {}  # id(строки) -> (строка, таблица-источник)
+        self.in_flight_counts = {}  # таблица-источник -> количество выданных, но ещё не записанных номеров
+        self.requeued_rows = deque()  # (строка, таблица-источник) - номера, возвращённые после сбоя эмулятора
+        self.exhausted_processors = set()
+        logger.info(f"Пакетный режим: к обработке {len(self.file_pairs)} таблиц.")
+
+
+    def _open_next_processor(self):
+        """
+        Открывает следующую таблицу из списка. Вызывается под self.open_lock, но без self.lock:
+        чтение исходной таблицы и сверка с журналом не задерживают выдачу и запись номеров других таблиц.
+        """
+        while self.next_file_index < len(self.file_pairs):
+            input_path, output_path = self.file_pairs[self.next_file_index]
+            self.next_file_index += 1
+            try:
+                processor = ThreadSafeExcelProcessor(input_path, output_path, streaming=self.streaming)
+            except Exception as e:
+                logger.error(f"Пакетный режим: не удалось открыть таблицу {input_path}, пропускаем: {e}")
+                continue
+            logger.info(f"Пакетный режим: таблица {self.next_file_index}/{len(self.file_pairs)}: {input_path}")
+            return processor
+        return None
+
+
+    def _detach_processor_if_done(self, processor):
+        """
+        Если номера таблицы выданы и все итоги по ним получены, убирает её из открытых и возвращает
+        для закрытия, иначе возвращает None. Вызывается под self.lock.
+        """
+        if processor in self.exhausted_processors and not self.in_flight_counts.get(processor):
+            self.exhausted_processors.discard(processor)
+            self.in_flight_counts.pop(processor, None)
+            self.open_processors.remove(processor)
+            return processor
+        return None
+
+
+    @staticmethod
+    def _close_processor(processor):
+        """Закрывает таблицу (сборка экспортной таблицы). Вызывается без self.lock."""
+        processor.close()
+        logger.info(f"Пакетный режим: таблица {processor.excel_data_builder.input_path} обработана.")
+
+
+    def get_next_number(self, thread_name, avd_name):
+        while True:
+            finished_processor = None
+            with self.lock:
+                if self.requeued_rows:
+                    row, processor = self.requeued_rows.popleft()
+                    self.in_flight[id(row)] = (row, processor)
+                    return row
+
+                processor = self.current_processor
+                if processor is not None:
+                    # Номер резервируется заранее, чтобы таблица не закрылась, пока он читается вне self.lock
+                    self.in_flight_counts[processor] += 1
+
+            if processor is not None:
+                # Подгрузка порции таблицы (чтение файла, сверка с журналом) выполняется без self.lock
+                row = processor.get_next_number(thread_name=thread_name, avd_name=avd_name)
+                with self.lock:
+                    if row is not NUMBERS_ENDED:
+                        self.in_flight[id(row)] = (row, processor)
+                        return row
+
+                    self.in_flight_counts[processor] -= 1
+                    self.exhausted_processors.add(processor)
+                    if self.current_processor is processor:
+                        self.current_processor = None
+                    finished_processor = self._detach_processor_if_done(processor)
+
+                if finished_processor is not None:
+                    self._close_processor(finished_processor)
+                continue
+
+            # Следующую таблицу открывает один поток, остальные ждут его на open_lock
+            with self.open_lock:
+                with self.lock:
+                    if self.current_processor is not None or self.requeued_rows:
+                        continue
+                processor = self._open_next_processor()
+                with self.lock:
+                    if processor is None:
+                        logger.info(f"[{thread_name}] [{avd_name}]: Пакетный режим: все таблицы обработаны.")
+                        return NUMBERS_ENDED
+                    self.open_processors.append(processor)
+                    self.in_flight_counts[processor] = 0
+                    self.current_processor = processor
+
+
+    def record_result(self, row, outcome, avd_name):
+        with self.lock:
+            _, processor = self.in_flight.pop(id(row), (row, None))
+        if processor is None:
+            logger.error(f"[{avd_name}] Пакетный режим: не найдена таблица-источник для номера {row['Телефон Ответчика']}.")
+            return
+
+        processor.record_result(row, outcome, avd_name)
+
+        with self.lock:
+            self.in_flight_counts[processor] -= 1
+            finished_processor = self._detach_processor_if_done(processor)
+        if finished_processor is not None:
+            self._close_processor(finished_processor)
+
+
+    def requeue_number(self, row, avd_name):
+        """
+        Возвращает номер в общую очередь. Номер остаётся числиться за своей таблицей,
+        поэтому таблица не закроется, пока по нему не будет получен итог.
+        """
+        thread_name = threading.current_thread().name
+        with self.lock:
+            entry = self.in_flight.pop(id(row), None)
+            if entry is None:
+                logger.error(f"[{thread_name}] [{avd_name}] Пакетный режим: не найдена таблица-источник для номера {row['Телефон Ответчика']}.")
+                return
+            self.requeued_rows.append(entry)
+        logger.info(f"[{thread_name}] [{avd_name}] Номер {row['Телефон Ответчика']} возвращён в очередь проверки.")
+
+
+    @staticmethod
+    def normalize_phone_number(phone):
+        return PhoneNumberNormalizer.normalize(phone)
+
+
+    def flush(self):
+        with self.lock:
+            processors = list(self.open_processors)
+        for processor in processors:
+            processor.flush()
 
-            row['Телефон Ответчика'] = normalized_row_number
-            updated_data = pd.concat([current_data, pd.DataFrame([row])], ignore_index=True)
-            updated_data.to_excel(self.excel_data_builder.output_path, index=False, engine='openpyxl')
 
-            self.processed_numbers.add(normalized_row_number)
-            logger.info(f"[{thread_name}] Номер {normalized_row_number} добавлен в экспортную таблицу.")
+    def close(self):
+        with self.lock:
+            processors = list(self.open_processors)
+            self.open_processors = []
+        for processor in processors:
+            processor.close()
+
 
 class TGAppiumEmulatorAutomationApp:
     required_directories = [
@@ -153,6 +450,7 @@ class TGAppiumEmulatorAutomationApp:
     def __init__(self):
         self.terminate_flag = Event()
         self.root = tk.Tk()
+        self.excel_processor = None
 
         self.android_tool_manager = AndroidToolManager(
             temp_files_dir=DEFAULT_TEMP_FILES_DIR,
@@ -172,6 +470,7 @@ class TGAppiumEmulatorAutomationApp:
         )
 
         self.emulator_manager = EmulatorManager()
+        self.golden_avd_manager = GoldenAvdManager()
         self.emulator_auth_window_manager = EmulatorAuthWindowManager(self.root)
         self.emulator_auth_config_manager = EmulatorAuthConfigManager()
 
@@ -184,6 +483,9 @@ class TGAppiumEmulatorAutomationApp:
             appium_installer=self.appium_installer
         )
 
+        self.emulator_pool = EmulatorPool(idle_timeout=self.logic.get_avd_property("pool_idle_timeout_minutes") * 60)
+        self.emulator_pool.start_reaper()
+
         self.ui = TelegramCheckerUI(self.root, self.logic, self)
         self.ui.refresh_excel_table()
 
@@ -199,20 +501,65 @@ class TGAppiumEmulatorAutomationApp:
             save_dir=DEFAULT_APK_SAVE_DIR
         )
 
-        avd_names = [f"AVD_DEVICE_{i + 1}" for i in range(self.ui.num_threads.get())]
+        # Версия и хэш APK определяются один раз для всех потоков
+        self.emulator_manager.apk_deployer.prepare(downloaded_apk_path)
+
+        # Состояние эмуляторов в adb отслеживается по потоку событий, а не опросом 'adb devices'
+        self.emulator_manager.device_tracker.start()
+
+        # При авто-подборе план считается по ресурсам хоста (с замером диска) и применяется без вопросов,
+        # иначе используются значения из настроек
+        if self.ui.auto_capacity_plan.get():
+            capacity_plan = self.logic.get_capacity_plan()
+            logger.info(f"[{thread_name}] Ресурсы хоста для авто-подбора: {capacity_plan['host']}")
+            self.root.after(0, lambda: self.ui.apply_capacity_plan(capacity_plan, show_dialog=False))
+            num_threads = capacity_plan["emulator_count"]
+            ram_size = capacity_plan["ram_size"]
+            cpu_cores = capacity_plan["cpu_cores"]
+            max_concurrent_boots = capacity_plan["max_concurrent_boots"]
+        else:
+            num_threads = self.ui.num_threads.get()
+            ram_size = self.ui.ram_size.get()
+            cpu_cores = self.ui.cpu_cores.get()
+            max_concurrent_boots = self.ui.max_concurrent_boots.get()
+        logger.info(
+            f"[{thread_name}] План запуска: эмуляторов {num_threads}, ОЗУ {ram_size} МБ, ядер {cpu_cores} на AVD, "
+            f"одновременных загрузок {max_concurrent_boots} (авто-подбор: {'да' if self.ui.auto_capacity_plan.get() else 'нет'})."
+        )
+
+        avd_names = [f"AVD_DEVICE_{i + 1}" for i in range(num_threads)]
 
-        input_excel_path = app.ui.source_excel_file_path.get()
-        logger.info(f"Исходный файл таблицы: {input_excel_path}")
-        output_excel_path = app.ui.export_table_path.get()
-        logger.info(f"Экспортный файл таблицы: {output_excel_path}")
+        if self.ui.batch_mode.get():
+            excel_files = self.logic.get_pending_excel_files(self.ui.batch_files_pattern.get())
+            logger.info(f"Пакетный режим, исходные файлы таблиц: {excel_files}")
+        else:
+            input_excel_path = app.ui.source_excel_file_path.get()
+            logger.info(f"Исходный файл таблицы: {input_excel_path}")
+            output_excel_path = app.ui.export_table_path.get()
+            logger.info(f"Экспортный файл таблицы: {output_excel_path}")
 
-        ram_size = self.ui.ram_size.get()
         disk_size = self.ui.disk_size.get()
         avd_ready_timeout = self.ui.avd_ready_timeout.get()
         base_port = 5554
 
+        boot_scheduler = BootScheduler(
+            max_concurrent_boots=max_concurrent_boots,
+            boot_stagger_seconds=self.ui.boot_stagger_seconds.get(),
+            terminate_flag=self.terminate_flag
+        )
+
+        # Пул тёплых эмуляторов (по желанию): эмуляторы не закрываются после обработки и подхватываются при следующем запуске
+        self.emulator_pool.idle_timeout = self.ui.pool_idle_timeout_minutes.get() * 60
+        emulator_pool = self.emulator_pool if self.ui.use_emulator_pool.get() else None
+
         emulator_auth_config_manager = EmulatorAuthConfigManager()  # Инициализируем EmulatorAuthConfigManager
-        excel_processor = ThreadSafeExcelProcessor(input_excel_path, output_excel_path) # Инициализация ExcelDataBuilder
+        if self.ui.batch_mode.get():
+            excel_processor = MultiFileExcelProcessor(
+                [(excel_file, self.logic.get_export_table_path(excel_file)) for excel_file in excel_files]
+            )
+        else:
+            excel_processor = ThreadSafeExcelProcessor(input_excel_path, output_excel_path) # Инициализация ExcelDataBuilder
+        self.excel_processor = excel_processor
 
         system_image = "system-images;android-22;google_apis;x86"
         platform_version = self.get_platform_version_from_system_image(system_image)
@@ -222,33 +569,46 @@ class TGAppiumEmulatorAutomationApp:
         self.emulator_manager.download_system_image(system_image)
         logger.info(f"[{thread_name}] Образ {system_image} загружен и готов к использованию.")
 
+        # Эталонный AVD для быстрого создания новых эмуляторов копированием
+        self.golden_avd_manager.ensure_template(
+            system_image=system_image,
+            ram_size=ram_size,
+            disk_size=disk_size,
+            cpu_cores=cpu_cores
+        )
+
         # Многопоточная работа с эмуляторами
-        with ThreadPoolExecutor(max_workers=len(avd_names)) as executor:
-            futures = []
-            for avd_name in avd_names:
-                future =executor.submit(
-                    self.process_emulator,
-                    avd_name=avd_name,
-                    avd_names=avd_names,
-                    base_port=base_port,
-                    ram_size=ram_size,
-                    disk_size=disk_size,
-                    system_image=system_image,
-                    apk_path=downloaded_apk_path,
-                    emulator_manager=self.emulator_manager,
-                    excel_processor=excel_processor,
-                    platform_version=platform_version,
-                    avd_ready_timeout=avd_ready_timeout,
-                    apk_version_manager=apk_version_manager,
-                    emulator_auth_config_manager=emulator_auth_config_manager,
-                )
-                futures.append(future)
+        try:
+            with ThreadPoolExecutor(max_workers=len(avd_names)) as executor:
+                futures = []
+                for avd_name in avd_names:
+                    future =executor.submit(
+                        self.process_emulator,
+                        avd_name=avd_name,
+                        avd_names=avd_names,
+                        base_port=base_port,
+                        ram_size=ram_size,
+                        disk_size=disk_size,
+                        cpu_cores=cpu_cores,
+                        system_image=system_image,
+                        emulator_manager=self.emulator_manager,
+                        excel_processor=excel_processor,
+                        boot_scheduler=boot_scheduler,
+                        emulator_pool=emulator_pool,
+                        platform_version=platform_version,
+                        avd_ready_timeout=avd_ready_timeout,
+                        emulator_auth_config_manager=emulator_auth_config_manager,
+                    )
+                    futures.append(future)
 
-            # Ждём завершения потоков
-            for future in futures:
-                future.result()
+                # Ждём завершения потоков
+                for future in futures:
+                    future.result()
+        finally:
+            excel_processor.close()  # Сборка итоговой экспортной таблицы из журнала
 
         logger.info(f"[{thread_name}] Обработка завершена во всех эмуляторах.")
+        self.emulator_manager.log_command_stats()
 
 
     def process_emulator(
@@ -258,12 +618,13 @@ class TGAppiumEmulatorAutomationApp:
             base_port: int,
             ram_size: str,
             disk_size: str,
+            cpu_cores: int,
             system_image: str,
             platform_version: str,
-            apk_path: str,
             emulator_manager: EmulatorManager,
-            excel_processor: ThreadSafeExcelProcessor,
-            apk_version_manager: TelegramApkVersionManager,
+            excel_processor: ThreadSafeExcelProcessor | MultiFileExcelProcessor,
+            boot_scheduler: BootScheduler,
+            emulator_pool: EmulatorPool | None,
             emulator_auth_config_manager: EmulatorAuthConfigManager,
             avd_ready_timeout: int = 1200,
     ):
@@ -287,46 +648,79 @@ class TGAppiumEmulatorAutomationApp:
             # Проверка флага перед запуском длительных операций
             if self.terminate_flag.is_set():
                 self.cleanup(thread_name=thread_name, android_driver_manager=android_driver_manager, avd_name=avd_name,
-                             appium_port=appium_port, emulator_manager=emulator_manager, emulator_port=emulator_port, ui=app.ui)
+                             appium_port=appium_port, emulator_manager=emulator_manager, emulator_port=emulator_port, ui=app.ui,
+                             emulator_pool=emulator_pool)
+
+            # В режиме пула сначала пробуем подхватить эмулятор, оставшийся запущенным с прошлого раза
+            is_reattached = emulator_pool is not None and emulator_pool.try_reattach(avd_name, emulator_port, appium_port)
+
+            if not is_reattached:
+                # Загрузка допускается планировщиком: ограничение одновременных загрузок и интервал между стартами
+                with boot_scheduler.boot_slot(avd_name):
+                    # Новый AVD по возможности клонируется из эталона, уже прошедшего первичную настройку
+                    if not emulator_auth_config_manager.was_started(avd_name) and self.golden_avd_manager.clone_from_template(
+                            avd_name=avd_name,
+                            system_image=system_image,
+                            ram_size=ram_size,
+                            disk_size=disk_size,
+                            cpu_cores=cpu_cores
+                    ):
+                        emulator_auth_config_manager.mark_as_started(avd_name)
+                        emulator_manager.apk_deployer.forget(avd_name)
+
+                    # Для ручной авторизации в Telegram нужно окно эмулятора, поэтому выбранный профиль
+                    # применяется только к уже авторизованным эмуляторам
+                    launch_profile = (
+                        self.ui.launch_profile.get() if emulator_auth_config_manager.is_authorized(avd_name)
+                        else EmulatorLaunchProfiles.DEFAULT_PROFILE
+                    )
 
-            # Инициализация и запуск эмулятора (если он ранее был запущен - используем snapshot)
-            if emulator_auth_config_manager.was_started(avd_name):
-                logger.info(f"[{thread_name}] Эмулятор {avd_name} уже был ранее запущен. Попробуем снова его стартовать.")
-                if not emulator_manager.start_emulator_with_optional_snapshot(
-                        avd_name=avd_name,
-                        emulator_port=emulator_port,
-                        avd_ready_timeout=avd_ready_timeout
-                ):
-                    raise RuntimeError(f"Не удалось перезапустить эмулятор {avd_name}.")
-            else:
-                # Если эмулятор еще не был создан, создаем его
-                if not emulator_manager.start_or_create_emulator(
-                        avd_name=avd_name,
-                        emulator_port=emulator_port,
-                        system_image=system_image,
-                        ram_size=ram_size,
-                        disk_size=disk_size,
-                        avd_ready_timeout=avd_ready_timeout,
-                ):
-                    logger.info(f"[{thread_name}] Эмулятор {avd_name} не был успешно настроен.")
-                    if not emulator_manager.delete_emulator(avd_name, emulator_port, snapshot_name="authorized"):
-                        logger.info(f"[{thread_name}] Эмулятор {avd_name} удалён из-за ошибки настройки.")
-                        emulator_auth_config_manager.clear_emulator_data(avd_name)
-                    raise RuntimeError(f"Не удалось запустить/создать эмулятор {avd_name}.")
-                else:
-                    logger.info(f"[{thread_name}] Эмулятор {avd_name} успешно подготовлен к работе!")
+                    # Инициализация и запуск эмулятора (если он ранее был запущен - используем snapshot)
+                    if emulator_auth_config_manager.was_started(avd_name):
+                        logger.info(f"[{thread_name}] Эмулятор {avd_name} уже был ранее запущен. Попробуем снова его стартовать.")
+                        # План запуска (ОЗУ, ядра) применяется и к уже созданным AVD, а не только к новым
+                        emulator_manager.apply_avd_resources(avd_name, ram_size=ram_size, cpu_cores=cpu_cores)
+                        if not emulator_manager.start_emulator_with_optional_snapshot(
+                                avd_name=avd_name,
+                                emulator_port=emulator_port,
+                                avd_ready_timeout=avd_ready_timeout,
+                                launch_profile=launch_profile
+                        ):
+                            raise RuntimeError(f"Не удалось перезапустить эмулятор {avd_name}.")
+                    else:
+                        # Если эмулятор еще не был создан, создаем его
+                        if not emulator_manager.start_or_create_emulator(
+                                avd_name=avd_name,
+                                emulator_port=emulator_port,
+                                system_image=system_image,
+                                ram_size=ram_size,
+                                disk_size=disk_size,
+                                avd_ready_timeout=avd_ready_timeout,
+                                launch_profile=launch_profile,
+                                cpu_cores=cpu_cores,
+                        ):
+                            logger.info(f"[{thread_name}] Эмулятор {avd_name} не был успешно настроен.")
+                            if not emulator_manager.delete_emulator(avd_name, emulator_port, snapshot_name="authorized"):
+                                logger.info(f"[{thread_name}] Эмулятор {avd_name} удалён из-за ошибки настройки.")
+                                emulator_auth_config_manager.clear_emulator_data(avd_name)
+                            raise RuntimeError(f"Не удалось запустить/создать эмулятор {avd_name}.")
+                        else:
+                            logger.info(f"[{thread_name}] Эмулятор {avd_name} успешно подготовлен к работе!")
 
 
             # Проверка перед следующими шагами
             if self.terminate_flag.is_set():
                 self.cleanup(thread_name=thread_name, android_driver_manager=android_driver_manager, avd_name=avd_name,
-                             appium_port=appium_port, emulator_manager=emulator_manager, emulator_port=emulator_port, ui=app.ui)
+                             appium_port=appium_port, emulator_manager=emulator_manager, emulator_port=emulator_port, ui=app.ui,
+                             emulator_pool=emulator_pool)
 
 
             android_driver_manager = AndroidDriverManager(
                 local_ip="127.0.0.1",
                 port=appium_port,
-                emulator_auth_config_manager=emulator_auth_config_manager
+                emulator_auth_config_manager=emulator_auth_config_manager,
+                reuse_running_server=is_reattached,
+                device_tracker=emulator_manager.device_tracker
             )
 
 
@@ -341,6 +735,9 @@ class TGAppiumEmulatorAutomationApp:
 
 
 
+            # AVD только что создан через avdmanager и ещё ни разу не настраивался
+            is_fresh_avd = not emulator_auth_config_manager.was_started(avd_name)
+
             while not emulator_auth_config_manager.was_started(avd_name):
                 logger.info(f"[{thread_name}] [{avd_name}] Запуск  отслеживания приветственного окна Android.")
                 self.monitor_initial_window_and_mark_as_started(
@@ -354,6 +751,24 @@ class TGAppiumEmulatorAutomationApp:
 
 
 
+            # Первый настроенный в этом запуске новый AVD (ещё без Telegram и авторизации) становится эталоном
+            if is_fresh_avd and self.golden_avd_manager.claim_template_source(
+                    system_image=system_image,
+                    ram_size=ram_size,
+                    disk_size=disk_size,
+                    cpu_cores=cpu_cores
+            ):
+                driver = self.capture_golden_template(
+                    avd_name=avd_name,
+                    emulator_port=emulator_port,
+                    platform_version=platform_version,
+                    emulator_manager=emulator_manager,
+                    android_driver_manager=android_driver_manager,
+                    avd_ready_timeout=avd_ready_timeout
+                )
+
+
+
             tg_mobile_app_automation = TelegramMobileAppAutomation(
                 driver=driver,
                 avd_name=avd_name,
@@ -364,11 +779,8 @@ class TGAppiumEmulatorAutomationApp:
 
 
 
-            tg_mobile_app_automation.install_or_update_telegram_apk(
-                apk_version_manager=apk_version_manager,
-                apk_path=apk_path,
-                emulator_port=emulator_port
-            )
+            if not emulator_manager.ensure_apk_installed(avd_name, emulator_port):
+                logger.error(f"[{thread_name}] [{avd_name}] Не удалось установить актуальную версию Telegram.")
 
 
 
@@ -382,7 +794,6 @@ class TGAppiumEmulatorAutomationApp:
                     snapshot_name="authorized"
                 )
                 logger.info(f"[{thread_name}] Снепшот 'authorized' в {avd_name} успешно сохранён после авторизации.")
-                time.sleep(3)
                 emulator_manager.wait_for_emulator_ready(
                     avd_name=avd_name,
                     emulator_port=emulator_port,
@@ -405,34 +816,82 @@ class TGAppiumEmulatorAutomationApp:
                 emulator_auth_config_manager.reset_authorization(avd_name)
 
 
-            while not excel_processor.is_numbers_ended:
-                if self.terminate_flag.is_set():
-                    break  # Прерываем цикл, если флаг установлен
-
-                row = excel_processor.get_next_number(thread_name=thread_name, avd_name=avd_name)
-                if row is None:
-                    break
-
-                phone_number = row['Телефон Ответчика']
-                formatted_phone_number = excel_processor.normalize_phone_number(phone_number)
-                if not formatted_phone_number:
-                    logger.warning(f"[{thread_name}] [{avd_name}]: Пропуск некорректного номера: {phone_number}.")
-                    continue
-
-                logger.info(f"[{thread_name}] [{avd_name}]: Проверка номера: {formatted_phone_number}...")
-
-                if tg_mobile_app_automation.send_message_with_phone_number(formatted_phone_number):
-                    excel_processor.record_valid_number(row)
+            # Наблюдатель перезапускает эмулятор при падении, потере ADB-соединения или зависании проверки
+            supervisor = EmulatorSupervisor(
+                avd_name=avd_name,
+                emulator_port=emulator_port,
+                emulator_manager=emulator_manager,
+                terminate_flag=self.terminate_flag,
+                progress_timeout=self.ui.check_progress_timeout.get(),
+                max_restarts=self.ui.max_emulator_restarts.get()
+            )
+            supervisor.start()
 
-                logger.info(f"[{thread_name}] [{avd_name}]: Жмем кнопку 'Назад'")
-                driver.press_keycode(AndroidKey.BACK)
+            try:
+                while not self.terminate_flag.is_set():
+                    row = None
+                    try:
+                        if supervisor.has_failed():
+                            raise RuntimeError(f"Сбой эмулятора {avd_name}: {supervisor.failure_reason}.")
+
+                        row = excel_processor.get_next_number(thread_name=thread_name, avd_name=avd_name)
+                        if row is NUMBERS_ENDED:
+                            break
+
+                        phone_number = row['Телефон Ответчика']
+                        formatted_phone_number = excel_processor.normalize_phone_number(phone_number)
+                        if not formatted_phone_number:
+                            logger.warning(f"[{thread_name}] [{avd_name}]: Пропуск некорректного номера: {phone_number}.")
+                            continue
+
+                        logger.info(f"[{thread_name}] [{avd_name}]: Проверка номера: {formatted_phone_number}...")
+
+                        supervisor.begin_check()
+                        outcome = tg_mobile_app_automation.send_message_with_phone_number(formatted_phone_number)
+                        supervisor.end_check()
+
+                        # Ошибка проверки из-за сбоя эмулятора - не итог для номера: он будет проверен заново
+                        if outcome not in CheckOutcome.FINAL and supervisor.check_now():
+                            raise RuntimeError(f"Сбой эмулятора {avd_name}: {supervisor.failure_reason}.")
+
+                        excel_processor.record_result(row, outcome, avd_name)
+                        row = None
+
+                        logger.info(f"[{thread_name}] [{avd_name}]: Жмем кнопку 'Назад'")
+                        driver.press_keycode(AndroidKey.BACK)
+                    except Exception as ex:
+                        supervisor.end_check()
+                        if row is not None and row is not NUMBERS_ENDED:
+                            excel_processor.requeue_number(row, avd_name)
+                        if self.terminate_flag.is_set() or not supervisor.check_now():
+                            raise
+                        if not supervisor.can_restart():
+                            logger.error(f"[{thread_name}] [{avd_name}]: Исчерпан лимит перезапусков эмулятора "
+                                         f"({supervisor.max_restarts}).")
+                            raise
+                        logger.warning(f"[{thread_name}] [{avd_name}]: {ex} Перезапуск слота...")
+                        driver, tg_mobile_app_automation = self.restart_emulator_slot(
+                            avd_name=avd_name,
+                            emulator_port=emulator_port,
+                            platform_version=platform_version,
+                            emulator_manager=emulator_manager,
+                            android_driver_manager=android_driver_manager,
+                            excel_processor=excel_processor,
+                            boot_scheduler=boot_scheduler,
+                            emulator_auth_config_manager=emulator_auth_config_manager,
+                            supervisor=supervisor,
+                            avd_ready_timeout=avd_ready_timeout
+                        )
+            finally:
+                supervisor.stop()
 
         except Exception as ex:
             thread_name = threading.current_thread().name
             logger.error(f"[{thread_name}] [{avd_name}]: Произошла ошибка с эмулятором {avd_name}: {ex}")
         finally:
             self.cleanup(thread_name=thread_name, android_driver_manager=android_driver_manager, avd_name=avd_name,
-                         appium_port=appium_port, emulator_manager=emulator_manager, emulator_port=emulator_port, ui=app.ui)
+                         appium_port=appium_port, emulator_manager=emulator_manager, emulator_port=emulator_port, ui=app.ui,
+                         emulator_pool=emulator_pool)
 
             self.terminate_program_during_automation(self.ui)
 
@@ -443,11 +902,123 @@ class TGAppiumEmulatorAutomationApp:
             appium_port=appium_port,
             emulator_manager=emulator_manager,
             emulator_port=emulator_port,
-            ui=app.ui
+            ui=app.ui,
+            emulator_pool=emulator_pool
         )
 
         self.terminate_program_during_automation(self.ui)
 
+    def capture_golden_template(
+            self,
+            avd_name: str,
+            emulator_port: int,
+            platform_version: str,
+            emulator_manager: EmulatorManager,
+            android_driver_manager: AndroidDriverManager,
+            avd_ready_timeout: int,
+    ):
+        """
+        Останавливает только что настроенный эмулятор, копирует его AVD в эталон и снова запускает
+        эмулятор со снепшота 'configured'. Возвращает новый драйвер.
+        """
+        thread_name = threading.current_thread().name
+
+        try:
+            try:
+                android_driver_manager.stop_driver()
+            except Exception as e:
+                logger.info(f"[{thread_name}] [{avd_name}]: Не удалось остановить драйвер перед созданием эталона: {e}")
+            emulator_manager.close_emulator(thread_name=thread_name, avd_name=avd_name, emulator_port=emulator_port)
+            self.golden_avd_manager.promote_fresh_avd(avd_name)
+        except Exception as e:
+            logger.error(f"[{thread_name}] [{avd_name}]: Ошибка при создании эталонного AVD: {e}")
+
+        if not emulator_manager.start_emulator_with_optional_snapshot(
+                avd_name=avd_name,
+                emulator_port=emulator_port,
+                avd_ready_timeout=avd_ready_timeout,
+                launch_profile=EmulatorLaunchProfiles.DEFAULT_PROFILE
+        ):
+            raise RuntimeError(f"Не удалось перезапустить эмулятор {avd_name} после создания эталона.")
+
+        driver = self.setup_driver(
+            avd_name=avd_name,
+            emulator_port=emulator_port,
+            emulator_manager=emulator_manager,
+            thread_name=thread_name,
+            android_driver_manager=android_driver_manager,
+            platform_version=platform_version
+        )
+        if driver is None:
+            raise RuntimeError(f"Не удалось пересоздать драйвер для {avd_name} после создания эталона.")
+        return driver
+
+
+    def restart_emulator_slot(
+            self,
+            avd_name: str,
+            emulator_port: int,
+            platform_version: str,
+            emulator_manager: EmulatorManager,
+            android_driver_manager: AndroidDriverManager,
+            excel_processor: ThreadSafeExcelProcessor | MultiFileExcelProcessor,
+            boot_scheduler: BootScheduler,
+            emulator_auth_config_manager: EmulatorAuthConfigManager,
+            supervisor: EmulatorSupervisor,
+            avd_ready_timeout: int,
+    ):
+        """
+        Перезапускает упавший или зависший эмулятор слота со снепшота 'authorized' и пересоздаёт драйвер.
+        Возвращает (driver, tg_mobile_app_automation) для продолжения проверки номеров.
+        """
+        thread_name = threading.current_thread().name
+        supervisor.pause()
+
+        try:
+            android_driver_manager.stop_driver()
+        except Exception as e:
+            logger.info(f"[{thread_name}] [{avd_name}]: Драйвер упавшего эмулятора уже недоступен: {e}")
+        emulator_manager.close_emulator(thread_name=thread_name, avd_name=avd_name, emulator_port=emulator_port)
+
+        with boot_scheduler.boot_slot(avd_name):
+            if not emulator_manager.start_emulator_with_optional_snapshot(
+                    avd_name=avd_name,
+                    emulator_port=emulator_port,
+                    avd_ready_timeout=avd_ready_timeout,
+                    launch_profile=self.ui.launch_profile.get()
+            ):
+                raise RuntimeError(f"Не удалось перезапустить эмулятор {avd_name} после сбоя.")
+
+        driver = self.setup_driver(
+            avd_name=avd_name,
+            emulator_port=emulator_port,
+            emulator_manager=emulator_manager,
+            thread_name=thread_name,
+            android_driver_manager=android_driver_manager,
+            platform_version=platform_version
+        )
+        if driver is None:
+            raise RuntimeError(f"Не удалось пересоздать драйвер для {avd_name} после перезапуска.")
+
+        # Снепшот мог быть сохранён до обновления Telegram в этом запуске
+        if not emulator_manager.ensure_apk_installed(avd_name, emulator_port):
+            logger.error(f"[{thread_name}] [{avd_name}] Не удалось установить актуальную версию Telegram после перезапуска.")
+
+        tg_mobile_app_automation = TelegramMobileAppAutomation(
+            driver=driver,
+            avd_name=avd_name,
+            excel_processor=excel_processor,
+            telegram_app_package="org.telegram.messenger.web",
+            emulator_auth_config_manager=emulator_auth_config_manager,
+        )
+        tg_mobile_app_automation.prepare_telegram_app()
+
+        supervisor.mark_restarted()
+        logger.info(f"[{thread_name}] [{avd_name}]: Эмулятор перезапущен после сбоя "
+                    f"({supervisor.restart_count}/{supervisor.max_restarts}), проверка номеров продолжается.")
+        return driver, tg_mobile_app_automation
+
+
     @staticmethod
     def monitor_initial_window_and_mark_as_started(
             driver: WebDriver,
@@ -521,10 +1092,17 @@ class TGAppiumEmulatorAutomationApp:
 
 
     @staticmethod
-    def cleanup(thread_name, android_driver_manager, avd_name, appium_port, emulator_manager, emulator_port, ui):
+    def cleanup(thread_name, android_driver_manager, avd_name, appium_port, emulator_manager, emulator_port, ui, emulator_pool=None):
         try:
             ui.disable_terminate_button()
             logger.info("Запущен процесс очистки ресурсов перед завершением программы.")
+            # В режиме пула исправный эмулятор и его Appium-сервер остаются запущенными для следующего запуска
+            if emulator_pool is not None and emulator_port and emulator_pool.is_healthy(avd_name, emulator_port, appium_port):
+                if android_driver_manager:
+                    android_driver_manager.stop_driver()
+                emulator_pool.release(avd_name, emulator_port, appium_port)
+                return
+
             if android_driver_manager:
                 android_driver_manager.stop_driver()
                 logger.info(f"[{thread_name}] Очистил ресурсы driver, управляющего эмулятором [{avd_name}] на порту [{emulator_port}].")
@@ -552,6 +1130,12 @@ class TGAppiumEmulatorAutomationApp:
         logger.info("Завершаем работу приложения...")
         ui.disable_terminate_button()
         self.terminate_flag.set()
+        self.emulator_manager.command_runner.cancel_all()  # Прерываем зависшие внешние команды
+        if self.excel_processor:
+            try:
+                self.excel_processor.flush()  # Дописываем накопленные результаты в журнал
+            except RuntimeError as e:
+                logger.error(f"Не удалось дописать результаты в журнал: {e}")
         logger.info("Приложение вскоре будет завершено... Очистка ресурсов, закрытие эмуляторов...")
         time.sleep(5)
 
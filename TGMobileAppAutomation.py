@@ -1,4 +1,3 @@
-import subprocess
 import threading
 from threading import Lock
 import time
@@ -9,7 +8,7 @@ from selenium.webdriver.common.actions.action_builder import ActionBuilder
 from selenium.webdriver.common.actions.pointer_input import PointerInput
 from selenium.webdriver import ActionChains
 
-from TelegramApkVersionManager import TelegramApkVersionManager
+from CheckOutcome import CheckOutcome
 
 from MobileElementsHandler import MobileElementsHandler as Meh
 
@@ -195,6 +194,10 @@ class TelegramMobileAppAutomation:
 
 
     def send_message_with_phone_number(self, phone_number):
+        """
+        Проверяет номер через отправку его в "Избранное".
+        :return: Итог проверки - одно из значений CheckOutcome.
+        """
         thread_name = threading.current_thread().name
 
         try:
@@ -290,64 +293,17 @@ class TelegramMobileAppAutomation:
 
             if "Перейти в профиль" in element.get_attribute("text") or "View Profile" in element.get_attribute("text"):
                 logger.info(f"[{thread_name}] [{self.avd_name}]: Номер {phone_number} зарегистрирован в Telegram!")
-                return True
+                return CheckOutcome.REGISTERED
             elif "Номер не зарегистрирован в Telegram" in element.get_attribute("text") or "This number is not on Telegram" in element.get_attribute("text"):
                 logger.info(f"[{thread_name}] [{self.avd_name}]: Номер {phone_number} не зарегистрирован в Telegram.")
-                return False
+                return CheckOutcome.NOT_REGISTERED
             elif "Удалить" in element.get_attribute("text") or "Delete" in element.get_attribute("text"):
                 logger.info(f"[{thread_name}] [{self.avd_name}]: Номер {phone_number} не удалось проверить...")
-                return False
+                return CheckOutcome.INCONCLUSIVE
+
+            return CheckOutcome.INCONCLUSIVE
 
         except Exception as ex:
             self.ensure_is_in_telegram_app()
             logger.info(f"[{thread_name}] [{self.avd_name}]: Произошла ошибка в процессе проверки номера: {ex}")
-
-
-    def install_or_update_telegram_apk(self, apk_version_manager: TelegramApkVersionManager, apk_path, emulator_port):
-        """
-        Устанавливает или обновляет Telegram APK на эмуляторе.
-        Если версия установленного приложения устарела, выполняется обновление.
-        """
-        thread_name = threading.current_thread().name
-
-        # Получаем версию из скачанного APK
-        downloaded_version = apk_version_manager.get_app_version(apk_path)
-        if not downloaded_version:
-            logger.error(f"[{thread_name}] [{self.avd_name}] Не удалось определить версию APK. Пропуск установки.")
-            raise
-
-        logger.info(f"[{thread_name}] [{self.avd_name}] Версия APK для установки: {downloaded_version}")
-
-        # Получаем текущую версию установленного приложения
-        installed_version = apk_version_manager.get_installed_app_version(emulator_port)
-        if installed_version:
-            logger.info(f"[{thread_name}] [{self.avd_name}] Текущая версия Telegram на устройстве: {installed_version}")
-        else:
-            logger.warning(f"[{thread_name}] [{self.avd_name}] Telegram не установлен на устройстве. Установка новой версии...")
-
-        # Сравнение версий
-        if installed_version == downloaded_version:
-            logger.info(f"[{thread_name}] [{self.avd_name}] Установленная версия актуальна. Установка не требуется.")
-            return
-        elif installed_version and installed_version < downloaded_version:
-            logger.warning(f"[{thread_name}] [{self.avd_name}] Установлена устаревшая версия Telegram. Выполняется обновление...")
-            try:
-                # Обновление APK
-                update_command = [
-                    "adb", "-s", f"emulator-{emulator_port}", "install", "-r", apk_path
-                ]
-                result = subprocess.run(update_command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-                if "Success" in result.stdout:
-                    logger.info(f"[{thread_name}] [{self.avd_name}] Telegram успешно обновлён до версии {downloaded_version}.")
-                else:
-                    logger.error(f"[{thread_name}] [{self.avd_name}] Ошибка при обновлении Telegram: {result.stderr}")
-            except Exception as e:
-                logger.error(f"[{thread_name}] [{self.avd_name}] Ошибка при попытке обновить приложение: {e}")
-        else:
-            logger.warning(f"[{thread_name}] [{self.avd_name}] Telegram не установлен. Выполняется установка...")
-            try:
-                # Установка APK
-                self.driver.install_app(apk_path)
-                logger.info(f"[{thread_name}] [{self.avd_name}] Telegram успешно установлен.")
-            except Exception as e:
-                logger.error(f"[{thread_name}] [{self.avd_name}] Ошибка при установке Telegram: {e}")
+            return CheckOutcome.ERROR
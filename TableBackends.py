@@ -0,0 +1,171 @@
+import csv
+import os
+
+import pandas as pd
+from openpyxl import load_workbook
+
+from logger_config import Logger
+logger = Logger.get_logger(__name__)
+
+
+class XlsxTableBackend:
+    """Таблицы Excel (openpyxl). Самый медленный формат, оставлен для совместимости."""
+    EXTENSIONS = (".xlsx", ".xlsm")
+
+    @staticmethod
+    def read(path):
+        df = pd.read_excel(path, header=0, dtype=str, engine='openpyxl')
+        df.columns = df.columns.str.strip()
+        return df
+
+    @classmethod
+    def read_header(cls, path):
+        workbook = load_workbook(path, read_only=True, data_only=True)
+        try:
+            worksheet = workbook.worksheets[0]
+            return normalize_header(next(worksheet.iter_rows(max_row=1, values_only=True), ()))
+        finally:
+            workbook.close()
+
+    @classmethod
+    def iter_chunks(cls, path, chunk_size):
+        """Лениво читает первый лист итератором read-only книги openpyxl."""
+        workbook = load_workbook(path, read_only=True, data_only=True)
+        try:
+            worksheet = workbook.worksheets[0]
+            rows = worksheet.iter_rows(values_only=True)
+            columns = normalize_header(next(rows, ()))
+            columns_count = len(columns)
+
+            chunk = []
+            for values in rows:
+                if all(value is None for value in values):
+                    continue
+                values = list(values[:columns_count]) + [None] * (columns_count - len(values))
+                chunk.append([cls._cell_to_str(value) for value in values])
+                if len(chunk) >= chunk_size:
+                    yield pd.DataFrame(chunk, columns=columns, dtype=object)
+                    chunk = []
+            if chunk:
+                yield pd.DataFrame(chunk, columns=columns, dtype=object)
+        finally:
+            workbook.close()
+
+    @staticmethod
+    def _cell_to_str(value):
+        """
+        Приводит значение ячейки к строке так же, как pd.read_excel(dtype=str): целые float без '.0',
+        пустые значения (None, NaN) - None.
+        """
+        if value is None or pd.isna(value) is True:
+            return None
+        if isinstance(value, float) and value.is_integer():
+            value = int(value)
+        return str(value)
+
+    @staticmethod
+    def write(df, path):
+        df.to_excel(path, index=False, engine='openpyxl')
+
+
+class CsvTableBackend:
+    """Таблицы CSV (UTF-8, разделитель определяется по заголовку). Читаются потоково средствами pandas."""
+    EXTENSIONS = (".csv",)
+    ENCODING = "utf-8-sig"  # BOM нужен, чтобы Excel корректно открывал кириллицу
+
+    @classmethod
+    def _detect_delimiter(cls, path):
+        with open(path, "r", encoding=cls.ENCODING, newline="") as f:
+            header_line = f.readline()
+        try:
+            return csv.Sniffer().sniff(header_line, delimiters=",;\t").delimiter
+        except csv.Error:
+            return ","
+
+    @classmethod
+    def read(cls, path):
+        df = pd.read_csv(path, dtype=str, sep=cls._detect_delimiter(path), encoding=cls.ENCODING)
+        df.columns = df.columns.str.strip()
+        return df
+
+    @classmethod
+    def read_header(cls, path):
+        header = pd.read_csv(path, dtype=str, sep=cls._detect_delimiter(path), encoding=cls.ENCODING, nrows=0)
+        return normalize_header(header.columns)
+
+    @classmethod
+    def iter_chunks(cls, path, chunk_size):
+        reader = pd.read_csv(
+            path, dtype=str, sep=cls._detect_delimiter(path), encoding=cls.ENCODING, chunksize=chunk_size
+        )
+        with reader:
+            for chunk in reader:
+                chunk.columns = normalize_header(chunk.columns)
+                yield chunk.astype(object).where(chunk.notna(), None)
+
+    @classmethod
+    def write(cls, df, path):
+        df.to_csv(path, index=False, encoding=cls.ENCODING)
+
+
+class ParquetTableBackend:
+    """Таблицы Parquet (компактное колоночное хранение). Требует установленного пакета pyarrow."""
+    EXTENSIONS = (".parquet",)
+
+    @staticmethod
+    def _import_parquet():
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Для работы с таблицами Parquet установите пакет pyarrow: pip install pyarrow")
+        return pq
+
+    @staticmethod
+    def _to_str_frame(frame):
+        """Приводит значения к строкам так же, как для Excel (79161234567.0 -> '79161234567'), пустые - None."""
+        frame = frame.astype(object).map(XlsxTableBackend._cell_to_str).astype(object)
+        return frame.where(frame.notna(), None)
+
+    @classmethod
+    def read(cls, path):
+        cls._import_parquet()
+        df = cls._to_str_frame(pd.read_parquet(path))
+        df.columns = df.columns.str.strip()
+        return df
+
+    @classmethod
+    def read_header(cls, path):
+        pq = cls._import_parquet()
+        return normalize_header(pq.ParquetFile(path).schema_arrow.names)
+
+    @classmethod
+    def iter_chunks(cls, path, chunk_size):
+        pq = cls._import_parquet()
+        parquet_file = pq.ParquetFile(path)
+        columns = normalize_header(parquet_file.schema_arrow.names)
+        for batch in parquet_file.iter_batches(batch_size=chunk_size):
+            chunk = batch.to_pandas()
+            chunk.columns = columns
+            yield cls._to_str_frame(chunk)
+
+    @classmethod
+    def write(cls, df, path):
+        cls._import_parquet()
+        df.astype(object).where(df.notna(), None).astype("string").to_parquet(path, index=False)
+
+
+TABLE_BACKENDS = (XlsxTableBackend, CsvTableBackend, ParquetTableBackend)
+SUPPORTED_EXTENSIONS = tuple(extension for backend in TABLE_BACKENDS for extension in backend.EXTENSIONS)
+
+
+def normalize_header(header):
+    return [str(name).strip() if name is not None else f"Unnamed: {index}" for index, name in enumerate(header)]
+
+
+def get_table_backend(path):
+    """Возвращает формат таблицы по расширению файла."""
+    extension = os.path.splitext(path)[1].lower()
+    for backend in TABLE_BACKENDS:
+        if extension in backend.EXTENSIONS:
+            return backend
+    raise ValueError(f"Неподдерживаемый формат таблицы: {path}. Поддерживаются: {', '.join(SUPPORTED_EXTENSIONS)}")
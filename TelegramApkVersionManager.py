@@ -4,6 +4,8 @@ import requests
 import subprocess
 from tqdm import tqdm
 
+from AdbClient import AdbClient
+
 from logger_config import Logger
 logger = Logger.get_logger(__name__)
 
@@ -15,18 +17,26 @@ class TelegramApkVersionManager:
 
 
     @staticmethod
-    def get_app_version(apk_path):
-        """Извлекает версию приложения из APK-файла с помощью aapt."""
+    def get_apk_info(apk_path):
+        """
+        Извлекает из APK-файла имя пакета, числовой versionCode и versionName с помощью aapt.
+        Возвращает словарь или None при ошибке.
+        """
         try:
             result = subprocess.run(
                 ["aapt", "dump", "badging", apk_path],
                 stdout=subprocess.PIPE,
                 stderr=subprocess.PIPE,
-                text=True
+                text=True,
+                timeout=120
             )
-            version_match = re.search(r"versionName='([\d.]+)'", result.stdout)
-            if version_match:
-                return version_match.group(1)
+            package_match = re.search(r"package: name='([^']+)' versionCode='(\d+)' versionName='([^']*)'", result.stdout)
+            if package_match:
+                return {
+                    "package": package_match.group(1),
+                    "version_code": int(package_match.group(2)),
+                    "version_name": package_match.group(3),
+                }
             else:
                 raise ValueError("Не удалось извлечь версию из APK")
         except Exception as e:
@@ -34,16 +44,12 @@ class TelegramApkVersionManager:
             return None
 
 
-    def get_installed_app_version(self, emulator_port):
-        """Извлекает версию установленного приложения с устройства."""
+    def get_installed_version_code(self, serial):
+        """Возвращает числовой versionCode установленного приложения или None, если оно не установлено."""
         try:
-            command = ["adb", "-s", f"emulator-{emulator_port}", "shell", f"dumpsys package {self.telegram_app_package}"]
-            result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-            version_match = re.search(r"versionName=([\d.]+)", result.stdout)
-            if version_match:
-                return version_match.group(1)
-            else:
-                raise ValueError("Не удалось извлечь версию установленного приложения")
+            output = AdbClient.shell(serial, f"dumpsys package {self.telegram_app_package}")
+            version_match = re.search(r"versionCode=(\d+)", output or "")
+            return int(version_match.group(1)) if version_match else None
         except Exception as e:
             logger.error(f"Ошибка при извлечении версии установленного приложения: {e}")
             return None
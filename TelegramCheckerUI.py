@@ -8,6 +8,8 @@ import tkinter.font as tk_font
 from tkinter import filedialog, ttk, messagebox
 
 from LocalVariablesManager import LocalVariablesManager
+from TableBackends import SUPPORTED_EXTENSIONS
+from EmulatorLaunchProfiles import EmulatorLaunchProfiles
 
 from logger_config import Logger
 logger = Logger.get_logger(__name__)
@@ -31,6 +33,15 @@ class TelegramCheckerUI:
         self.ram_size = tk.IntVar(value=logic.get_avd_property("ram_size"))
         self.disk_size = tk.IntVar(value=logic.get_avd_property("disk_size"))
         self.avd_ready_timeout = tk.IntVar(value=logic.get_avd_property("emulator_ready_timeout"))
+        self.max_concurrent_boots = tk.IntVar(value=logic.get_avd_property("max_concurrent_boots"))
+        self.boot_stagger_seconds = tk.IntVar(value=logic.get_avd_property("boot_stagger_seconds"))
+        self.use_emulator_pool = tk.BooleanVar(value=logic.get_avd_property("use_emulator_pool"))
+        self.pool_idle_timeout_minutes = tk.IntVar(value=logic.get_avd_property("pool_idle_timeout_minutes"))
+        self.check_progress_timeout = tk.IntVar(value=logic.get_avd_property("check_progress_timeout"))
+        self.max_emulator_restarts = tk.IntVar(value=logic.get_avd_property("max_emulator_restarts"))
+        self.launch_profile = tk.StringVar(value=logic.get_avd_property("launch_profile"))
+        self.cpu_cores = tk.IntVar(value=logic.get_avd_property("cpu_cores"))
+        self.auto_capacity_plan = tk.BooleanVar(value=logic.get_avd_property("auto_capacity_plan"))
 
         # Интерфейсные переменные
         latest_excel_file = logic.get_latest_excel_file()
@@ -39,9 +50,14 @@ class TelegramCheckerUI:
         self.source_excel_file_path = tk.StringVar(value=latest_excel_file)
         self.export_table_path = tk.StringVar(value=export_excel_file)
 
+        # Пакетный режим: обработка всех таблиц из папки excel_tables_dir (или по маске) за один запуск
+        self.batch_mode = tk.BooleanVar(value=False)
+        self.batch_files_pattern = tk.StringVar(value="*")
+
         # Таблицы
         self.excel_frame = ttk.Frame(self.root)
         self.export_frame = ttk.Frame(self.root)
+        self.batch_frame = ttk.Frame(self.root)
         self.excel_treeview = ttk.Treeview(columns=[], show="headings", height=5)
 
         self.start_button = None
@@ -78,6 +94,8 @@ class TelegramCheckerUI:
         tk.Button(first_level_top_buttons_inner_frame, text="Посмотреть список\nсозданных AVD", font=self.custom_font, justify="center", command=self.show_existing_avds_list).pack(side="left", padx=5)
         tk.Button(first_level_top_buttons_inner_frame, text="Удалить все AVD\n(Созданные AVD)", font=self.custom_font, justify="center", command=self.delete_all_avds).pack(side="left", padx=5)
         tk.Button(first_level_top_buttons_inner_frame, text="Перезапустить\nabv-server", font=self.custom_font, justify="center", command=self.restart_adb_server).pack(side="left", padx=5)
+        tk.Button(first_level_top_buttons_inner_frame, text="Закрыть все\nзапущенные эмуляторы", font=self.custom_font, justify="center", command=self.kill_all_emulators).pack(side="left", padx=5)
+        tk.Button(first_level_top_buttons_inner_frame, text="Сохранить снепшоты\nзапущенных эмуляторов", font=self.custom_font, justify="center", command=self.save_all_snapshots).pack(side="left", padx=5)
 
         # Центрирование кнопок в контейнере второго ряда кнопок
         second_level_top_buttons_inner_frame = tk.Frame(top_buttons_frame)
@@ -107,8 +125,14 @@ class TelegramCheckerUI:
         tk.Label(self.root, text="Итоговый файл таблицы Excel:", font=self.header_font).pack(pady=1)
         tk.Entry(self.export_frame, textvariable=self.export_table_path, font=self.custom_font, width=50).pack(side="left", fill="x", expand=True, padx=5)
         tk.Button(self.export_frame, text="Открыть\nв проводнике", font=self.custom_font, command=lambda: self.open_in_explorer(self.export_table_path)).pack(side="left", padx=5)
+        tk.Button(self.export_frame, text="Сохранить\nкак xlsx", font=self.custom_font, command=self.export_table_to_xlsx).pack(side="left", padx=5)
         self.export_frame.pack(fill="x", padx=10, pady=5)
 
+        # Пакетный режим
+        tk.Checkbutton(self.batch_frame, text="Пакетный режим: обработать все таблицы из папки по маске:", variable=self.batch_mode, font=self.custom_font).pack(side="left", padx=5)
+        tk.Entry(self.batch_frame, textvariable=self.batch_files_pattern, font=self.custom_font, width=30).pack(side="left", fill="x", expand=True, padx=5)
+        self.batch_frame.pack(fill="x", padx=10, pady=5)
+
         # Содержимое таблицы Excel
         tk.Label(self.root, text="Содержимое таблицы Excel:", font=self.header_font).pack(pady=1)
         self.excel_treeview.pack(fill="both", expand=True, padx=10, pady=5)
@@ -143,6 +167,23 @@ class TelegramCheckerUI:
         create_labeled_entry(avd_settings_frame, "Кол-во ОЗУ\nна AVD (МБ):", self.ram_size)
         create_labeled_entry(avd_settings_frame, "Тайм-аут\nготовности AVD (сек.):", self.avd_ready_timeout)
         create_labeled_entry(avd_settings_frame, "Постоянная\nпамять (МБ):", self.disk_size)
+        create_labeled_entry(avd_settings_frame, "Ядер CPU\nна AVD:", self.cpu_cores)
+        create_labeled_entry(avd_settings_frame, "Одновременных\nзагрузок AVD:", self.max_concurrent_boots)
+        create_labeled_entry(avd_settings_frame, "Интервал между\nзагрузками (сек.):", self.boot_stagger_seconds)
+        tk.Checkbutton(avd_settings_frame, text="Пул\nэмуляторов", variable=self.use_emulator_pool, font=tk_font.Font(family="Calibri", size=11, weight="bold")).pack(side="left", padx=5)
+        create_labeled_entry(avd_settings_frame, "Простой в пуле\nдо закрытия (мин.):", self.pool_idle_timeout_minutes)
+        create_labeled_entry(avd_settings_frame, "Зависание\nпроверки (сек.):", self.check_progress_timeout)
+        create_labeled_entry(avd_settings_frame, "Перезапусков\nAVD при сбое:", self.max_emulator_restarts)
+
+        # Профиль запуска эмулятора (окно, графика, экран)
+        launch_profile_frame = tk.Frame(avd_settings_frame)
+        launch_profile_frame.pack(side="left", padx=5)
+        tk.Label(launch_profile_frame, text="Профиль\nзапуска AVD:", font=tk_font.Font(family="Calibri", size=11, weight="bold")).pack()
+        ttk.Combobox(launch_profile_frame, textvariable=self.launch_profile, values=EmulatorLaunchProfiles.get_profile_names(), state="readonly", width=10).pack()
+
+        # Подбор количества эмуляторов и их параметров по ресурсам хоста
+        tk.Button(avd_settings_frame, text="Подобрать\nпо ресурсам\nхоста", command=self.recommend_capacity_plan).pack(side="left", padx=5)
+        tk.Checkbutton(avd_settings_frame, text="Авто-подбор\nпри запуске", variable=self.auto_capacity_plan, font=tk_font.Font(family="Calibri", size=11, weight="bold")).pack(side="left", padx=5)
 
         # Кнопка сохранения параметров AVD в конфиг
         tk.Button(avd_settings_frame, text="Сохранить\nпараметры AVD\nпо умолчанию", command=self.save_avd_settings).pack(side="right", padx=5)
@@ -225,10 +266,48 @@ class TelegramCheckerUI:
         self.logic.save_threads_config(num_threads=self.num_threads.get())
 
 
+    def recommend_capacity_plan(self):
+        """Оценивает ресурсы хоста в фоне и подставляет рекомендуемые значения в поля настроек."""
+        def task():
+            plan = self.logic.get_capacity_plan()
+            self.root.after(0, lambda: self.apply_capacity_plan(plan))
+
+        self.run_task_in_thread(task=task, should_exit=False)
+
+
+    def apply_capacity_plan(self, plan, show_dialog=True):
+        """Подставляет значения плана в поля настроек; при авто-подборе во время запуска - без окна с пояснением."""
+        self.num_threads.set(plan["emulator_count"])
+        self.ram_size.set(plan["ram_size"])
+        self.cpu_cores.set(plan["cpu_cores"])
+        self.max_concurrent_boots.set(plan["max_concurrent_boots"])
+        if not show_dialog:
+            return
+        host = plan["host"]
+        messagebox.showinfo(
+            "План по ресурсам хоста",
+            f"Ядер: {host['cpu_count']}, доступно ОЗУ: {host['available_ram_mb']} МБ, "
+            f"аппаратное ускорение: {'есть' if host['hardware_acceleration'] else 'нет'}, "
+            f"запись на диск: {host['disk_write_mb_s']} МБ/с.\n\n"
+            f"Рекомендуется: эмуляторов {plan['emulator_count']}, ОЗУ {plan['ram_size']} МБ и "
+            f"{plan['cpu_cores']} ядр. на AVD, одновременных загрузок {plan['max_concurrent_boots']}.\n"
+            f"Сохраните параметры, чтобы использовать их по умолчанию."
+        )
+
+
     def save_avd_settings(self):
         self.logic.set_avd_property("ram_size", self.ram_size.get())
         self.logic.set_avd_property("disk_size", self.disk_size.get())
         self.logic.set_avd_property("emulator_ready_timeout", self.avd_ready_timeout.get())
+        self.logic.set_avd_property("max_concurrent_boots", self.max_concurrent_boots.get())
+        self.logic.set_avd_property("boot_stagger_seconds", self.boot_stagger_seconds.get())
+        self.logic.set_avd_property("use_emulator_pool", self.use_emulator_pool.get())
+        self.logic.set_avd_property("pool_idle_timeout_minutes", self.pool_idle_timeout_minutes.get())
+        self.logic.set_avd_property("check_progress_timeout", self.check_progress_timeout.get())
+        self.logic.set_avd_property("max_emulator_restarts", self.max_emulator_restarts.get())
+        self.logic.set_avd_property("launch_profile", self.launch_profile.get())
+        self.logic.set_avd_property("cpu_cores", self.cpu_cores.get())
+        self.logic.set_avd_property("auto_capacity_plan", self.auto_capacity_plan.get())
         logger.info("Настройки AVD сохранены.")
 
 
@@ -239,6 +318,20 @@ class TelegramCheckerUI:
         )
 
 
+    def kill_all_emulators(self):
+        self.run_task_in_thread(
+            task=self.logic.kill_all_emulators,
+            should_exit=False
+        )
+
+
+    def save_all_snapshots(self):
+        self.run_task_in_thread(
+            task=self.logic.save_all_snapshots,
+            should_exit=False
+        )
+
+
     def forced_to_exit_app(self):
         if messagebox.askyesno("Подтверждение", "На данном этапе программу\n"
                                                 "необходимо завершить,\n"
@@ -393,9 +486,10 @@ class TelegramCheckerUI:
 
 
     def browse_excel_file(self):
-        file_path = filedialog.askopenfilename(filetypes=[("Excel files", "*.xlsx"),
-                                                          ("Excel files", "*.xlsm"),
-                                                          ("Excel files", "*.xls")])
+        file_path = filedialog.askopenfilename(filetypes=[("Таблицы", " ".join(f"*{extension}" for extension in SUPPORTED_EXTENSIONS)),
+                                                          ("Excel files", "*.xlsx *.xlsm"),
+                                                          ("CSV files", "*.csv"),
+                                                          ("Parquet files", "*.parquet")])
         if file_path:
             self.source_excel_file_path.set(file_path)
             self.set_export_table_path()
@@ -441,6 +535,16 @@ class TelegramCheckerUI:
             messagebox.showerror("Ошибка", str(e))
 
 
+    def export_table_to_xlsx(self):
+        """Сохраняет копию итоговой таблицы (csv/parquet) в формате xlsx."""
+        try:
+            xlsx_path = self.logic.convert_table_to_xlsx(self.export_table_path.get())
+            messagebox.showinfo("Успех", f"Итоговая таблица сохранена в формате xlsx:\n{xlsx_path}")
+        except Exception as e:
+            logger.error(f"Ошибка при сохранении таблицы в формате xlsx: {e}")
+            messagebox.showerror("Ошибка", f"Не удалось сохранить таблицу в формате xlsx: {e}")
+
+
     def set_export_table_path(self):
         """Устанавливает путь для итоговой таблицы."""
         input_path = self.source_excel_file_path.get()
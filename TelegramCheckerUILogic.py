@@ -2,13 +2,14 @@ import glob
 import json
 import os
 
-import pandas as pd
-
+from CapacityPlanner import CapacityPlanner
 from EmulatorManager import EmulatorManager
+from EmulatorLaunchProfiles import EmulatorLaunchProfiles
 from AndroidToolManager import AndroidToolManager
 from AppiumInstaller import AppiumInstaller
 from NodeJsInstaller import NodeJsInstaller
 from PackageManager import PackageManager
+from TableBackends import SUPPORTED_EXTENSIONS, XlsxTableBackend, get_table_backend
 
 from logger_config import Logger
 logger = Logger.get_logger(__name__)
@@ -24,6 +25,15 @@ class TelegramCheckerUILogic:
         "ram_size": 1024,  # Размер ОЗУ по умолчанию в МБ
         "disk_size": 1024,  # Размер постоянной памяти по умолчанию в МБ
         "emulator_ready_timeout": 1200,  # Время ожидания готовности эмулятора в секундах
+        "max_concurrent_boots": 2,  # Количество эмуляторов, загружающихся одновременно
+        "boot_stagger_seconds": 5,  # Минимальный интервал между стартами загрузки эмуляторов в секундах
+        "use_emulator_pool": False,  # Оставлять эмуляторы запущенными после обработки и подхватывать их при следующем запуске
+        "pool_idle_timeout_minutes": 30,  # Через сколько минут простоя эмулятор из пула закрывается
+        "check_progress_timeout": 180,  # Через сколько секунд без прогресса проверка номера считается зависшей
+        "max_emulator_restarts": 3,  # Сколько раз за запуск эмулятор слота перезапускается после сбоя
+        "cpu_cores": 1,  # Количество ядер процессора на AVD (hw.cpu.ncore)
+        "auto_capacity_plan": False,  # Подбирать количество эмуляторов, ОЗУ, ядра и загрузки по ресурсам хоста при запуске
+        "launch_profile": EmulatorLaunchProfiles.DEFAULT_PROFILE,  # Профиль запуска эмулятора (см. emulator_launch_profiles.json)
     }
     AVD_PROPERTIES_CONFIG_FILE = "avd_properties_config.json"  # Имя файла для хранения параметров AVD
 
@@ -84,6 +94,14 @@ class TelegramCheckerUILogic:
         self.android_tool_manager.restart_adb_server()
 
 
+    def kill_all_emulators(self):
+        self.emulator_manager.kill_all_emulators()
+
+
+    def save_all_snapshots(self):
+        self.emulator_manager.save_all_snapshots()
+
+
     def clear_tools_files_cache(self):
         PackageManager.clear_tools_files_cache(self.temp_files_dir)
 
@@ -103,15 +121,36 @@ class TelegramCheckerUILogic:
 
 
     def get_latest_excel_file(self):
-        """Возвращает путь к последнему изменённому Excel-файлу."""
+        """Возвращает путь к последнему изменённому файлу таблицы (xlsx, csv или parquet)."""
         if not os.path.exists(self.default_excel_dir):
             return ""
-        files = glob.glob(os.path.join(self.default_excel_dir, "*.xlsx"))
+        files = [
+            file for extension in SUPPORTED_EXTENSIONS
+            for file in glob.glob(os.path.join(self.default_excel_dir, f"*{extension}"))
+        ]
 
         # Фильтруем файлы, исключая те, что содержат '_export' в имени
         filtered_files = [file for file in files if "_export" not in os.path.basename(file)]
 
-        return max(filtered_files, key=os.path.getmtime) if files else ""
+        return max(filtered_files, key=os.path.getmtime) if filtered_files else ""
+
+
+    def get_pending_excel_files(self, pattern="*"):
+        """
+        Возвращает все исходные таблицы из папки таблиц (или по маске) для пакетной обработки,
+        от самой старой к самой новой. Экспортные таблицы в список не попадают.
+        Полностью обработанные таблицы при повторном запуске пропускаются почти мгновенно благодаря журналу.
+        """
+        pattern = pattern or "*"
+        if not os.path.isabs(pattern):
+            pattern = os.path.join(self.default_excel_dir, pattern)
+        files = [
+            file for file in glob.glob(pattern)
+            if os.path.isfile(file)
+            and "_export" not in os.path.basename(file)
+            and os.path.splitext(file)[1].lower() in SUPPORTED_EXTENSIONS
+        ]
+        return sorted(files, key=os.path.getmtime)
 
 
     @staticmethod
@@ -126,15 +165,33 @@ class TelegramCheckerUILogic:
     @staticmethod
     def load_excel_data(file_path):
         """
-        Загружает данные Excel в DataFrame. Если не удается загрузить файл, возвращает None.
+        Загружает данные таблицы (xlsx, csv или parquet) в DataFrame.
         """
-        if not file_path or not file_path.endswith(".xlsx"):
-            raise ValueError("Некорректный файл Excel.")
+        if not file_path or os.path.splitext(file_path)[1].lower() not in SUPPORTED_EXTENSIONS:
+            raise ValueError(f"Некорректный файл таблицы. Поддерживаются: {', '.join(SUPPORTED_EXTENSIONS)}")
         try:
-            df = pd.read_excel(file_path)
+            df = get_table_backend(file_path).read(file_path)
             return df
         except Exception as e:
-            raise ValueError(f"Ошибка загрузки Excel: {e}")
+            raise ValueError(f"Ошибка загрузки таблицы: {e}")
+
+
+    @staticmethod
+    def convert_table_to_xlsx(table_path):
+        """
+        Сохраняет копию таблицы (обычно экспортной csv/parquet) в формате xlsx рядом с исходным файлом.
+        Запись xlsx медленная, поэтому выполняется только по запросу пользователя.
+        """
+        if not table_path or not os.path.isfile(table_path):
+            raise ValueError("Файл таблицы не найден.")
+        base, ext = os.path.splitext(table_path)
+        if ext.lower() in XlsxTableBackend.EXTENSIONS:
+            return table_path
+        xlsx_path = f"{base}.xlsx"
+        df = get_table_backend(table_path).read(table_path)
+        XlsxTableBackend.write(df, xlsx_path)
+        logger.info(f"Таблица {table_path} сохранена в формате xlsx: {xlsx_path} ({len(df)} строк).")
+        return xlsx_path
 
 
     @staticmethod
@@ -221,6 +278,14 @@ class TelegramCheckerUILogic:
             logger.error(f"Ошибка при сохранении конфигурационного файла: {e}")
 
 
+    @staticmethod
+    def get_capacity_plan():
+        """Оценивает ресурсы хоста и возвращает рекомендуемый план запуска эмуляторов (см. CapacityPlanner.plan)."""
+        plan = CapacityPlanner.plan()
+        logger.info(f"Рекомендуемый по ресурсам хоста план запуска эмуляторов: {plan}")
+        return plan
+
+
     def get_avd_property(self, avd_property_name):
         """
         Возвращает значение конкретного параметра AVD.
@@ -0,0 +1,72 @@
+"""
+Сравнение построчной (Series.apply) и векторной нормализации столбца номеров.
+
+Запуск: python benchmark_phone_normalization.py [количество_строк]
+"""
+import logging
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from PhoneNumberNormalizer import PhoneNumberNormalizer
+
+
+def build_phone_column(rows_count, seed=0):
+    """Генерирует столбец номеров в разных форматах, пятая часть значений - мусор."""
+    rng = np.random.default_rng(seed)
+    numbers = rng.integers(9_000_000_000, 9_999_999_999, rows_count).astype(str)
+    values = []
+    for index, number in enumerate(numbers):
+        variant = index % 5
+        if variant == 0:
+            values.append(f"+7 ({number[:3]}) {number[3:6]}-{number[6:8]}-{number[8:]}")
+        elif variant == 1:
+            values.append(f"7{number}")
+        elif variant == 2:
+            values.append(number)
+        elif variant == 3:
+            values.append(f" 7-{number} ")
+        else:
+            values.append("нет данных")
+    return pd.Series(values, dtype=object)
+
+
+def measure(title, func):
+    start_time = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start_time
+    print(f"{title:<45} {elapsed:8.3f} сек.")
+    return result, elapsed
+
+
+def main():
+    rows_count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    phones = build_phone_column(rows_count)
+    print(f"Строк в столбце: {rows_count}")
+
+    # Построчный путь логирует каждый некорректный номер; логирование отключено,
+    # чтобы сравнивать только стоимость самой нормализации.
+    logging.disable(logging.WARNING)
+    try:
+        row_wise, row_wise_time = measure(
+            "Series.apply(PhoneNumberNormalizer.normalize)",
+            lambda: phones.astype(str).apply(PhoneNumberNormalizer.normalize)
+        )
+    finally:
+        logging.disable(logging.NOTSET)
+
+    (vectorized, invalid_count), vectorized_time = measure(
+        "PhoneNumberNormalizer.normalize_series",
+        lambda: PhoneNumberNormalizer.normalize_series(phones)
+    )
+
+    is_equal = (row_wise.fillna("").astype(object) == vectorized.fillna("").astype(object)).all()
+    print(f"Некорректных номеров: {invalid_count}")
+    print(f"Результаты совпадают: {is_equal}")
+    print(f"Ускорение: x{row_wise_time / vectorized_time:.1f}")
+
+
+if __name__ == "__main__":
+    main()